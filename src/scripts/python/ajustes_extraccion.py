@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Ajustes de los módulos opcionales con dos niveles.
+
+- Proceso: se fijan al arrancar (opciones de línea de comandos de los
+  scripts y del lote) y valen para todas las extracciones.
+- Extracción: los parámetros de una llamada (cacheHttp, gobernadorTasa,
+  reproducirHttp, poolSesiones, almacenResultados, perfil,
+  cortacircuitos, reintentosMaximos...) solo cambian esa extracción. Viven
+  en una contextvar, como la medición de tiempos.py: los ven los hilos de
+  las carreras de estrategias y del motor asyncio, que copian el contexto,
+  y desaparecen al terminar. Así en modo --serve o en un lote una petición
+  no deja activado nada para las siguientes.
+
+Cada punto de entrada corre la extracción con `en_extraccion`, en una
+copia del contexto de quien llama.
+"""
+import contextvars
+
+_SIN_VALOR = object()
+
+
+class Ajuste:
+    """
+    Valor del proceso con una posible sustitución para la extracción en curso
+    """
+
+    def __init__(self, nombre, inicial=None):
+        self._proceso = inicial
+        self._extraccion = contextvars.ContextVar(nombre, default=_SIN_VALOR)
+
+    def valor(self):
+        valor = self._extraccion.get()
+        return self._proceso if valor is _SIN_VALOR else valor
+
+    def fijar(self, valor, proceso=False):
+        """
+        Fija el valor del proceso o, con proceso=False, solo el de la
+        extracción en curso
+        """
+        if proceso:
+            self._proceso = valor
+        else:
+            self._extraccion.set(valor)
+
+
+def en_extraccion(funcion, *args, **kwargs):
+    """
+    Llama a `funcion` en una copia del contexto actual: los ajustes que
+    fije la extracción se quedan en ella
+    """
+    return contextvars.copy_context().run(funcion, *args, **kwargs)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Almacén de imágenes de perfil direccionado por contenido.
+
+Cada imagen se descarga en streaming, por bloques y con un tamaño máximo, y
+se guarda una sola vez bajo su hash SHA-256
+(profile_images/<ab>/<hash>.<ext>): los avatares repetidos entre
+ejecuciones y los de relleno que comparten muchas cuentas no ocupan más
+disco ni vuelven a escribirse. Un índice SQLite relaciona cada objetivo
+(plataforma + página/usuario) con el hash y la URL de su imagen; si la URL
+no cambió y el archivo sigue ahí, ni siquiera se descarga.
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from red_scraping import obtener, nueva_sesion
+from tiempos import etapa, sumar_bytes
+
+# Bytes máximos de una imagen de perfil
+TAMANIO_MAXIMO_IMAGEN = 10 * 1024 * 1024
+# Hasta este tamaño la imagen se mantiene en memoria; si ya existe no se escribe nada
+UMBRAL_MEMORIA = 1024 * 1024
+TAMANIO_BLOQUE = 64 * 1024
+
+_FIRMAS = (
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'\x89PNG', '.png'),
+    (b'GIF8', '.gif'),
+    (b'RIFF', '.webp')
+)
+
+_lock = threading.Lock()
+_inicializados = set()
+
+
+def _directorio_almacen(directorio):
+    return os.path.join(directorio, 'profile_images')
+
+
+@contextmanager
+def _indice(directorio):
+    almacen = _directorio_almacen(directorio)
+    os.makedirs(almacen, exist_ok=True)
+    conexion = sqlite3.connect(os.path.join(almacen, 'indice.sqlite3'), timeout=30)
+    try:
+        with _lock:
+            if almacen not in _inicializados:
+                conexion.execute('PRAGMA journal_mode=WAL')
+                conexion.execute('''
+                    CREATE TABLE IF NOT EXISTS imagenes (
+                        plataforma TEXT,
+                        objetivo TEXT,
+                        hash TEXT,
+                        ruta TEXT,
+                        url TEXT,
+                        tamanio INTEGER,
+                        actualizada REAL,
+                        PRIMARY KEY (plataforma, objetivo)
+                    )
+                ''')
+                conexion.execute('CREATE INDEX IF NOT EXISTS idx_imagenes_hash ON imagenes(hash)')
+                conexion.commit()
+                _inicializados.add(almacen)
+        with conexion:
+            yield conexion
+    finally:
+        conexion.close()
+
+
+def _extension(inicio, url):
+    for firma, extension in _FIRMAS:
+        if inicio.startswith(firma):
+            return extension
+    return os.path.splitext(urlparse(url).path)[1].lower() or '.jpg'
+
+
+def _registrar(directorio, plataforma, objetivo, huella, ruta, url, tamanio):
+    with _indice(directorio) as conexion:
+        conexion.execute(
+            'INSERT OR REPLACE INTO imagenes VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (plataforma, objetivo, huella, ruta, url, tamanio, time.time())
+        )
+
+
+@etapa('imagen_perfil')
+def descargar_imagen(session, url, directorio, plataforma, objetivo, minimo_bytes=0,
+                     maximo_bytes=TAMANIO_MAXIMO_IMAGEN):
+    """
+    Descarga la imagen de `url` al almacén y la asocia al objetivo.
+    Devuelve {'exito', 'ruta', 'hash', 'tamanio', 'nueva'} o
+    {'exito': False, 'error'}
+    """
+    objetivo = (objetivo or '').lower()
+    with _indice(directorio) as conexion:
+        previa = conexion.execute(
+            'SELECT hash, ruta, tamanio FROM imagenes WHERE plataforma = ? AND objetivo = ? AND url = ?',
+            (plataforma, objetivo, url)
+        ).fetchone()
+    if previa and os.path.exists(previa[1]):
+        print(f"♻️ Imagen de perfil ya almacenada: {previa[1]}")
+        return {'exito': True, 'hash': previa[0], 'ruta': previa[1], 'tamanio': previa[2], 'nueva': False}
+
+    respuesta = obtener(session or nueva_sesion(), url, timeout=30, stream=True)
+    temporal = None
+    try:
+        if respuesta.status_code != 200:
+            return {'exito': False, 'error': f'HTTP {respuesta.status_code}'}
+
+        hash_contenido = hashlib.sha256()
+        bloques = []
+        inicio = b''
+        tamanio = 0
+        for bloque in respuesta.iter_content(TAMANIO_BLOQUE):
+            tamanio += len(bloque)
+            if tamanio > maximo_bytes:
+                return {'exito': False, 'error': f'Imagen supera el máximo de {maximo_bytes} bytes'}
+            hash_contenido.update(bloque)
+            inicio = inicio or bloque[:16]  # primeros bytes para detectar el formato
+            if temporal is None and tamanio > UMBRAL_MEMORIA:
+                # Imagen grande: seguir en un archivo temporal dentro del propio almacén
+                temporal = tempfile.NamedTemporaryFile(dir=_directorio_almacen(directorio), suffix='.tmp', delete=False)
+                temporal.write(b''.join(bloques))
+                bloques = []
+            if temporal is not None:
+                temporal.write(bloque)
+            else:
+                bloques.append(bloque)
+
+        if not getattr(respuesta, 'desde_cache', False):
+            sumar_bytes(tamanio)
+        if tamanio < minimo_bytes:
+            return {'exito': False, 'error': f'Imagen muy pequeña ({tamanio} bytes)'}
+
+        huella = hash_contenido.hexdigest()
+        extension = _extension(inicio, url)
+        ruta = os.path.join(_directorio_almacen(directorio), huella[:2], huella + extension)
+        nueva = not os.path.exists(ruta)
+        if nueva:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            if temporal is None:
+                temporal = tempfile.NamedTemporaryFile(dir=_directorio_almacen(directorio), suffix='.tmp', delete=False)
+                temporal.write(b''.join(bloques))
+            temporal.close()
+            os.replace(temporal.name, ruta)
+            temporal = None
+
+        _registrar(directorio, plataforma, objetivo, huella, ruta, url, tamanio)
+        return {'exito': True, 'hash': huella, 'ruta': ruta, 'tamanio': tamanio, 'nueva': nueva}
+    finally:
+        respuesta.close()
+        if temporal is not None:
+            temporal.close()
+            try:
+                os.remove(temporal.name)
+            except OSError:
+                pass
+
+
+def imagen_de(directorio, plataforma, objetivo):
+    """
+    Devuelve {'hash', 'ruta', 'url', 'tamanio'} de la última imagen del objetivo, o None
+    """
+    with _indice(directorio) as conexion:
+        fila = conexion.execute(
+            'SELECT hash, ruta, url, tamanio FROM imagenes WHERE plataforma = ? AND objetivo = ?',
+            (plataforma, (objetivo or '').lower())
+        ).fetchone()
+    return dict(zip(('hash', 'ruta', 'url', 'tamanio'), fila)) if fila else None
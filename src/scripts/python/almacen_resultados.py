@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Almacén opcional de resultados en SQLite, en lugar de un archivo JSON
+(indent=2) por objetivo en scraped_data.
+
+Cada extracción se añade a una tabla con su plataforma, objetivo, id de
+ejecución y veredicto de existencia (con índices sobre cada uno). Las
+filas se acumulan en memoria y se escriben en lotes, en una sola
+transacción cada TAMANIO_LOTE resultados o cada INTERVALO_VACIADO
+segundos, y siempre al salir del proceso. Los reportes leen un único
+archivo indexado con ultimo_veredicto_por_objetivo() o
+resultados_de_ejecucion().
+
+Parámetros del extractor: almacenResultados (true o ruta de la base; por
+defecto <directorio>/resultados.sqlite3) e idEjecucion.
+
+Uso: python almacen_resultados.py <base.sqlite3> ultimos [--plataforma facebook|instagram]
+     python almacen_resultados.py <base.sqlite3> ejecucion <id_ejecucion>
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import sqlite3
+import argparse
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from cache_resultados import CAMPOS_EXISTENCIA, normalizar_objetivo
+from ajustes_extraccion import Ajuste
+
+NOMBRE_BASE_DEFECTO = 'resultados.sqlite3'
+TAMANIO_LOTE = 50
+INTERVALO_VACIADO = 5
+
+COLUMNAS = ('id', 'id_ejecucion', 'plataforma', 'objetivo', 'existe', 'metodo', 'fecha', 'datos')
+
+_ajuste = Ajuste('almacen_resultados')
+_id_ejecucion = None
+_pendientes = []
+_ultimo_vaciado = time.time()
+_lock = threading.Lock()
+_inicializadas = set()
+
+
+@contextmanager
+def _conexion(ruta):
+    conexion = sqlite3.connect(ruta, timeout=30)
+    try:
+        with _lock:
+            if ruta not in _inicializadas:
+                conexion.execute('PRAGMA journal_mode=WAL')
+                conexion.execute('''
+                    CREATE TABLE IF NOT EXISTS resultados (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        id_ejecucion TEXT,
+                        plataforma TEXT,
+                        objetivo TEXT,
+                        existe INTEGER,
+                        metodo TEXT,
+                        fecha REAL,
+                        datos TEXT
+                    )
+                ''')
+                conexion.execute('CREATE INDEX IF NOT EXISTS idx_resultados_objetivo ON resultados(plataforma, objetivo)')
+                conexion.execute('CREATE INDEX IF NOT EXISTS idx_resultados_ejecucion ON resultados(id_ejecucion)')
+                conexion.execute('CREATE INDEX IF NOT EXISTS idx_resultados_existe ON resultados(existe)')
+                conexion.commit()
+                _inicializadas.add(ruta)
+        with conexion:
+            yield conexion
+    finally:
+        conexion.close()
+
+
+def nuevo_id_ejecucion():
+    return f'{datetime.now().strftime("%Y%m%d_%H%M%S")}_{os.getpid()}'
+
+
+def configurar(ruta, id_ejecucion=None, proceso=True):
+    """
+    Activa el almacén en `ruta` para todo el proceso o, con proceso=False,
+    solo para la extracción en curso. Sin `id_ejecucion` se usa uno por
+    proceso
+    """
+    global _id_ejecucion
+    with _lock:
+        if _id_ejecucion is None:
+            _id_ejecucion = nuevo_id_ejecucion()
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    _ajuste.fijar({'ruta': os.path.abspath(ruta), 'id_ejecucion': id_ejecucion or _id_ejecucion}, proceso)
+
+
+def configurar_desde_parametros(params, directorio, proceso=False):
+    """
+    Parámetros del extractor: almacenResultados (true o ruta; false lo
+    desactiva) e idEjecucion. Sin almacenResultados se mantiene la
+    configuración del proceso
+    """
+    if 'almacenResultados' not in params:
+        return
+    valor = params['almacenResultados']
+    if not valor:
+        _ajuste.fijar(None, proceso)
+        return
+    ruta = valor if isinstance(valor, str) else os.path.join(directorio, NOMBRE_BASE_DEFECTO)
+    configurar(ruta, params.get('idEjecucion'), proceso)
+
+
+def activo():
+    return _ajuste.valor() is not None
+
+
+def ruta_actual():
+    configuracion = _ajuste.valor()
+    return configuracion['ruta'] if configuracion else None
+
+
+def registrar(plataforma, objetivo, datos):
+    """
+    Añade el resultado al lote pendiente; el lote se escribe al llenarse o
+    al pasar INTERVALO_VACIADO segundos desde la última escritura
+    """
+    configuracion = _ajuste.valor()
+    existe = datos.get(CAMPOS_EXISTENCIA[plataforma])
+    fila = (
+        configuracion['id_ejecucion'], plataforma, normalizar_objetivo(objetivo),
+        None if existe is None else int(bool(existe)), datos.get('metodo'), time.time(),
+        json.dumps(datos, ensure_ascii=False, default=str)
+    )
+    with _lock:
+        _pendientes.append((configuracion['ruta'], fila))
+        lleno = len(_pendientes) >= TAMANIO_LOTE or time.time() - _ultimo_vaciado >= INTERVALO_VACIADO
+    if lleno:
+        vaciar()
+    return configuracion['ruta']
+
+
+def vaciar():
+    """
+    Escribe los resultados pendientes, una transacción por base
+    """
+    global _pendientes, _ultimo_vaciado
+    with _lock:
+        lote, _pendientes = _pendientes, []
+        _ultimo_vaciado = time.time()
+    por_ruta = {}
+    for ruta, fila in lote:
+        por_ruta.setdefault(ruta, []).append(fila)
+    for ruta, filas in por_ruta.items():
+        try:
+            with _conexion(ruta) as conexion:
+                conexion.executemany(
+                    'INSERT INTO resultados (id_ejecucion, plataforma, objetivo, existe, metodo, fecha, datos) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    filas
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ No se pudieron guardar {len(filas)} resultados en {ruta}: {str(e)}")
+
+
+atexit.register(vaciar)
+
+
+def guardar_datos(directorio, nombre_archivo, plataforma, objetivo, datos):
+    """
+    Guarda los datos de un objetivo en el almacén si está activo o, si no,
+    en `directorio`/`nombre_archivo` como hasta ahora. Devuelve la ruta
+    """
+    if activo():
+        return registrar(plataforma, objetivo, datos)
+    archivo_salida = os.path.join(directorio, nombre_archivo)
+    with open(archivo_salida, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+    return archivo_salida
+
+
+def registrar_reutilizado(plataforma, parametros, resultado):
+    """
+    Un resultado servido por la caché de resultados no pasa por el
+    extractor; se registra igualmente para que la ejecución quede completa
+    """
+    if not (resultado and resultado.get('exito') and 'cache_resultado' in resultado):
+        return resultado
+    try:
+        params = json.loads(parametros)
+        configurar_desde_parametros(params, params.get('directorio', 'scraped_data'))
+        if activo():
+            registrar(plataforma, params.get('pageName' if plataforma == 'facebook' else 'username', ''),
+                      resultado['datos'])
+    except (TypeError, ValueError, AttributeError, KeyError, OSError) as e:
+        print(f"⚠️ No se pudo registrar el resultado reutilizado: {str(e)}")
+    return resultado
+
+
+def _filas(cursor):
+    filas = []
+    for fila in cursor:
+        registro = dict(zip(COLUMNAS, fila))
+        registro['existe'] = None if registro['existe'] is None else bool(registro['existe'])
+        registro['fecha'] = datetime.fromtimestamp(registro['fecha']).isoformat()
+        registro['datos'] = json.loads(registro['datos'])
+        filas.append(registro)
+    return filas
+
+
+def ultimo_veredicto_por_objetivo(ruta, plataforma=None):
+    """
+    Último resultado guardado de cada objetivo (de cualquier ejecución)
+    """
+    filtro, valores = ('WHERE plataforma = ?', (plataforma,)) if plataforma else ('', ())
+    with _conexion(ruta) as conexion:
+        return _filas(conexion.execute(
+            f'SELECT {", ".join(COLUMNAS)} FROM resultados WHERE id IN ('
+            f'SELECT MAX(id) FROM resultados {filtro} GROUP BY plataforma, objetivo) ORDER BY id',
+            valores
+        ))
+
+
+def resultados_de_ejecucion(ruta, id_ejecucion):
+    """
+    Todos los resultados de una ejecución, en el orden en que se guardaron
+    """
+    with _conexion(ruta) as conexion:
+        return _filas(conexion.execute(
+            f'SELECT {", ".join(COLUMNAS)} FROM resultados WHERE id_ejecucion = ? ORDER BY id',
+            (id_ejecucion,)
+        ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Consultas sobre el almacén de resultados (salida NDJSON)')
+    parser.add_argument('base', help='Archivo SQLite del almacén')
+    consultas = parser.add_subparsers(dest='consulta', required=True)
+    ultimos = consultas.add_parser('ultimos', help='Último veredicto de cada objetivo')
+    ultimos.add_argument('--plataforma', choices=tuple(CAMPOS_EXISTENCIA), default=None)
+    ejecucion = consultas.add_parser('ejecucion', help='Todos los resultados de una ejecución')
+    ejecucion.add_argument('id_ejecucion')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.base):
+        print(json.dumps({'exito': False, 'error': f'No existe el almacén {args.base}'}))
+        return 1
+    if args.consulta == 'ultimos':
+        filas = ultimo_veredicto_por_objetivo(args.base, args.plataforma)
+    else:
+        filas = resultados_de_ejecucion(args.base, args.id_ejecucion)
+    for fila in filas:
+        sys.stdout.write(json.dumps(fila, ensure_ascii=False) + '\n')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
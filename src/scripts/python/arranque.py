@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Carga diferida de dependencias opcionales y reporte de coste de arranque.
+
+facebook_scraper e instaloader solo se importan la primera vez que se usan,
+así la mayoría de invocaciones no pagan su import (ni el aviso que imprime
+facebook_scraper al cargarse). `reporte_arranque` mide en un intérprete
+limpio cuánto cuesta importar cada script y lo compara con un presupuesto.
+"""
+import os
+import sys
+import json
+import time
+import threading
+import importlib
+import importlib.util
+import subprocess
+
+# Presupuesto de arranque en frío por defecto (import del script), en ms
+PRESUPUESTO_ARRANQUE_MS = 400
+
+_lock = threading.Lock()
+_modulos = {}
+
+
+def esta_instalado(nombre):
+    """
+    Indica si un módulo está instalado sin importarlo
+    """
+    try:
+        return importlib.util.find_spec(nombre) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def cargar_opcional(nombre, aviso=None):
+    """
+    Importa `nombre` la primera vez que se pide y lo reutiliza después.
+    Devuelve None (e imprime `aviso` una sola vez) si no se puede importar
+    """
+    with _lock:
+        if nombre not in _modulos:
+            try:
+                _modulos[nombre] = importlib.import_module(nombre)
+            except Exception:
+                _modulos[nombre] = None
+                if aviso:
+                    print(aviso, file=sys.stderr)
+        return _modulos[nombre]
+
+
+def _medir_importacion(directorio, modulo):
+    """
+    Importa `modulo` en un intérprete nuevo con -X importtime y devuelve
+    (ms del proceso completo, ms acumulados del import de `modulo`,
+    {import directo de `modulo`: ms acumulados})
+    """
+    codigo = f"import sys; sys.path.insert(0, {directorio!r}); import {modulo}"
+    inicio = time.perf_counter()
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', codigo],
+        capture_output=True, text=True
+    )
+    total_ms = (time.perf_counter() - inicio) * 1000
+    if proceso.returncode != 0:
+        return None, None, {}
+
+    # importtime imprime los hijos antes que el padre: los imports de nivel 1
+    # acumulados justo antes de la línea de nivel 0 de `modulo` son los suyos
+    hijos = {}
+    importacion_ms = None
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith('import time:') or '|' not in linea:
+            continue
+        partes = linea.split('|')
+        if not partes[1].strip().isdigit():
+            continue  # cabecera
+        columna = partes[2][1:]
+        nombre = columna.strip()
+        nivel = (len(columna) - len(columna.lstrip())) // 2
+        acumulado_ms = round(int(partes[1]) / 1000, 1)
+        if nivel == 1:
+            hijos[nombre] = acumulado_ms
+        elif nivel == 0:
+            if nombre == modulo:
+                importacion_ms = acumulado_ms
+                break
+            hijos = {}
+    return round(total_ms, 1), importacion_ms, hijos
+
+
+def reporte_arranque(ruta_script, argumentos, dependencias_diferidas=()):
+    """
+    Imprime en JSON el coste de arranque del script (intérprete + imports),
+    el desglose por paquete y lo que costarían las dependencias diferidas.
+    Devuelve 0 si está dentro del presupuesto (--presupuesto-ms N) y 1 si no
+    """
+    presupuesto = PRESUPUESTO_ARRANQUE_MS
+    if '--presupuesto-ms' in argumentos:
+        try:
+            presupuesto = float(argumentos[argumentos.index('--presupuesto-ms') + 1])
+        except (IndexError, ValueError):
+            print(json.dumps({
+                'exito': False,
+                'error': 'Parámetros incorrectos',
+                'mensaje': '--presupuesto-ms necesita un número de milisegundos'
+            }, ensure_ascii=False))
+            return 1
+
+    directorio = os.path.dirname(os.path.abspath(ruta_script))
+    modulo = os.path.splitext(os.path.basename(ruta_script))[0]
+
+    vacio_ms = _medir_importacion(directorio, 'sys')[0]
+    total_ms, importacion_ms, por_paquete = _medir_importacion(directorio, modulo)
+    if total_ms is None:
+        print(json.dumps({'exito': False, 'error': f'No se pudo importar {modulo}'}, ensure_ascii=False))
+        return 1
+
+    reporte = {
+        'exito': True,
+        'modulo': modulo,
+        'arranque_total_ms': total_ms,
+        'interprete_ms': vacio_ms,
+        'importaciones_ms': importacion_ms,
+        'desglose_ms': dict(sorted(por_paquete.items(), key=lambda p: p[1], reverse=True)),
+        'dependencias_diferidas_ms': {
+            nombre: (_medir_importacion(directorio, nombre)[1] if esta_instalado(nombre) else None)
+            for nombre in dependencias_diferidas
+        },
+        'presupuesto_ms': presupuesto,
+        'dentro_presupuesto': (importacion_ms or 0) <= presupuesto
+    }
+    print(json.dumps(reporte, ensure_ascii=False, indent=2))
+    return 0 if reporte['dentro_presupuesto'] else 1
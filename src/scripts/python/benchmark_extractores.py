@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Benchmark sin red de los extractores de Facebook e Instagram.
+
+Arranca servidor_sustituto.py en local y apunta los extractores a él con
+configurar_url_base al arrancar cada proceso. Cada plataforma corre en su propio proceso (así el pico de RSS y
+el tiempo de CPU son los de ese módulo), dentro de un directorio temporal
+vacío (sin sesiones, cachés ni historial de estrategias previos) y con
+instaloader / facebook_scraper desactivados para no salir a la red.
+
+Por cada plataforma informa latencia por objetivo (p50, p90, p95, p99,
+máximo y mediana por caso), páginas por segundo, tiempo de CPU, pico de
+RSS y cuántos veredictos de existencia coinciden con lo esperado.
+
+Uso: python benchmark_extractores.py [--objetivos N] [--plataformas facebook,instagram]
+         [--concurrencia N] [--latencia-ms N] [--fixtures DIR] [--parser-html html.parser|lxml|selectolax|auto] [--adaptativo] [--perfil DIR]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import importlib
+import statistics
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from servidor_sustituto import ServidorSustituto, CASOS_FACEBOOK, CASOS_INSTAGRAM, EXISTENCIA_ESPERADA, caso_de
+
+EXTRACTORES = {
+    'facebook': ('facebook_page_scraper_simple', 'extraer_pagina_facebook_simple', 'pageName',
+                 'pagina_existe', 'FACEBOOK_SCRAPER_DISPONIBLE'),
+    'instagram': ('instagram_profile_scraper_simple', 'extraer_perfil_instagram_simple', 'username',
+                  'usuario_existe', 'INSTALOADER_DISPONIBLE')
+}
+CASOS = {'facebook': CASOS_FACEBOOK, 'instagram': CASOS_INSTAGRAM}
+
+
+def percentil(valores, fraccion):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * fraccion))]
+
+
+def pico_rss_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB y macOS en bytes
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def ejecutar_plataforma(plataforma, url_base, objetivos_por_caso, concurrencia, parser_html, adaptativo, perfil=None):
+    """
+    Corre todos los objetivos de una plataforma en este proceso y devuelve
+    sus medidas (se llama en el proceso hijo)
+    """
+    perfil = os.path.abspath(perfil) if isinstance(perfil, str) else perfil  # antes de cambiar de directorio
+    directorio_trabajo = tempfile.mkdtemp(prefix=f'benchmark_{plataforma}_')
+    os.chdir(directorio_trabajo)  # antes de importar: las rutas de estado usan el cwd
+    from red_scraping import configurar_url_base
+    configurar_url_base(url_base)
+
+    nombre_modulo, nombre_funcion, clave, campo_existencia, bandera_alternativa = EXTRACTORES[plataforma]
+    modulo = importlib.import_module(nombre_modulo)
+    setattr(modulo, bandera_alternativa, False)
+    extraer = getattr(modulo, nombre_funcion)
+    rss_tras_importar = pico_rss_mb()
+
+    objetivos = [f'{caso}-{i:03d}' for caso in CASOS[plataforma] for i in range(objetivos_por_caso)]
+
+    def medir(objetivo):
+        parametros = json.dumps({
+            clave: objetivo, 'directorio': 'scraped_data', 'parserHtml': parser_html,
+            'ordenAdaptativo': adaptativo, 'cortacircuitos': adaptativo,
+            'reintentosMaximos': 0, **({'perfil': perfil} if perfil else {})
+        })
+        inicio = time.perf_counter()
+        resultado = extraer(parametros)
+        latencia = (time.perf_counter() - inicio) * 1000
+        existe = (resultado.get('datos') or {}).get(campo_existencia)
+        return objetivo, latencia, existe == EXISTENCIA_ESPERADA[plataforma][caso_de(objetivo)], resultado.get('exito')
+
+    try:
+        cpu_inicio, inicio = time.process_time(), time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, concurrencia)) as executor:
+            medidas = list(executor.map(medir, objetivos))
+        duracion, cpu = time.perf_counter() - inicio, time.process_time() - cpu_inicio
+    finally:
+        import estadisticas_estrategias
+        estadisticas_estrategias.guardar()  # antes de borrar el directorio donde vive su base
+        os.chdir(os.path.dirname(directorio_trabajo))
+        shutil.rmtree(directorio_trabajo, ignore_errors=True)
+
+    latencias = [latencia for _, latencia, _, _ in medidas]
+    por_caso = {}
+    for objetivo, latencia, _, _ in medidas:
+        por_caso.setdefault(caso_de(objetivo), []).append(latencia)
+    return {
+        'objetivos': len(objetivos),
+        'exitosos': sum(1 for *_, exito in medidas if exito),
+        'veredictos_esperados': sum(1 for _, _, acierto, _ in medidas if acierto),
+        'fallos_de_veredicto': [objetivo for objetivo, _, acierto, _ in medidas if not acierto],
+        'latencia_ms': {
+            'p50': round(percentil(latencias, 0.5), 1),
+            'p90': round(percentil(latencias, 0.9), 1),
+            'p95': round(percentil(latencias, 0.95), 1),
+            'p99': round(percentil(latencias, 0.99), 1),
+            'max': round(max(latencias), 1),
+            'mediana_por_caso': {caso: round(statistics.median(valores), 1) for caso, valores in por_caso.items()}
+        },
+        'paginas_por_segundo': round(len(objetivos) / duracion, 2),
+        'duracion_s': round(duracion, 3),
+        'cpu_s': round(cpu, 3),
+        'rss_tras_importar_mb': rss_tras_importar,
+        'rss_pico_mb': pico_rss_mb()
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark sin red de los extractores contra un servidor local')
+    parser.add_argument('--objetivos', type=int, default=5, help='Objetivos por caso')
+    parser.add_argument('--plataformas', default='facebook,instagram')
+    parser.add_argument('--concurrencia', type=int, default=1, help='Extracciones simultáneas')
+    parser.add_argument('--latencia-ms', type=float, default=0, help='Latencia añadida a cada respuesta del servidor')
+    parser.add_argument('--fixtures', default=None, help='Directorio con páginas guardadas (<plataforma>_<caso>.html)')
+    # El mismo que usan los extractores por defecto (documento_html se importa después del chdir)
+    parser.add_argument('--parser-html', default='html.parser')
+    parser.add_argument('--adaptativo', action='store_true',
+                        help='Mantener orden adaptativo y cortacircuitos (por defecto desactivados: resultados reproducibles)')
+    parser.add_argument('--perfil', default=None, metavar='DIR',
+                        help='Guardar perfiles por objetivo y pilas colapsadas de cada plataforma en DIR')
+    parser.add_argument('--ejecutar', choices=tuple(EXTRACTORES), help=argparse.SUPPRESS)
+    parser.add_argument('--url-base', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.ejecutar:
+        from registro_eventos import modo_maquina
+        salida = modo_maquina('ninguno')  # el proceso hijo solo escribe sus medidas en stdout
+        medidas = ejecutar_plataforma(args.ejecutar, args.url_base, max(1, args.objetivos), args.concurrencia,
+                                      args.parser_html, args.adaptativo, args.perfil)
+        salida.write(json.dumps(medidas, ensure_ascii=False) + '\n')
+        salida.flush()
+        return 0
+
+    plataformas = [p for p in args.plataformas.split(',') if p in EXTRACTORES]
+    resultados = {}
+    with ServidorSustituto(args.latencia_ms, args.fixtures) as servidor:
+        for plataforma in plataformas:
+            comando = [
+                sys.executable, os.path.abspath(__file__), '--ejecutar', plataforma, '--url-base', servidor.url_base,
+                '--objetivos', str(args.objetivos), '--concurrencia', str(args.concurrencia),
+                '--parser-html', args.parser_html
+            ] + (['--adaptativo'] if args.adaptativo else []) + (['--perfil', args.perfil] if args.perfil else [])
+            entorno = {**os.environ, 'PYTHONPATH': os.pathsep.join(
+                filter(None, [os.path.dirname(os.path.abspath(__file__)), os.environ.get('PYTHONPATH')])
+            )}
+            proceso = subprocess.run(comando, capture_output=True, text=True, env=entorno)
+            if proceso.returncode != 0:
+                resultados[plataforma] = {'exito': False, 'error': proceso.stderr.strip()[-2000:]}
+                continue
+            resultados[plataforma] = json.loads(proceso.stdout.strip().splitlines()[-1])
+        peticiones = servidor.peticiones
+
+    print(json.dumps({
+        'exito': all('error' not in r for r in resultados.values()),
+        'objetivos_por_caso': args.objetivos,
+        'concurrencia': args.concurrencia,
+        'latencia_servidor_ms': args.latencia_ms,
+        'peticiones_servidor': peticiones,
+        'plataformas': resultados
+    }, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark del tiempo de parseo por página de cada backend de documento_html.
+
+Por cada página se mide el parseo más las consultas que hacen los
+extractores (título, metas, scripts, imágenes, texto visible e input de
+login). Sin argumentos usa páginas sintéticas parecidas a las de Facebook
+(cabecera con scripts en línea enormes) e Instagram (_sharedData, ld+json);
+también acepta archivos .html o directorios con páginas guardadas.
+
+Uso: python benchmark_parsers.py [archivo.html|directorio ...] [--repeticiones N] [--parsers lxml,selectolax]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+from documento_html import analizar, parser_disponible, PARSERS_HTML
+
+
+def pagina_facebook_sintetica():
+    scripts = ''.join(
+        f'<script type="application/json" data-sjs>{{"require":[["ScheduledServerJS","handle",null,[{{"__bbox":{{"n":{i},"datos":"{"x" * 2000}"}}}}]]]}}</script>'
+        for i in range(150)
+    )
+    cuerpo = ''.join(
+        f'<div class="x1n2onr6 x1ja2u2z"><div><span dir="auto">Publicación {i} de la página</span>'
+        f'<img src="https://scontent.xx.fbcdn.net/v/t39/{i}.jpg" alt=""></div></div>'
+        for i in range(3000)
+    )
+    return (
+        '<!DOCTYPE html><html lang="es"><head><meta charset="utf-8"><title>Página de ejemplo | Facebook</title>'
+        '<meta name="description" content="Página de ejemplo. 12.345 Me gusta · 678 personas están hablando de esto.">'
+        '<meta property="og:title" content="Página de ejemplo"><meta property="og:description" content="Descripción">'
+        '<meta property="og:image" content="https://scontent.xx.fbcdn.net/v/t39/perfil.jpg">'
+        f'{scripts}</head><body>{cuerpo}</body></html>'
+    )
+
+
+def pagina_instagram_sintetica():
+    compartido = json.dumps({'entry_data': {'ProfilePage': [{'graphql': {'user': {
+        'biography': 'Biografía de ejemplo', 'edge_followed_by': {'count': 1234},
+        'edge_follow': {'count': 56}, 'edge_owner_to_timeline_media': {'count': 78},
+        'profile_pic_url_hd': 'https://scontent.cdninstagram.com/v/t51/perfil.jpg',
+        'edge_media': [{'id': str(i), 'caption': 'y' * 500} for i in range(400)]
+    }}}]}})
+    ld_json = json.dumps({'@type': 'ProfilePage', 'mainEntity': {'description': 'Bio', 'url': 'https://ejemplo.com'}})
+    return (
+        '<!DOCTYPE html><html><head><title>Usuario (@usuario) • Instagram photos and videos</title>'
+        '<meta name="description" content="1,234 Followers, 56 Following, 78 Posts - See Instagram photos and videos">'
+        '<meta property="og:image" content="https://scontent.cdninstagram.com/v/t51/perfil.jpg">'
+        f'<script type="application/ld+json">{ld_json}</script>'
+        + ''.join(f'<script>requireLazy(["m{i}"],function(){{{"z" * 3000}}});</script>' for i in range(100)) +
+        f'</head><body><script type="text/javascript">window._sharedData = {compartido};</script>'
+        + '<div><span>Log in</span><input name="username"><input name="password"></div>' * 50 +
+        '</body></html>'
+    )
+
+
+def consultar(documento):
+    # Las mismas consultas que hacen los extractores sobre cada página
+    documento.titulo()
+    documento.meta(nombre='description')
+    documento.meta(propiedad='og:title')
+    documento.meta(propiedad='og:description')
+    documento.meta(propiedad='og:image')
+    documento.scripts('text/javascript')
+    documento.scripts('application/ld+json')
+    documento.scripts()
+    documento.imagenes()
+    documento.texto()
+    documento.hay_input('username')
+
+
+def cargar_paginas(rutas):
+    paginas = {}
+    for ruta in rutas:
+        archivos = [ruta] if os.path.isfile(ruta) else sorted(
+            os.path.join(ruta, nombre) for nombre in os.listdir(ruta) if nombre.endswith(('.html', '.htm'))
+        )
+        for archivo in archivos:
+            with open(archivo, 'r', encoding='utf-8', errors='replace') as f:
+                paginas[os.path.basename(archivo)] = f.read()
+    return paginas
+
+
+def medir(html, parser, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        consultar(analizar(html, parser))
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {
+        'mediana_ms': round(statistics.median(tiempos), 2),
+        'p95_ms': round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 2),
+        'min_ms': round(tiempos[0], 2)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tiempo de parseo por página de cada backend HTML')
+    parser.add_argument('paginas', nargs='*', help='Archivos .html o directorios (por defecto, páginas sintéticas)')
+    parser.add_argument('--repeticiones', type=int, default=10)
+    parser.add_argument('--parsers', default=','.join(PARSERS_HTML), help='Backends separados por comas')
+    args = parser.parse_args(argv)
+
+    paginas = cargar_paginas(args.paginas) if args.paginas else {
+        'facebook_sintetica': pagina_facebook_sintetica(),
+        'instagram_sintetica': pagina_instagram_sintetica()
+    }
+    parsers = [p for p in args.parsers.split(',') if p]
+    no_disponibles = [p for p in parsers if not parser_disponible(p)]
+    parsers = [p for p in parsers if p not in no_disponibles]
+
+    resultados = {}
+    for nombre, html in paginas.items():
+        por_parser = {p: medir(html, p, max(1, args.repeticiones)) for p in parsers}
+        base = por_parser.get('html.parser', {}).get('mediana_ms')
+        if base:
+            for medidas in por_parser.values():
+                medidas['aceleracion'] = round(base / max(medidas['mediana_ms'], 0.001), 1)
+        resultados[nombre] = {'kb': round(len(html.encode('utf-8')) / 1024, 1), 'parsers': por_parser}
+
+    print(json.dumps({
+        'exito': True,
+        'repeticiones': args.repeticiones,
+        'no_disponibles': no_disponibles,
+        'paginas': resultados
+    }, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
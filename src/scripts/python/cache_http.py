@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Caché HTTP en disco, opcional, por debajo de red_scraping.solicitar.
+
+Las respuestas 200 a peticiones GET se guardan con sus validadores (ETag,
+Last-Modified). En ejecuciones posteriores:
+
+- si la respuesta sigue fresca según la regla de su host, se sirve desde
+  disco sin tocar la red;
+- si no, se envía una petición condicional (If-None-Match /
+  If-Modified-Since) y un 304 se sirve desde disco.
+
+Los cuerpos se guardan por su hash SHA-256 (el mismo contenido bajo varias
+URLs o perfiles ocupa una sola vez) y el índice es una base SQLite que
+comparten los procesos. Cuando el total supera el tamaño máximo se
+eliminan las entradas usadas hace más tiempo (LRU). El total se lleva
+en memoria y solo se recuenta en la base al pasarse del máximo o cada
+RECUENTO_CADA inserciones (para ver lo que añadieron otros procesos).
+
+La clave incluye URL, User-Agent, cookies y si se siguen las redirecciones:
+cada perfil de acceso y cada sesión tiene sus propias entradas, y una
+petición con allow_redirects=False nunca recibe la página final guardada
+por otra que sí las siguió. No se respeta Cache-Control (Facebook
+marca todo como no-store); la frescura la deciden las reglas por host. Las
+respuestas servidas desde la caché no aplican Set-Cookie a la sesión.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from ajustes_extraccion import Ajuste
+
+DIRECTORIO_CACHE_DEFECTO = os.path.join(os.getcwd(), 'cache_http')
+TAMANIO_MAXIMO_MB_DEFECTO = 500
+
+# Segundos durante los que una respuesta se sirve sin preguntar al servidor,
+# por sufijo de host. Los hosts sin regla se revalidan siempre
+FRESCURA_POR_HOST_DEFECTO = {
+    'fbcdn.net': 30 * 86400,
+    'cdninstagram.com': 30 * 86400
+}
+
+# Cabeceras que no se guardan: el cuerpo se guarda ya descomprimido y las
+# cookies no se reproducen desde la caché
+CABECERAS_EXCLUIDAS = ('set-cookie', 'content-encoding', 'content-length', 'transfer-encoding', 'connection')
+
+# Inserciones entre recuentos del tamaño total en la base
+RECUENTO_CADA = 100
+
+_ajuste = Ajuste('cache_http')
+_lock = threading.Lock()
+_preparadas = set()
+_totales = {}  # directorio -> [bytes estimados de los cuerpos o None, inserciones desde el último recuento]
+
+
+def _preparar(directorio):
+    # Estructura de la caché, una vez por directorio y proceso
+    with _lock:
+        if directorio in _preparadas:
+            return
+        os.makedirs(os.path.join(directorio, 'cuerpos'), exist_ok=True)
+        conexion = sqlite3.connect(os.path.join(directorio, 'indice.sqlite3'), timeout=30)
+        try:
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('''
+                CREATE TABLE IF NOT EXISTS respuestas (
+                    clave TEXT PRIMARY KEY,
+                    url TEXT,
+                    url_final TEXT,
+                    hash TEXT,
+                    tamanio INTEGER,
+                    estado INTEGER,
+                    cabeceras TEXT,
+                    etag TEXT,
+                    ultima_modificacion TEXT,
+                    guardada_en REAL,
+                    ultimo_uso REAL
+                )
+            ''')
+            conexion.execute('CREATE INDEX IF NOT EXISTS idx_respuestas_ultimo_uso ON respuestas(ultimo_uso)')
+            conexion.execute('CREATE INDEX IF NOT EXISTS idx_respuestas_hash ON respuestas(hash)')
+            conexion.commit()
+        finally:
+            conexion.close()
+        _preparadas.add(directorio)
+
+
+def configurar(directorio=None, tamanio_maximo_mb=None, frescura_por_host=None, proceso=True):
+    """
+    Activa la caché en `directorio` para todo el proceso o, con
+    proceso=False, solo para la extracción en curso
+    """
+    configuracion = {
+        'directorio': os.path.abspath(directorio or DIRECTORIO_CACHE_DEFECTO),
+        'tamanio_maximo': int((tamanio_maximo_mb or TAMANIO_MAXIMO_MB_DEFECTO) * 1024 * 1024),
+        'frescura_por_host': {**FRESCURA_POR_HOST_DEFECTO, **(frescura_por_host or {})}
+    }
+    _preparar(configuracion['directorio'])
+    _ajuste.fijar(configuracion, proceso)
+
+
+def configurar_desde_parametros(params, proceso=False):
+    """
+    Parámetros del extractor: cacheHttp (true o directorio; false la
+    desactiva), cacheHttpMaxMb, frescuraCacheHttp ({host: segundos}). Sin
+    cacheHttp se mantiene la configuración del proceso
+    """
+    if 'cacheHttp' not in params:
+        return
+    valor = params['cacheHttp']
+    if not valor:
+        _ajuste.fijar(None, proceso)
+        return
+    configurar(
+        directorio=valor if isinstance(valor, str) else None,
+        tamanio_maximo_mb=params.get('cacheHttpMaxMb'),
+        frescura_por_host=params.get('frescuraCacheHttp'),
+        proceso=proceso
+    )
+
+
+def activa():
+    return _ajuste.valor() is not None
+
+
+def _conectar():
+    conexion = sqlite3.connect(os.path.join(_ajuste.valor()['directorio'], 'indice.sqlite3'), timeout=30)
+    conexion.row_factory = sqlite3.Row
+    return conexion
+
+
+@contextmanager
+def _indice():
+    # Una conexión por operación: la caché se usa desde varios hilos y procesos
+    conexion = _conectar()
+    try:
+        with conexion:
+            yield conexion
+    finally:
+        conexion.close()
+
+
+def frescura(host):
+    """
+    Segundos de frescura del host según la regla de sufijo más específica
+    """
+    mejor = None
+    for sufijo, segundos in _ajuste.valor()['frescura_por_host'].items():
+        if host == sufijo or host.endswith('.' + sufijo):
+            if mejor is None or len(sufijo) > len(mejor[0]):
+                mejor = (sufijo, segundos)
+    return mejor[1] if mejor else 0
+
+
+def _clave(session, url, headers, params, allow_redirects=True):
+    peticion = session.prepare_request(requests.Request('GET', url, headers=headers, params=params))
+    partes = [
+        'GET', peticion.url, peticion.headers.get('User-Agent', ''), peticion.headers.get('Cookie', ''),
+        'redirecciones' if allow_redirects else 'sin_redirecciones'
+    ]
+    return hashlib.sha256('\n'.join(partes).encode('utf-8')).hexdigest()
+
+
+def _ruta_cuerpo(huella):
+    return os.path.join(_ajuste.valor()['directorio'], 'cuerpos', huella[:2], huella)
+
+
+def _leer_cuerpo(huella):
+    try:
+        with open(_ruta_cuerpo(huella), 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _guardar_cuerpo(contenido):
+    """
+    Guarda el cuerpo por su hash. Devuelve (hash, True si no existía)
+    """
+    huella = hashlib.sha256(contenido).hexdigest()
+    ruta = _ruta_cuerpo(huella)
+    if os.path.exists(ruta):
+        return huella, False
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = f'{ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporal, 'wb') as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
+    return huella, True
+
+
+def _respuesta_desde_cache(entrada, contenido):
+    respuesta = requests.Response()
+    respuesta.status_code = entrada['estado']
+    respuesta.reason = 'OK'
+    respuesta.headers = CaseInsensitiveDict(json.loads(entrada['cabeceras']))
+    respuesta.url = entrada['url_final']
+    respuesta.encoding = get_encoding_from_headers(respuesta.headers)
+    respuesta._content = contenido
+    respuesta._content_consumed = True
+    respuesta.desde_cache = True
+    return respuesta
+
+
+def _almacenar(clave, url, respuesta, momento):
+    etag = respuesta.headers.get('ETag')
+    ultima_modificacion = respuesta.headers.get('Last-Modified')
+    host = (urlparse(url).hostname or '').lower()
+    # Sin validadores ni frescura no hay forma de aprovechar la entrada
+    if not etag and not ultima_modificacion and not frescura(host):
+        return
+    contenido = respuesta.content
+    if len(contenido) > _ajuste.valor()['tamanio_maximo'] // 10:
+        return
+    cabeceras = {k: v for k, v in respuesta.headers.items() if k.lower() not in CABECERAS_EXCLUIDAS}
+    huella, nuevo = _guardar_cuerpo(contenido)
+    with _indice() as conexion:
+        conexion.execute(
+            'INSERT OR REPLACE INTO respuestas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (clave, url, respuesta.url, huella, len(contenido), respuesta.status_code, json.dumps(cabeceras),
+             etag, ultima_modificacion, momento, momento)
+        )
+    _recortar(len(contenido) if nuevo else 0)
+
+
+def _recortar(anadidos):
+    """
+    Suma `anadidos` bytes al total estimado y, si se pasa del máximo (o
+    toca recontar), elimina las entradas menos usadas recientemente hasta
+    quedar por debajo; un cuerpo se borra cuando ninguna entrada lo usa
+    """
+    configuracion = _ajuste.valor()
+    with _lock:
+        total = _totales.setdefault(configuracion['directorio'], [None, 0])
+        if total[0] is not None:
+            total[0] += anadidos
+        total[1] += 1
+        if total[0] is not None and total[0] <= configuracion['tamanio_maximo'] and total[1] < RECUENTO_CADA:
+            return
+        total[1] = 0
+
+    conexion = _conectar()
+    try:
+        while True:
+            bytes_cuerpos = conexion.execute(
+                'SELECT COALESCE(SUM(tamanio), 0) FROM (SELECT MAX(tamanio) AS tamanio FROM respuestas GROUP BY hash)'
+            ).fetchone()[0]
+            with _lock:
+                total[0] = bytes_cuerpos
+            if bytes_cuerpos <= configuracion['tamanio_maximo']:
+                return
+            antiguas = conexion.execute(
+                'SELECT clave, hash FROM respuestas ORDER BY ultimo_uso LIMIT 50'
+            ).fetchall()
+            if not antiguas:
+                return
+            with conexion:
+                conexion.executemany('DELETE FROM respuestas WHERE clave = ?', [(fila['clave'],) for fila in antiguas])
+            for huella in {fila['hash'] for fila in antiguas}:
+                if conexion.execute('SELECT 1 FROM respuestas WHERE hash = ? LIMIT 1', (huella,)).fetchone() is None:
+                    try:
+                        os.remove(_ruta_cuerpo(huella))
+                    except OSError:
+                        pass
+    finally:
+        conexion.close()
+
+
+def solicitar_con_cache(session, url, enviar, kwargs):
+    """
+    GET a través de la caché. `enviar(**kwargs)` hace la petición real
+    (con el límite por host y la cancelación de red_scraping)
+    """
+    headers = dict(kwargs.get('headers') or {})
+    clave = _clave(session, url, headers, kwargs.get('params'), kwargs.get('allow_redirects', True))
+    host = (urlparse(url).hostname or '').lower()
+    ahora = time.time()
+
+    with _indice() as conexion:
+        entrada = conexion.execute('SELECT * FROM respuestas WHERE clave = ?', (clave,)).fetchone()
+    contenido = _leer_cuerpo(entrada['hash']) if entrada else None
+
+    if contenido is not None:
+        if ahora - entrada['guardada_en'] < frescura(host):
+            with _indice() as conexion:
+                conexion.execute('UPDATE respuestas SET ultimo_uso = ? WHERE clave = ?', (ahora, clave))
+            return _respuesta_desde_cache(entrada, contenido)
+        if entrada['etag']:
+            headers['If-None-Match'] = entrada['etag']
+        if entrada['ultima_modificacion']:
+            headers['If-Modified-Since'] = entrada['ultima_modificacion']
+
+    respuesta = enviar(**{**kwargs, 'headers': headers})
+
+    if respuesta.status_code == 304 and contenido is not None:
+        respuesta.close()
+        with _indice() as conexion:
+            conexion.execute(
+                'UPDATE respuestas SET guardada_en = ?, ultimo_uso = ?, etag = COALESCE(?, etag) WHERE clave = ?',
+                (ahora, ahora, respuesta.headers.get('ETag'), clave)
+            )
+        return _respuesta_desde_cache(entrada, contenido)
+
+    if respuesta.status_code == 200 and not kwargs.get('stream'):
+        try:
+            _almacenar(clave, url, respuesta, ahora)
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️ No se pudo guardar la respuesta en la caché HTTP: {str(e)}")
+    return respuesta
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Caché persistente de resultados por objetivo (página de Facebook o
+usuario de Instagram).
+
+Las listas combinadas repiten muchos objetivos; si uno ya se resolvió hace
+poco (existe, no existe o bloqueado) no se vuelve a extraer. Se guarda el
+resultado completo del extractor con la hora, en una base SQLite que
+comparten los procesos, bajo el objetivo normalizado y las opciones que
+dan forma al resultado (OPCIONES_RESULTADO: un resultado de solo cabecera
+o guardado en otro directorio no se sirve a otra petición). Los veredictos
+negativos se guardan también, con su propio TTL. Los errores y los
+veredictos dudosos (ej: HTTP 500) no se guardan.
+
+Parámetros del extractor: cacheResultados (true para activarla; por
+defecto cada llamada extrae en vivo), forzarActualizacion, ttlResultado y
+ttlResultadoNegativo (segundos).
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+ARCHIVO_CACHE_RESULTADOS = os.path.join(os.getcwd(), 'cache_resultados', 'resultados.sqlite3')
+
+# Segundos durante los que un veredicto positivo / negativo se reutiliza
+TTL_RESULTADO_DEFECTO = 86400
+TTL_RESULTADO_NEGATIVO_DEFECTO = 86400
+
+# Parámetros que cambian el resultado, con su valor por defecto en los extractores
+OPCIONES_RESULTADO = {
+    'directorio': 'scraped_data',
+    'maxPosts': 10,
+    'incluirComentarios': False,
+    'incluirReacciones': True,
+    'soloCabecera': False,
+    'parserHtml': None
+}
+
+# Campo de existencia dentro de 'datos' por plataforma
+CAMPOS_EXISTENCIA = {
+    'facebook': 'pagina_existe',
+    'instagram': 'usuario_existe'
+}
+
+_lock = threading.Lock()
+_inicializada = False
+
+
+@contextmanager
+def _conexion():
+    global _inicializada
+    conexion = sqlite3.connect(ARCHIVO_CACHE_RESULTADOS, timeout=30)
+    try:
+        with _lock:
+            if not _inicializada:
+                conexion.execute('PRAGMA journal_mode=WAL')
+                conexion.execute('''
+                    CREATE TABLE IF NOT EXISTS resultados_por_opciones (
+                        plataforma TEXT,
+                        objetivo TEXT,
+                        opciones TEXT,
+                        existe INTEGER,
+                        resultado TEXT,
+                        guardado_en REAL,
+                        PRIMARY KEY (plataforma, objetivo, opciones)
+                    )
+                ''')
+                conexion.commit()
+                _inicializada = True
+        with conexion:
+            yield conexion
+    finally:
+        conexion.close()
+
+
+def normalizar_objetivo(objetivo):
+    """
+    'Página/' , '@pagina' y ' pagina ' son el mismo objetivo
+    """
+    return (objetivo or '').strip().lstrip('@').strip('/').lower()
+
+
+def clave_opciones(params):
+    """
+    Opciones que dan forma al resultado, normalizadas (el directorio como
+    ruta absoluta), como texto para la clave
+    """
+    opciones = {nombre: params.get(nombre, defecto) for nombre, defecto in OPCIONES_RESULTADO.items()}
+    opciones['directorio'] = os.path.abspath(opciones['directorio'] or OPCIONES_RESULTADO['directorio'])
+    return json.dumps(opciones, sort_keys=True)
+
+
+def veredicto_definitivo(plataforma, datos):
+    """
+    True/False si el resultado dice con seguridad si el objetivo existe,
+    None si el veredicto no es fiable y no debe guardarse
+    """
+    if not isinstance(datos, dict):
+        return None
+    if datos.get(CAMPOS_EXISTENCIA[plataforma]):
+        return True
+    if plataforma == 'facebook':
+        # Página no encontrada / bloqueada (200 clasificado) o 404; el resto son errores HTTP
+        return False if datos.get('codigo_respuesta') in (200, 404) else None
+    # Instagram solo marca 'error' cuando la página dice que no está disponible
+    return False if datos.get('error') else None
+
+
+def consultar(plataforma, objetivo, opciones, ttl=TTL_RESULTADO_DEFECTO, ttl_negativo=TTL_RESULTADO_NEGATIVO_DEFECTO):
+    """
+    Devuelve el resultado guardado con las mismas `opciones` (ver
+    clave_opciones) si sigue vigente, o None
+    """
+    with _conexion() as conexion:
+        fila = conexion.execute(
+            'SELECT existe, resultado, guardado_en FROM resultados_por_opciones '
+            'WHERE plataforma = ? AND objetivo = ? AND opciones = ?',
+            (plataforma, normalizar_objetivo(objetivo), opciones)
+        ).fetchone()
+    if fila is None:
+        return None
+    existe, resultado, guardado_en = fila
+    edad = time.time() - guardado_en
+    if edad > (ttl if existe else ttl_negativo):
+        return None
+    resultado = json.loads(resultado)
+    resultado['cache_resultado'] = {
+        'guardado_en': datetime.fromtimestamp(guardado_en).isoformat(),
+        'edad_segundos': round(edad)
+    }
+    return resultado
+
+
+def guardar(plataforma, objetivo, opciones, resultado):
+    """
+    Guarda el resultado si trae un veredicto definitivo de existencia
+    """
+    existe = veredicto_definitivo(plataforma, resultado.get('datos'))
+    if existe is None:
+        return
+    with _conexion() as conexion:
+        conexion.execute(
+            'INSERT OR REPLACE INTO resultados_por_opciones VALUES (?, ?, ?, ?, ?, ?)',
+            (plataforma, normalizar_objetivo(objetivo), opciones, int(existe),
+             json.dumps(resultado, ensure_ascii=False, default=str), time.time())
+        )
+
+
+def con_cache_resultados(plataforma, campo_objetivo, parametros, extraer):
+    """
+    Envuelve un extractor: con cacheResultados devuelve el resultado
+    guardado si está vigente (salvo forzarActualizacion) y guarda el nuevo
+    resultado tras extraer
+    """
+    try:
+        params = json.loads(parametros)
+        objetivo = params.get(campo_objetivo, '')
+        opciones = clave_opciones(params)
+    except (TypeError, ValueError, AttributeError):
+        return extraer(parametros)  # el extractor informa del error
+    if not normalizar_objetivo(objetivo) or not params.get('cacheResultados', False):
+        return extraer(parametros)
+
+    try:
+        os.makedirs(os.path.dirname(ARCHIVO_CACHE_RESULTADOS), exist_ok=True)
+        if not params.get('forzarActualizacion', False):
+            previo = consultar(
+                plataforma, objetivo, opciones,
+                params.get('ttlResultado', TTL_RESULTADO_DEFECTO),
+                params.get('ttlResultadoNegativo', TTL_RESULTADO_NEGATIVO_DEFECTO)
+            )
+            if previo is not None:
+                print(f"♻️ Resultado en caché para {objetivo} (hace {previo['cache_resultado']['edad_segundos']}s)")
+                return previo
+    except (OSError, sqlite3.Error) as e:
+        print(f"⚠️ No se pudo consultar la caché de resultados: {str(e)}")
+
+    resultado = extraer(parametros)
+    if resultado and resultado.get('exito'):
+        try:
+            guardar(plataforma, objetivo, opciones, resultado)
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️ No se pudo guardar en la caché de resultados: {str(e)}")
+    return resultado
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Caché con TTL del veredicto de validez de una sesión (conjunto de cookies).
+
+Verificar una sesión cuesta una carga completa de la portada de Facebook.
+El veredicto se guarda por huella de las cookies (hash de nombre, valor,
+dominio y ruta) en una base SQLite pequeña que comparten las invocaciones
+sucesivas y los procesos en paralelo (estado_compartido.py), y se
+invalida en cuanto una petición con esa sesión devuelve un muro de login.
+Cada veredicto es una entrada propia escrita en su transacción, así la
+invalidación de un proceso no la pisa otro que registra otra sesión.
+"""
+import json
+import time
+import hashlib
+import sqlite3
+
+import estado_compartido
+
+# Segundos durante los que un veredicto se considera vigente
+TTL_VALIDACION_DEFECTO = 600
+
+
+def huella_cookies(cookies):
+    """
+    Calcula un hash estable de un cookie jar de requests (o de una lista de
+    cookies de Playwright)
+    """
+    elementos = []
+    for cookie in cookies:
+        if isinstance(cookie, dict):
+            elementos.append((cookie.get('name'), cookie.get('value'), cookie.get('domain'), cookie.get('path', '/')))
+        else:
+            elementos.append((cookie.name, cookie.value, cookie.domain, cookie.path))
+    contenido = json.dumps(sorted(elementos, key=lambda e: tuple(str(x) for x in e)))
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def consultar_validez(archivo, huella, ttl=TTL_VALIDACION_DEFECTO):
+    """
+    Devuelve True/False si hay un veredicto vigente para la huella, o None
+    si no lo hay o ya venció
+    """
+    try:
+        entrada = estado_compartido.abrir(archivo).leer(huella)
+    except sqlite3.Error as e:
+        print(f"⚠️ No se pudo leer la caché de sesión: {str(e)}")
+        return None
+    if entrada is None or time.time() - entrada.get('verificada_en', 0) > ttl:
+        return None
+    return bool(entrada.get('valida'))
+
+
+def registrar_validez(archivo, huella, valida):
+    """
+    Guarda el veredicto de validez de la huella con la hora actual
+    """
+    try:
+        with estado_compartido.abrir(archivo).transaccion() as transaccion:
+            transaccion.escribir(huella, {'valida': bool(valida), 'verificada_en': time.time()})
+    except sqlite3.Error as e:
+        print(f"⚠️ No se pudo guardar la caché de sesión: {str(e)}")
+
+
+def invalidar_validez(archivo, huella):
+    """
+    Elimina el veredicto de la huella (ej: la sesión devolvió un muro de login)
+    """
+    try:
+        with estado_compartido.abrir(archivo).transaccion() as transaccion:
+            transaccion.borrar(huella)
+    except sqlite3.Error as e:
+        print(f"⚠️ No se pudo actualizar la caché de sesión: {str(e)}")
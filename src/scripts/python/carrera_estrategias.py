@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Ejecución de las cascadas de estrategias de acceso (métodos de Facebook,
+URLs y endpoints de Instagram) en secuencia, en carrera o con cobertura.
+
+- Secuencial (por defecto): una estrategia tras otra, como siempre.
+- Carrera: arrancan las `paralelas` primeras a la vez; cuando una falla
+  entra la siguiente de la lista.
+- Cobertura (hedging): si tras `retardo_cobertura` segundos ninguna ha
+  ganado, se lanza la siguiente sin esperar a que falle la actual.
+
+Gana la primera respuesta que pasa las comprobaciones de su estrategia;
+las demás se cancelan (no lanzan más peticiones y su resultado se descarta).
+Las estrategias de respaldo (aceptan cualquier respuesta) no entran en la
+carrera: se prueban en orden solo si todas las comprobadas fallaron.
+
+El `grupo` da nombre a la cascada (ej: 'facebook', 'instagram_api'):
+con él se identifican sus estrategias en los cortacircuitos y, con
+`orden_adaptativo`, la cascada se reordena según el historial de
+estadisticas_estrategias y cada desenlace se registra en él. Los
+cortacircuitos no dependen del orden adaptativo: si están activos (ver
+cortacircuitos.py) actúan en cualquier cascada con grupo y solo reciben la salud
+del endpoint: una excepción, un timeout o un 5xx cuentan como fallo, y un
+muro de login o un 404 no (dependen del objetivo o de la sesión). Las
+estrategias con el circuito abierto se saltan sin lanzarlas.
+"""
+import time
+import queue
+import threading
+import contextvars
+
+from red_scraping import con_cancelacion, ExtraccionCancelada
+import estadisticas_estrategias
+import cortacircuitos
+import tiempos
+
+
+def _es_valida(estrategia, resultado):
+    try:
+        return bool(estrategia['es_valida'](resultado))
+    except Exception as e:
+        print(f"⚠️ Error validando método {estrategia['nombre']}: {str(e)}")
+        return False
+
+
+def _evaluar(estrategia, resultado, error):
+    """
+    Imprime el desenlace de una estrategia y devuelve si ganó
+    """
+    if error is not None:
+        print(f"⚠️ Error en método {estrategia['nombre']}: {str(error)}")
+        return False
+    if _es_valida(estrategia, resultado):
+        print(f"✅ Acceso exitoso con método: {estrategia['nombre']}")
+        return True
+    print(f"⚠️ Método {estrategia['nombre']} falló (login detectado o error)")
+    return False
+
+
+def _fallo_del_endpoint(resultado, error):
+    """
+    True si el intento falló por la salud del endpoint: excepción (timeout,
+    conexión) o respuesta 5xx. El resultado puede ser una respuesta o una
+    tupla que empieza por ella
+    """
+    if error is not None:
+        return True
+    if isinstance(resultado, tuple) and resultado:
+        resultado = resultado[0]
+    estado = getattr(resultado, 'status_code', None)
+    return estado is not None and estado >= 500
+
+
+def _registrar(grupo, estrategia, gano, resultado, error, inicio, sonda=False, adaptativo=True):
+    cancelada = isinstance(error, ExtraccionCancelada)
+    desenlace = 'cancelada' if cancelada else 'error' if error is not None else 'exito' if gano else 'fallo'
+    tiempos.registrar_intento(grupo, estrategia['nombre'], inicio, desenlace)
+    if grupo is None:
+        return
+    clave = f"{grupo}:{estrategia['nombre']}"
+    if cancelada:
+        if sonda:
+            cortacircuitos.liberar_sonda(clave)
+        return
+    if adaptativo:
+        estadisticas_estrategias.registrar(clave, gano, time.monotonic() - inicio)
+    if not _fija(estrategia):
+        cortacircuitos.registrar(clave, not _fallo_del_endpoint(resultado, error))
+
+
+def _fija(estrategia):
+    return estrategia.get('fija') or estrategia.get('respaldo')
+
+
+def _permitida(grupo, estrategia):
+    """
+    False si el circuito de la estrategia está abierto; cortacircuitos.SONDA
+    si se lanza como sonda de un circuito semiabierto (se reserva al
+    llamarla: solo justo antes de lanzar la estrategia). Las estrategias
+    fijas y las de respaldo (último recurso) se intentan siempre
+    """
+    if grupo is None or _fija(estrategia):
+        return True
+    permiso = cortacircuitos.permitir(f"{grupo}:{estrategia['nombre']}")
+    if not permiso:
+        print(f"⏭️ Método {estrategia['nombre']} omitido (circuito abierto)")
+    return permiso
+
+
+def correr_estrategias(estrategias, paralelas=1, retardo_cobertura=None, grupo=None, orden_adaptativo=True):
+    """
+    Ejecuta una lista ordenada de estrategias y devuelve (nombre, resultado)
+    de la primera válida, o (None, None) si ninguna lo es.
+
+    Cada estrategia es un dict con 'nombre', 'ejecutar' (callable sin
+    argumentos que hace la petición), 'es_valida' (recibe el resultado y
+    aplica las comprobaciones de login/bloqueo de esa estrategia) y,
+    opcionalmente, 'fija' para excluirla del orden adaptativo o
+    'respaldo' para las que aceptan cualquier respuesta: esas quedan fuera
+    de la carrera y se prueban en orden cuando todas las demás fallaron.
+    Con orden_adaptativo=False el grupo solo se usa para los cortacircuitos
+    """
+    paralelas = max(1, int(paralelas or 1))
+    comprobadas = [estrategia for estrategia in estrategias if not estrategia.get('respaldo')]
+    respaldos = [estrategia for estrategia in estrategias if estrategia.get('respaldo')]
+    adaptativo = grupo is not None and orden_adaptativo
+    if adaptativo:
+        comprobadas = estadisticas_estrategias.ordenar_estrategias(grupo, comprobadas)
+
+    if paralelas == 1 and retardo_cobertura is None:
+        nombre, resultado = _en_secuencia(comprobadas, grupo, adaptativo)
+    else:
+        nombre, resultado = _en_carrera(comprobadas, paralelas, retardo_cobertura, grupo, adaptativo)
+    if nombre is None and respaldos:
+        nombre, resultado = _en_secuencia(respaldos, grupo, adaptativo)
+    return nombre, resultado
+
+
+def _en_secuencia(estrategias, grupo, adaptativo):
+    for estrategia in estrategias:
+        permiso = _permitida(grupo, estrategia)
+        if not permiso:
+            continue
+        sonda = permiso == cortacircuitos.SONDA
+        inicio = time.monotonic()
+        try:
+            resultado = estrategia['ejecutar']()
+        except Exception as e:
+            _evaluar(estrategia, None, e)
+            _registrar(grupo, estrategia, False, None, e, inicio, sonda, adaptativo)
+            continue
+        gano = _evaluar(estrategia, resultado, None)
+        _registrar(grupo, estrategia, gano, resultado, None, inicio, sonda, adaptativo)
+        if gano:
+            return estrategia['nombre'], resultado
+    return None, None
+
+
+def _en_carrera(estrategias, paralelas, retardo_cobertura, grupo, adaptativo):
+    cola = queue.Queue()
+    eventos = []
+    inicios = {}
+    sondas = set()  # índices lanzados como sonda de un circuito semiabierto
+    siguiente = 0
+    en_vuelo = 0
+
+    def lanzar(indice):
+        evento = threading.Event()
+        eventos.append(evento)
+        inicios[indice] = time.monotonic()
+        contexto = contextvars.copy_context()
+
+        def correr():
+            try:
+                resultado = contexto.run(con_cancelacion, evento, estrategias[indice]['ejecutar'])
+                cola.put((indice, resultado, None))
+            except Exception as e:
+                cola.put((indice, None, e))
+
+        # Hilos daemon: una estrategia perdedora que sigue esperando la red
+        # no retrasa la salida del proceso
+        threading.Thread(target=correr, daemon=True, name=f"estrategia-{indice}").start()
+
+    def lanzar_siguiente(aviso=None):
+        """
+        Lanza la siguiente estrategia permitida; False si no queda ninguna.
+        El circuito se consulta aquí, al lanzarla, y no antes: así una
+        sonda solo se reserva si la petición llega a salir
+        """
+        nonlocal siguiente, en_vuelo
+        while siguiente < len(estrategias):
+            indice = siguiente
+            siguiente += 1
+            permiso = _permitida(grupo, estrategias[indice])
+            if not permiso:
+                continue
+            if aviso:
+                print(f"{aviso}, lanzando método: {estrategias[indice]['nombre']}")
+            if permiso == cortacircuitos.SONDA:
+                sondas.add(indice)
+            lanzar(indice)
+            en_vuelo += 1
+            return True
+        return False
+
+    try:
+        while en_vuelo < paralelas and lanzar_siguiente():
+            pass
+
+        while en_vuelo:
+            espera = retardo_cobertura if siguiente < len(estrategias) else None
+            try:
+                indice, resultado, error = cola.get(timeout=espera)
+            except queue.Empty:
+                lanzar_siguiente(f"⏱️ Sin respuesta en {retardo_cobertura}s")
+                continue
+
+            en_vuelo -= 1
+            gano = _evaluar(estrategias[indice], resultado, error)
+            _registrar(
+                grupo, estrategias[indice], gano, resultado, error, inicios[indice], indice in sondas, adaptativo
+            )
+            sondas.discard(indice)
+            if gano:
+                return estrategias[indice]['nombre'], resultado
+
+            # Mantener el número de estrategias en vuelo
+            if en_vuelo < paralelas:
+                lanzar_siguiente()
+
+        return None, None
+    finally:
+        for evento in eventos:
+            evento.set()
+        # Sondas que perdieron la carrera sin resultado: el circuito queda
+        # libre para que la siguiente extracción pruebe
+        for indice in sondas:
+            cortacircuitos.liberar_sonda(f"{grupo}:{estrategias[indice]['nombre']}")
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Clasificador único de páginas de Facebook e Instagram: muro de login,
+navegador bloqueado, página no disponible / no encontrada o disponible.
+
+El cuerpo se pasa a minúsculas una sola vez y se recorre en una sola
+pasada con una expresión regular compilada que contiene todos los
+marcadores (español e inglés) de ambos scripts, factorizados por prefijos
+como un trie, guardando la primera posición de cada uno. Cada
+comprobación posterior es una consulta a ese resultado en lugar de otro
+`response.text.lower()`.
+"""
+import re
+from functools import lru_cache
+
+# Marcadores por categoría, en minúsculas
+MARCADORES_FACEBOOK = {
+    'navegador_bloqueado': (
+        'not available on this browser',
+        'facebook is not available',
+        'unsupported browser',
+        'navegador no compatible'
+    ),
+    'no_encontrado': (
+        'not found',
+        'page not found',
+        'no se encontró',
+        'contenido no está disponible',
+        'content isn\'t available',
+        'this content isn\'t available'
+    ),
+    'muro_login': (
+        'log in to facebook',
+        'log in',
+        'iniciar sesión',
+        'entrar en facebook'
+    )
+}
+
+MARCADORES_INSTAGRAM = {
+    'no_disponible': (
+        'sorry, this page isn\'t available',
+        'this page isn\'t available',
+        'lo sentimos, esta página no está disponible',
+        'página no está disponible'
+    ),
+    'no_encontrado': (
+        'not found',
+        'page not found'
+    ),
+    # Perfil eliminado que redirige al login
+    'bloqueo_tras_login': (
+        'this page isn\'t available',
+        'página no está disponible',
+        'sorry, this page'
+    )
+}
+
+# Instagram busca el muro de login en el texto visible (primeros 1000 caracteres)
+MARCADORES_LOGIN_VISIBLE_INSTAGRAM = ('log in', 'iniciar sesión', 'sign up', 'registrate', 'not available')
+LIMITE_TEXTO_VISIBLE_INSTAGRAM = 1000
+
+# Señales de la portada de Facebook para verificar_sesion_valida
+MARCADORES_SESION = (
+    'you must log in',
+    'log into facebook',
+    'name="email"',
+    'name="pass"',
+    'data-testid="search"',
+    'usernavigationlabel',
+    'navigation'
+)
+
+# Marcadores que deciden el estado de la página (sin los de la portada)
+MARCADORES_CLASIFICACION = tuple(sorted(
+    {m for grupo in MARCADORES_FACEBOOK.values() for m in grupo} |
+    {m for grupo in MARCADORES_INSTAGRAM.values() for m in grupo}
+))
+
+ESTADOS = ('navegador_bloqueado', 'no_disponible', 'no_encontrado', 'muro_login', 'disponible')
+
+
+def _patron(nodo):
+    # Alternancia de los hijos del nodo; '' marca el final de un marcador
+    alternativas = [re.escape(caracter) + _patron(hijo) for caracter, hijo in sorted(nodo.items()) if caracter]
+    if not alternativas:
+        return ''
+    grupo = alternativas[0] if len(alternativas) == 1 else f"(?:{'|'.join(alternativas)})"
+    return f'(?:{grupo})?' if '' in nodo else grupo
+
+
+@lru_cache(maxsize=None)
+def _buscador(marcadores):
+    """
+    (search de la expresión con todos los marcadores, {marcador: marcadores
+    que son prefijo suyo}). En cada posición la expresión casa el marcador
+    más largo; los que son prefijo suyo empiezan en la misma posición
+    """
+    trie = {}
+    for marcador in marcadores:
+        nodo = trie
+        for caracter in marcador:
+            nodo = nodo.setdefault(caracter, {})
+        nodo[''] = {}
+    prefijos = {m: [p for p in marcadores if m.startswith(p)] for m in marcadores}
+    return re.compile(_patron(trie)).search, prefijos
+
+
+def escanear(texto, marcadores=MARCADORES_CLASIFICACION):
+    """
+    Devuelve {marcador: primera posición} de los marcadores presentes en el
+    texto, en una sola pasada sobre una única copia en minúsculas. Cada
+    búsqueda sigue desde la posición siguiente al último inicio, así se
+    encuentran también los marcadores solapados (ej: 'not found' dentro de
+    'page not found')
+    """
+    buscar, prefijos = _buscador(tuple(marcadores))
+    minusculas = (texto or '').lower()
+    posiciones = {}
+    coincidencia = buscar(minusculas)
+    while coincidencia:
+        inicio = coincidencia.start()
+        for marcador in prefijos[coincidencia.group()]:
+            posiciones.setdefault(marcador, inicio)
+        if len(posiciones) == len(prefijos):
+            break
+        coincidencia = buscar(minusculas, inicio + 1)
+    return posiciones
+
+
+def hay_alguno(posiciones, marcadores):
+    return any(m in posiciones for m in marcadores)
+
+
+def clasificar(cuerpo, url='', plataforma='facebook', texto_visible=None, marcadores=None):
+    """
+    Clasifica una respuesta y devuelve un veredicto estructurado:
+
+    - 'estado': el primero que aplique de ESTADOS (mismo orden de prioridad
+      que usaban los scripts)
+    - un booleano por estado, 'texto_login' (marcadores de login en el
+      texto), 'login_en_url', 'longitud' (cuerpo sin espacios de los
+      extremos) y 'marcadores' ({marcador: posición})
+
+    `texto_visible` (soup.get_text()) es opcional; si se pasa se usa para
+    las comprobaciones basadas en texto visible. `marcadores` reutiliza el
+    escaneo de un veredicto anterior del mismo cuerpo
+    """
+    if marcadores is None:
+        marcadores = escanear(cuerpo)
+    url_minusculas = (url or '').lower()
+    longitud_visible = len(texto_visible.strip()) if texto_visible is not None else None
+
+    if plataforma == 'facebook':
+        navegador_bloqueado = hay_alguno(marcadores, MARCADORES_FACEBOOK['navegador_bloqueado'])
+        no_disponible = False
+        no_encontrado = hay_alguno(marcadores, MARCADORES_FACEBOOK['no_encontrado'])
+        bloqueo_tras_login = False
+        texto_login = hay_alguno(marcadores, MARCADORES_FACEBOOK['muro_login'])
+        muro_login = (
+            texto_login or
+            '/login/' in (url or '') or
+            (longitud_visible is not None and longitud_visible < 300)
+        )
+    else:
+        navegador_bloqueado = False
+        no_disponible = hay_alguno(marcadores, MARCADORES_INSTAGRAM['no_disponible'])
+        no_encontrado = hay_alguno(marcadores, MARCADORES_INSTAGRAM['no_encontrado'])
+        bloqueo_tras_login = hay_alguno(marcadores, MARCADORES_INSTAGRAM['bloqueo_tras_login'])
+        visibles = escanear(
+            texto_visible[:LIMITE_TEXTO_VISIBLE_INSTAGRAM] if texto_visible else '',
+            MARCADORES_LOGIN_VISIBLE_INSTAGRAM
+        )
+        texto_login = bool(visibles)
+        muro_login = (
+            'login' in url_minusculas or
+            texto_login or
+            (longitud_visible is not None and longitud_visible < 500)
+        )
+
+    banderas = {
+        'navegador_bloqueado': navegador_bloqueado,
+        'no_disponible': no_disponible,
+        'no_encontrado': no_encontrado,
+        'muro_login': muro_login
+    }
+    estado = next((e for e in ESTADOS[:-1] if banderas[e]), 'disponible')
+
+    return {
+        'estado': estado,
+        **banderas,
+        'bloqueo_tras_login': bloqueo_tras_login,
+        'texto_login': texto_login,
+        'login_en_url': 'login' in url_minusculas,
+        'longitud': len((cuerpo or '').strip()),
+        'marcadores': marcadores
+    }
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Cortacircuitos por estrategia de acceso (método de Facebook o URL/endpoint
+de Instagram), persistidos entre ejecuciones.
+
+- Cerrado: la estrategia se intenta normalmente. Tras UMBRAL_FALLOS fallos
+  seguidos se abre.
+- Abierto: la estrategia se salta al instante durante el enfriamiento, sin
+  pagar su timeout en cada objetivo.
+- Semiabierto: vencido el enfriamiento, un solo intento de sonda. Si
+  funciona el circuito se cierra; si falla se vuelve a abrir con el doble
+  de enfriamiento (hasta ENFRIAMIENTO_MAXIMO).
+
+Solo cuentan como fallo los de salud del endpoint (excepciones, timeouts,
+5xx; ver carrera_estrategias.py). Están desactivados por defecto: se
+activan con el parámetro cortacircuitos (--cortacircuitos en el lote),
+solo para esa extracción (ver ajustes_extraccion.py).
+
+El estado vive en una base SQLite pequeña que comparten los procesos
+(estado_compartido.py): cada transición se decide y se escribe dentro de
+una misma transacción, así dos procesos no reservan la misma sonda.
+"""
+import os
+import time
+import sqlite3
+
+import estado_compartido
+from ajustes_extraccion import Ajuste
+
+ARCHIVO_CORTACIRCUITOS = os.path.join(os.getcwd(), 'estadisticas_scraping', 'cortacircuitos.sqlite3')
+
+# Fallos seguidos que abren el circuito
+UMBRAL_FALLOS = 5
+# Segundos con el circuito abierto antes de la primera sonda, y máximo tras duplicarse
+ENFRIAMIENTO_INICIAL = 300
+ENFRIAMIENTO_MAXIMO = 3600
+# Segundos que una sonda tiene reservado el circuito (si no informa, otra puede probar)
+DURACION_SONDA = 120
+
+# permitir() devuelve SONDA cuando el intento es la sonda de un circuito semiabierto
+SONDA = 'sonda'
+
+CERRADO = 'cerrado'
+ABIERTO = 'abierto'
+SEMIABIERTO = 'semiabierto'
+
+_activos = Ajuste('cortacircuitos', False)
+
+
+def configurar(activos=True, proceso=True):
+    """
+    Activa o desactiva los cortacircuitos en este proceso o, con
+    proceso=False, solo en la extracción en curso
+    """
+    _activos.fijar(bool(activos), proceso)
+
+
+def configurar_desde_parametros(params, proceso=False):
+    """
+    Parámetro del extractor: cortacircuitos (true/false). Sin él se
+    mantiene la configuración del proceso
+    """
+    if 'cortacircuitos' in params:
+        configurar(params['cortacircuitos'], proceso)
+
+
+def _almacen():
+    return estado_compartido.abrir(ARCHIVO_CORTACIRCUITOS)
+
+
+def _nuevo_circuito():
+    return {'estado': CERRADO, 'fallos': 0, 'abierto_hasta': 0.0, 'enfriamiento': ENFRIAMIENTO_INICIAL}
+
+
+def permitir(clave):
+    """
+    True si la estrategia `clave` (ej: 'instagram_api:https://...') puede
+    intentarse ahora. Vencido el enfriamiento reserva la sonda y devuelve
+    SONDA: llamarla solo al lanzar la estrategia, y devolver la sonda con
+    liberar_sonda si el intento no llega a tener resultado
+    """
+    if not _activos.valor():
+        return True
+    try:
+        # Lectura sin reservar la base: lo normal es un circuito cerrado
+        circuito = _almacen().leer(clave)
+        if circuito is None or circuito['estado'] == CERRADO:
+            return True
+        if time.time() < circuito['abierto_hasta']:
+            return False
+        with _almacen().transaccion() as transaccion:
+            circuito = transaccion.leer(clave)
+            if circuito is None or circuito['estado'] == CERRADO:
+                return True
+            ahora = time.time()
+            if ahora < circuito['abierto_hasta']:
+                return False
+            # Enfriamiento vencido (o sonda anterior sin respuesta): esta llamada es la sonda
+            transaccion.escribir(clave, {**circuito, 'estado': SEMIABIERTO, 'abierto_hasta': ahora + DURACION_SONDA})
+    except sqlite3.Error as e:
+        print(f"⚠️ No se pudo leer el estado de los cortacircuitos: {str(e)}")
+        return True
+    print(f"🔌 Probando estrategia con circuito abierto: {clave}")
+    return SONDA
+
+
+def liberar_sonda(clave):
+    """
+    Devuelve la sonda reservada de un circuito semiabierto sin resultado
+    (el intento se canceló): la siguiente llamada a permitir puede probar
+    """
+    if not _activos.valor():
+        return
+    try:
+        with _almacen().transaccion() as transaccion:
+            circuito = transaccion.leer(clave)
+            if circuito is not None and circuito['estado'] == SEMIABIERTO:
+                transaccion.escribir(clave, {**circuito, 'abierto_hasta': 0.0})
+    except sqlite3.Error as e:
+        print(f"⚠️ No se pudo guardar el estado de los cortacircuitos: {str(e)}")
+
+
+def registrar(clave, exito):
+    """
+    Registra el desenlace de un intento de la estrategia `clave`
+    """
+    if not _activos.valor():
+        return
+    try:
+        if exito:
+            circuito = _almacen().leer(clave)
+            if circuito is None or (circuito['estado'] == CERRADO and not circuito['fallos']):
+                return
+        with _almacen().transaccion() as transaccion:
+            circuito = transaccion.leer(clave) or _nuevo_circuito()
+            if exito:
+                if circuito['estado'] != CERRADO:
+                    print(f"🔌 Circuito cerrado de nuevo: {clave}")
+                transaccion.escribir(clave, _nuevo_circuito())
+                return
+
+            if circuito['estado'] == SEMIABIERTO:
+                enfriamiento = min(ENFRIAMIENTO_MAXIMO, circuito['enfriamiento'] * 2)
+            elif circuito['fallos'] + 1 >= UMBRAL_FALLOS:
+                enfriamiento = circuito['enfriamiento']
+            else:
+                transaccion.escribir(clave, {**circuito, 'fallos': circuito['fallos'] + 1})
+                return
+            transaccion.escribir(clave, {
+                'estado': ABIERTO,
+                'fallos': circuito['fallos'] + 1,
+                'abierto_hasta': time.time() + enfriamiento,
+                'enfriamiento': enfriamiento
+            })
+    except sqlite3.Error as e:
+        print(f"⚠️ No se pudo guardar el estado de los cortacircuitos: {str(e)}")
+        return
+    print(f"🔌 Circuito abierto durante {enfriamiento}s: {clave}")
+
+
+def estado(clave):
+    """
+    Estado actual del circuito de `clave` ('cerrado', 'abierto' o 'semiabierto')
+    """
+    try:
+        circuito = _almacen().leer(clave)
+    except sqlite3.Error:
+        circuito = None
+    return circuito['estado'] if circuito else CERRADO
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Consultas sobre el HTML de una página y lectura parcial de la respuesta.
+
+Los extractores solo necesitan unas pocas cosas del HTML: el título, metas
+por name/property, el contenido de los <script> por tipo, los src de <img>,
+el texto visible y si existe un <input> con cierto name. Un "documento"
+es cualquier objeto con esos métodos:
+
+- DocumentoSoup: la página completa parseada con BeautifulSoup (html.parser).
+- DocumentoLxml / DocumentoSelectolax: lo mismo con lxml o con el parser
+  lexbor de selectolax (en C, mucho más rápidos en páginas grandes), si
+  están instalados.
+- DocumentoParcial: parser incremental (html.parser) que se alimenta
+  mientras se descarga la respuesta.
+
+`analizar(html, parser)` elige el backend: 'html.parser' (por defecto,
+como siempre), 'lxml', 'selectolax' o 'auto' (el más rápido instalado).
+Instalar lxml o selectolax no cambia el parser de nadie: hay que pedirlo
+con parserHtml / --parser-html.
+
+`obtener_cabecera` descarga en streaming y corta en cuanto la cabecera
+está cerrada y ya se tienen los metadatos o algún marcador de
+clasificación, o al llegar al límite de bytes. La respuesta se queda con
+el prefijo leído (response.text lo devuelve) y su documento en
+`response.documento`.
+
+Los documentos se liberan al terminar la extracción (ver
+presupuesto_memoria.py); no deben guardarse más allá de ella.
+"""
+import codecs
+from html.parser import HTMLParser
+from bs4 import BeautifulSoup
+
+from red_scraping import obtener
+from tiempos import etapa, sumar_bytes
+from presupuesto_memoria import liberar_al_terminar
+from clasificador_paginas import escanear, MARCADORES_CLASIFICACION
+from arranque import esta_instalado, cargar_opcional
+
+# Backends en orden de preferencia para 'auto'
+PARSERS_HTML = ('selectolax', 'lxml', 'html.parser')
+PARSER_HTML_DEFECTO = 'html.parser'
+
+# Bytes máximos que se leen de una página en modo solo cabecera
+# (la cabecera de Facebook trae scripts en línea de cientos de KB)
+LIMITE_BYTES_CABECERA = 256 * 1024
+TAMANIO_BLOQUE = 16 * 1024
+
+_SOLAPE_MARCADORES = max(len(m) for m in MARCADORES_CLASIFICACION)
+
+
+class DocumentoSoup:
+    """
+    Página completa parseada con BeautifulSoup (html.parser)
+    """
+    completo = True
+
+    def __init__(self, html):
+        # Se anota el árbol y no el documento: el árbol sobrevive al documento en sus ciclos
+        self.soup = liberar_al_terminar(BeautifulSoup(html, 'html.parser'))
+
+    def titulo(self):
+        etiqueta = self.soup.find('title')
+        return etiqueta.text if etiqueta else None
+
+    def meta(self, nombre=None, propiedad=None):
+        atributos = {'name': nombre} if nombre else {'property': propiedad}
+        etiqueta = self.soup.find('meta', atributos)
+        return etiqueta.get('content') if etiqueta else None
+
+    def scripts(self, tipo=None):
+        etiquetas = self.soup.find_all('script', type=tipo) if tipo else self.soup.find_all('script')
+        return [etiqueta.string for etiqueta in etiquetas if etiqueta.string]
+
+    def imagenes(self):
+        return [img.get('src', '') for img in self.soup.find_all('img')]
+
+    def texto(self):
+        return self.soup.get_text()
+
+    def hay_input(self, nombre):
+        return self.soup.find('input', {'name': nombre}) is not None
+
+    def liberar(self):
+        self.soup.decompose()
+
+
+class DocumentoLxml:
+    """
+    Página completa parseada con lxml.html
+    """
+    completo = True
+
+    def __init__(self, html):
+        lxml_html = cargar_opcional('lxml.html')
+        # Un cuerpo vacío o solo con espacios es un documento vacío (lxml lanza ParserError)
+        if not html or not html.strip():
+            html = '<html></html>'
+        try:
+            self.raiz = lxml_html.document_fromstring(html)
+        except ValueError:
+            # lxml no acepta str con declaración de codificación
+            self.raiz = lxml_html.document_fromstring(html.encode('utf-8'))
+
+    def titulo(self):
+        etiqueta = self.raiz.find('.//title')
+        return etiqueta.text_content() if etiqueta is not None else None
+
+    def meta(self, nombre=None, propiedad=None):
+        if nombre:
+            etiquetas = self.raiz.xpath('//meta[@name=$valor]', valor=nombre)
+        else:
+            etiquetas = self.raiz.xpath('//meta[@property=$valor]', valor=propiedad)
+        return etiquetas[0].get('content') if etiquetas else None
+
+    def scripts(self, tipo=None):
+        if tipo:
+            etiquetas = self.raiz.xpath('//script[@type=$tipo]', tipo=tipo)
+        else:
+            etiquetas = self.raiz.iter('script')
+        return [etiqueta.text for etiqueta in etiquetas if etiqueta.text]
+
+    def imagenes(self):
+        return [img.get('src', '') for img in self.raiz.iter('img')]
+
+    def texto(self):
+        return ''.join(self.raiz.xpath('//text()[not(ancestor::script) and not(ancestor::style)]'))
+
+    def hay_input(self, nombre):
+        return bool(self.raiz.xpath('//input[@name=$nombre]', nombre=nombre))
+
+    def liberar(self):
+        self.raiz = None
+
+
+class DocumentoSelectolax:
+    """
+    Página completa parseada con selectolax (backend lexbor)
+    """
+    completo = True
+
+    def __init__(self, html):
+        lexbor = cargar_opcional('selectolax.lexbor')
+        self.arbol = lexbor.LexborHTMLParser(html or '')
+
+    def titulo(self):
+        etiqueta = self.arbol.css_first('title')
+        return etiqueta.text() if etiqueta is not None else None
+
+    def meta(self, nombre=None, propiedad=None):
+        clave, valor = ('name', nombre) if nombre else ('property', propiedad)
+        for etiqueta in self.arbol.css('meta'):
+            if etiqueta.attributes.get(clave) == valor:
+                return etiqueta.attributes.get('content')
+        return None
+
+    def scripts(self, tipo=None):
+        textos = []
+        for etiqueta in self.arbol.css('script'):
+            if tipo is None or etiqueta.attributes.get('type') == tipo:
+                texto = etiqueta.text()
+                if texto:
+                    textos.append(texto)
+        return textos
+
+    def imagenes(self):
+        return [img.attributes.get('src') or '' for img in self.arbol.css('img')]
+
+    def texto(self):
+        if self.arbol.root is None:
+            return ''
+        return ''.join(
+            nodo.text_content or '' for nodo in self.arbol.root.traverse(include_text=True)
+            if nodo.tag == '-text' and nodo.parent.tag not in ('script', 'style')
+        )
+
+    def hay_input(self, nombre):
+        return any(etiqueta.attributes.get('name') == nombre for etiqueta in self.arbol.css('input'))
+
+    def liberar(self):
+        self.arbol = None
+
+
+_BACKENDS = {
+    'html.parser': DocumentoSoup,
+    'lxml': DocumentoLxml,
+    'selectolax': DocumentoSelectolax
+}
+_MODULOS_BACKEND = {'lxml': 'lxml.html', 'selectolax': 'selectolax.lexbor'}
+
+
+def parser_disponible(nombre):
+    """
+    Indica si el backend `nombre` se puede usar
+    """
+    return nombre in _BACKENDS and (nombre not in _MODULOS_BACKEND or esta_instalado(_MODULOS_BACKEND[nombre]))
+
+
+def resolver_parser(nombre=None):
+    """
+    Traduce None al parser por defecto y 'auto' al backend más rápido
+    instalado. Un backend no instalado o desconocido cae en html.parser con
+    un aviso
+    """
+    nombre = nombre or PARSER_HTML_DEFECTO
+    if nombre == 'auto':
+        return next(p for p in PARSERS_HTML if parser_disponible(p))
+    if not parser_disponible(nombre):
+        print(f"⚠️ Parser HTML '{nombre}' no disponible, usando html.parser")
+        return 'html.parser'
+    return nombre
+
+
+@etapa('parseo')
+def analizar(html, parser=None):
+    """
+    Parsea una página completa con el backend indicado
+    """
+    return liberar_al_terminar(_BACKENDS[resolver_parser(parser)](html))
+
+
+class DocumentoParcial(HTMLParser):
+    """
+    Documento construido de forma incremental con feed(); sirve las mismas
+    consultas que DocumentoSoup sobre lo leído hasta el momento
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.completo = False
+        self.cabecera_cerrada = False
+        self.bytes_leidos = 0
+        self._titulo = None
+        self._partes_titulo = None
+        self._metas = []
+        self._scripts = []
+        self._script_actual = None
+        self._en_estilo = False
+        self._imagenes = []
+        self._inputs = set()
+        self._partes_texto = []
+
+    def handle_starttag(self, tag, attrs):
+        atributos = dict(attrs)
+        if tag == 'meta':
+            self._metas.append(atributos)
+        elif tag == 'title' and self._titulo is None and self._partes_titulo is None:
+            self._partes_titulo = []
+        elif tag == 'script':
+            self._script_actual = (atributos.get('type'), [])
+        elif tag == 'style':
+            self._en_estilo = True
+        elif tag == 'img':
+            self._imagenes.append(atributos.get('src') or '')
+        elif tag == 'input' and atributos.get('name'):
+            self._inputs.add(atributos['name'])
+        elif tag == 'body':
+            self.cabecera_cerrada = True
+
+    def handle_endtag(self, tag):
+        if tag == 'title' and self._partes_titulo is not None:
+            self._titulo = ''.join(self._partes_titulo)
+            self._partes_titulo = None
+        elif tag == 'script' and self._script_actual is not None:
+            tipo, partes = self._script_actual
+            self._scripts.append((tipo, ''.join(partes)))
+            self._script_actual = None
+        elif tag == 'style':
+            self._en_estilo = False
+        elif tag == 'head':
+            self.cabecera_cerrada = True
+
+    def handle_data(self, data):
+        if self._script_actual is not None:
+            self._script_actual[1].append(data)
+            return
+        if self._en_estilo:
+            return
+        if self._partes_titulo is not None:
+            self._partes_titulo.append(data)
+        self._partes_texto.append(data)
+
+    def tiene_metadatos(self):
+        return any(
+            m.get('property') in ('og:title', 'og:description') or m.get('name') == 'description'
+            for m in self._metas
+        )
+
+    def titulo(self):
+        if self._titulo is None and self._partes_titulo is not None:
+            return ''.join(self._partes_titulo)  # cortado dentro del <title>
+        return self._titulo
+
+    def meta(self, nombre=None, propiedad=None):
+        clave, valor = ('name', nombre) if nombre else ('property', propiedad)
+        for atributos in self._metas:
+            if atributos.get(clave) == valor:
+                return atributos.get('content')
+        return None
+
+    def scripts(self, tipo=None):
+        return [texto for tipo_script, texto in self._scripts if texto and (tipo is None or tipo_script == tipo)]
+
+    def imagenes(self):
+        return list(self._imagenes)
+
+    def texto(self):
+        return ''.join(self._partes_texto)
+
+    def hay_input(self, nombre):
+        return nombre in self._inputs
+
+    def liberar(self):
+        self._metas, self._scripts, self._imagenes, self._partes_texto = [], [], [], []
+
+
+def leer_cabecera(respuesta, limite_bytes=LIMITE_BYTES_CABECERA):
+    """
+    Lee una respuesta pedida con stream=True hasta tener la cabecera y los
+    metadatos (o un marcador de clasificación), o hasta `limite_bytes`.
+    Deja el prefijo leído como contenido de la respuesta y el documento
+    parseado en `respuesta.documento`
+    """
+    documento = DocumentoParcial()
+    decodificador = codecs.getincrementaldecoder(respuesta.encoding or 'utf-8')(errors='replace')
+    leidos = bytearray()
+    cola = ''
+    marcador_visto = False
+    try:
+        for bloque in respuesta.iter_content(TAMANIO_BLOQUE):
+            leidos += bloque
+            texto = decodificador.decode(bloque)
+            documento.feed(texto)
+            # Solo se busca en lo nuevo (más un solape por si un marcador quedó partido)
+            marcador_visto = marcador_visto or bool(escanear(cola + texto, MARCADORES_CLASIFICACION))
+            cola = (cola + texto)[-_SOLAPE_MARCADORES:]
+            if documento.cabecera_cerrada and (marcador_visto or documento.tiene_metadatos()):
+                break
+            if len(leidos) >= limite_bytes:
+                break
+        else:
+            documento.feed(decodificador.decode(b'', final=True))
+            documento.close()
+            documento.completo = True
+    finally:
+        # Cerrar sin leer el resto descarta la conexión en vez de devolverla al pool
+        respuesta.close()
+
+    documento.bytes_leidos = len(leidos)
+    if not getattr(respuesta, 'desde_cache', False):
+        sumar_bytes(len(leidos))
+    respuesta._content = bytes(leidos)
+    respuesta._content_consumed = True
+    respuesta.documento = documento
+    return respuesta
+
+
+def obtener_cabecera(session, url, limite_bytes=LIMITE_BYTES_CABECERA, **kwargs):
+    """
+    GET en streaming que solo lee la cabecera de la página (ver leer_cabecera)
+    """
+    return leer_cabecera(obtener(session, url, stream=True, **kwargs), limite_bytes)
+
+
+def documento_de(respuesta, parser=None):
+    """
+    Documento de una respuesta: el parcial si se leyó con obtener_cabecera,
+    si no la página completa con el backend `parser`
+    """
+    documento = getattr(respuesta, 'documento', None)
+    return documento if documento is not None else analizar(respuesta.text, parser)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Registro de resultados por estrategia de acceso y orden adaptativo.
+
+Cada intento (método de Facebook, URL o endpoint de Instagram, instaloader)
+se registra con su desenlace y latencia en una base SQLite pequeña
+compartida entre procesos (estado_compartido.py). Al ordenar una cascada
+se estima el coste esperado hasta el éxito (latencia / probabilidad de
+éxito) muestreando la probabilidad de una distribución Beta (Thompson
+sampling): las estrategias muertas desde hace semanas quedan al final,
+pero de vez en cuando se vuelven a probar.
+"""
+import os
+import time
+import atexit
+import random
+import sqlite3
+import threading
+
+import estado_compartido
+
+ARCHIVO_ESTADISTICAS = os.path.join(os.getcwd(), 'estadisticas_scraping', 'estrategias.sqlite3')
+
+# Peso de cada observación nueva en las medias móviles
+PESO_OBSERVACION = 0.1
+# Máximo de observaciones "recordadas" en la Beta: mantiene viva la exploración
+MAX_OBSERVACIONES_EFECTIVAS = 50
+# Latencia supuesta para estrategias sin historial (segundos)
+LATENCIA_DESCONOCIDA = 5.0
+# Segundos entre escrituras de la base
+INTERVALO_GUARDADO = 5.0
+
+_lock = threading.Lock()
+_estadisticas = None
+_pendientes = []
+_ultimo_guardado = 0.0
+
+
+def _almacen():
+    return estado_compartido.abrir(ARCHIVO_ESTADISTICAS)
+
+
+def _leer_base():
+    try:
+        return _almacen().todas()
+    except sqlite3.Error:
+        return {}
+
+
+def _aplicar(estadisticas, clave, exito, segundos, momento):
+    entrada = estadisticas.get(clave)
+    if entrada is None:
+        estadisticas[clave] = {
+            'intentos': 1,
+            'tasa_exito': 1.0 if exito else 0.0,
+            'latencia': segundos,
+            'ultimo_intento': momento
+        }
+        return
+    entrada['intentos'] += 1
+    entrada['tasa_exito'] += PESO_OBSERVACION * ((1.0 if exito else 0.0) - entrada['tasa_exito'])
+    entrada['latencia'] += PESO_OBSERVACION * (segundos - entrada['latencia'])
+    entrada['ultimo_intento'] = momento
+
+
+def _cargar():
+    global _estadisticas
+    if _estadisticas is None:
+        _estadisticas = _leer_base()
+    return _estadisticas
+
+
+def guardar():
+    """
+    Aplica las observaciones pendientes sobre las entradas actuales de la
+    base (que otro proceso pudo haber actualizado) en una sola transacción
+    """
+    global _estadisticas, _ultimo_guardado
+    with _lock:
+        if not _pendientes:
+            return
+        try:
+            with _almacen().transaccion() as transaccion:
+                actuales = {}
+                for clave, *_ in _pendientes:
+                    if clave not in actuales:
+                        entrada = transaccion.leer(clave)
+                        if entrada is not None:
+                            actuales[clave] = entrada
+                for observacion in _pendientes:
+                    _aplicar(actuales, *observacion)
+                for clave, entrada in actuales.items():
+                    transaccion.escribir(clave, entrada)
+        except sqlite3.Error as e:
+            print(f"⚠️ No se pudieron guardar las estadísticas de estrategias: {str(e)}")
+            return
+        _pendientes.clear()
+        _estadisticas = {**_cargar(), **actuales}
+        _ultimo_guardado = time.time()
+
+
+atexit.register(guardar)
+
+
+def registrar(clave, exito, segundos):
+    """
+    Registra el desenlace de un intento de la estrategia `clave`
+    (ej: 'facebook:mbasic Mobile')
+    """
+    momento = time.time()
+    with _lock:
+        _aplicar(_cargar(), clave, exito, segundos, momento)
+        _pendientes.append((clave, exito, segundos, momento))
+        toca_guardar = momento - _ultimo_guardado > INTERVALO_GUARDADO
+    if toca_guardar:
+        guardar()
+
+
+def _muestrear_exito(entrada):
+    if entrada is None:
+        return random.betavariate(1, 1)
+    observaciones = min(entrada['intentos'], MAX_OBSERVACIONES_EFECTIVAS)
+    exitos = entrada['tasa_exito'] * observaciones
+    return random.betavariate(1 + exitos, 1 + observaciones - exitos)
+
+
+def coste_esperado(clave):
+    """
+    Coste esperado hasta el éxito (segundos) con una probabilidad de éxito
+    muestreada; menor es mejor
+    """
+    with _lock:
+        entrada = _cargar().get(clave)
+    latencia = entrada['latencia'] if entrada else LATENCIA_DESCONOCIDA
+    return max(latencia, 0.01) / max(_muestrear_exito(entrada), 0.001)
+
+
+def probabilidad_muestreada(clave):
+    """
+    Probabilidad de éxito muestreada para decidir si vale la pena intentar
+    una estrategia costosa (ej: instaloader)
+    """
+    with _lock:
+        entrada = _cargar().get(clave)
+    return _muestrear_exito(entrada)
+
+
+def ordenar_estrategias(grupo, estrategias):
+    """
+    Reordena las estrategias de una cascada por coste esperado. Las que
+    tienen 'fija': True conservan su posición
+    """
+    movibles = [e for e in estrategias if not e.get('fija')]
+    ordenadas = iter(sorted(movibles, key=lambda e: coste_esperado(f"{grupo}:{e['nombre']}")))
+    return [e if e.get('fija') else next(ordenadas) for e in estrategias]
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Estado pequeño compartido entre hilos y procesos: entradas JSON por clave
+en una base SQLite.
+
+Los cortacircuitos, las estadísticas de estrategias, el pool de sesiones
+y la caché de validez de sesiones guardan estado que leen y cambian a la vez varios procesos (lotes, modo
+--serve, llamadas sueltas desde Node). Cada transición (leer, decidir,
+escribir) va dentro de `transaccion()`, una transacción BEGIN IMMEDIATE
+como las de gobernador_tasa.py: mientras dura ningún otro proceso puede
+escribir, así dos procesos no reparten la misma sonda o la misma cuenta ni
+pisan la actualización del otro.
+"""
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_almacenes = {}
+
+
+class Transaccion:
+    """
+    Lecturas y escrituras dentro de una transacción de EstadoCompartido
+    """
+
+    def __init__(self, conexion):
+        self._conexion = conexion
+
+    def leer(self, clave, defecto=None):
+        fila = self._conexion.execute('SELECT valor FROM entradas WHERE clave = ?', (clave,)).fetchone()
+        return json.loads(fila[0]) if fila else defecto
+
+    def todas(self):
+        return {clave: json.loads(valor) for clave, valor in self._conexion.execute('SELECT clave, valor FROM entradas')}
+
+    def escribir(self, clave, valor):
+        self._conexion.execute(
+            'INSERT OR REPLACE INTO entradas VALUES (?, ?)', (clave, json.dumps(valor, ensure_ascii=False))
+        )
+
+    def borrar(self, clave):
+        """
+        Elimina la entrada; True si existía
+        """
+        return self._conexion.execute('DELETE FROM entradas WHERE clave = ?', (clave,)).rowcount > 0
+
+
+class EstadoCompartido:
+    """
+    Entradas JSON por clave en la base `ruta`
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._preparada = False
+
+    def _preparar(self):
+        os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+        conexion = sqlite3.connect(self.ruta, timeout=30)
+        try:
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('CREATE TABLE IF NOT EXISTS entradas (clave TEXT PRIMARY KEY, valor TEXT)')
+            conexion.commit()
+        finally:
+            conexion.close()
+        self._preparada = True
+
+    def _conectar(self):
+        if not self._preparada:
+            with _lock:
+                if not self._preparada:
+                    self._preparar()
+        # isolation_level=None: las transacciones se abren a mano con BEGIN IMMEDIATE
+        return sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+
+    @contextmanager
+    def transaccion(self):
+        """
+        Transacción BEGIN IMMEDIATE: lo leído no cambia hasta escribir
+        """
+        conexion = self._conectar()
+        try:
+            conexion.execute('BEGIN IMMEDIATE')
+            try:
+                yield Transaccion(conexion)
+                conexion.execute('COMMIT')
+            except BaseException:
+                conexion.execute('ROLLBACK')
+                raise
+        finally:
+            conexion.close()
+
+    def leer(self, clave, defecto=None):
+        """
+        Lectura suelta, sin reservar la base (para decidir rápido si hace
+        falta una transacción)
+        """
+        conexion = self._conectar()
+        try:
+            return Transaccion(conexion).leer(clave, defecto)
+        finally:
+            conexion.close()
+
+    def todas(self):
+        conexion = self._conectar()
+        try:
+            return Transaccion(conexion).todas()
+        finally:
+            conexion.close()
+
+
+def abrir(ruta):
+    """
+    EstadoCompartido de la base `ruta` (uno por ruta en cada proceso)
+    """
+    ruta = os.path.abspath(ruta)
+    with _lock:
+        almacen = _almacenes.get(ruta)
+        if almacen is None:
+            almacen = _almacenes[ruta] = EstadoCompartido(ruta)
+    return almacen
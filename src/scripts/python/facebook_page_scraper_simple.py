@@ -3,11 +3,29 @@ import sys
 import json
 import os
 from datetime import datetime
-import requests
 from bs4 import BeautifulSoup
-from urllib.parse import urlparse
 import re
 import pickle
+from red_scraping import obtener, solicitar, nueva_sesion, configurar_url_base
+from carrera_estrategias import correr_estrategias
+from arranque import esta_instalado, cargar_opcional
+from cache_sesion import (
+    TTL_VALIDACION_DEFECTO, huella_cookies, consultar_validez, registrar_validez, invalidar_validez
+)
+import cache_http
+import gobernador_tasa
+import grabacion_http
+import perfilado
+import pool_sesiones
+import cortacircuitos
+import presupuesto_reintentos
+from cache_resultados import con_cache_resultados
+import almacen_resultados
+from tiempos import con_tiempos, etapa, tramo
+from ajustes_extraccion import en_extraccion
+from almacen_imagenes import descargar_imagen
+from clasificador_paginas import clasificar, escanear, MARCADORES_SESION
+from documento_html import obtener_cabecera, documento_de, LIMITE_BYTES_CABECERA, PARSER_HTML_DEFECTO
 
 # Credenciales de Facebook
 FACEBOOK_CREDENTIALS = {
@@ -19,14 +37,21 @@ FACEBOOK_CREDENTIALS = {
 DIRECTORIO_SESIONES = os.path.join(os.getcwd(), 'sesiones_facebook')
 os.makedirs(DIRECTORIO_SESIONES, exist_ok=True)
 ARCHIVO_SESION = os.path.join(DIRECTORIO_SESIONES, f'session-{FACEBOOK_CREDENTIALS["username"]}.pkl')
+# Veredictos de validez de sesión por huella de cookies (ver cache_sesion.py)
+ARCHIVO_VALIDEZ_SESIONES = os.path.join(DIRECTORIO_SESIONES, 'validez_sesiones.sqlite3')
 
-# Intentar importar facebook_scraper como método alternativo
-try:
-    from facebook_scraper import get_posts, get_page_info
-    FACEBOOK_SCRAPER_DISPONIBLE = True
-except ImportError:
-    FACEBOOK_SCRAPER_DISPONIBLE = False
-    print("⚠️ facebook_scraper no disponible, usando solo método web scraping")
+# Headers de navegador de escritorio para las sesiones autenticadas
+HEADERS_NAVEGADOR = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9,es;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+# facebook_scraper (método alternativo) se importa solo la primera vez que se usa
+FACEBOOK_SCRAPER_DISPONIBLE = esta_instalado('facebook_scraper')
 
 def guardar_sesion(session):
     """
@@ -41,6 +66,7 @@ def guardar_sesion(session):
         print(f"⚠️ No se pudo guardar la sesión: {str(e)}")
         return False
 
+@etapa('cargar_sesion')
 def cargar_sesion():
     """
     Carga las cookies de la sesión desde un archivo pickle O desde Playwright (JSON)
@@ -50,15 +76,7 @@ def cargar_sesion():
         playwright_cookies_file = os.path.join(os.getcwd(), 'sesiones', 'facebook_cookies.json')
         if os.path.exists(playwright_cookies_file):
             print(f"🔄 Cargando cookies de Playwright (JSON)...")
-            session = requests.Session()
-            session.headers.update({
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9,es;q=0.8',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1'
-            })
+            session = nueva_sesion(HEADERS_NAVEGADOR, perfil='navegador')
             
             # Cargar cookies JSON de Playwright
             with open(playwright_cookies_file, 'r') as f:
@@ -79,15 +97,7 @@ def cargar_sesion():
         # PRIORIDAD 2: Sesión pickle (fallback)
         if os.path.exists(ARCHIVO_SESION):
             print(f"🔄 Cargando sesión pickle guardada...")
-            session = requests.Session()
-            session.headers.update({
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9,es;q=0.8',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1'
-            })
+            session = nueva_sesion(HEADERS_NAVEGADOR, perfil='navegador')
             
             with open(ARCHIVO_SESION, 'rb') as f:
                 session.cookies.update(pickle.load(f))
@@ -101,6 +111,27 @@ def cargar_sesion():
         print(f"⚠️ Error al cargar sesión: {str(e)}")
         return None
 
+def es_muro_login(veredicto):
+    """
+    Criterio de los métodos de acceso: URL de login, textos de login o
+    página muy vacía
+    """
+    return veredicto['login_en_url'] or veredicto['texto_login'] or veredicto['longitud'] < 500
+
+def clasificar_respuesta(response, texto_visible=None):
+    """
+    Clasifica una respuesta de Facebook. El escaneo de marcadores se guarda
+    en la respuesta: al volver a clasificarla (con el texto visible) no se
+    recorre otra vez el cuerpo
+    """
+    veredicto = clasificar(
+        response.text, response.url, 'facebook', texto_visible,
+        marcadores=getattr(response, 'marcadores_pagina', None)
+    )
+    response.marcadores_pagina = veredicto['marcadores']
+    return veredicto
+
+@etapa('verificar_sesion_valida')
 def verificar_sesion_valida(session):
     """
     Verifica si la sesión guardada sigue siendo válida
@@ -108,24 +139,27 @@ def verificar_sesion_valida(session):
     try:
         print("🔍 Verificando si la sesión es válida...")
         # Intentar acceder a una página que requiere autenticación
-        response = session.get('https://www.facebook.com/', timeout=10)
+        response = obtener(session, 'https://www.facebook.com/', timeout=10)
+        
+        # Una sola pasada por el contenido para todas las señales
+        marcadores = escanear(response.text, MARCADORES_SESION)
+        url_respuesta = response.url.lower()
         
         # Indicadores de que NO estamos autenticados (más específicos)
-        contenido = response.text.lower()
         es_pagina_login = (
-            '/login' in response.url.lower() or
-            'www.facebook.com/login' in response.url.lower() or
-            ('you must log in' in contenido and 'log into facebook' in contenido) or  # Página específica de login forzado
-            ('name="email"' in contenido and 'name="pass"' in contenido and len(contenido) < 5000)  # Form de login pequeño
+            '/login' in url_respuesta or
+            'www.facebook.com/login' in url_respuesta or
+            ('you must log in' in marcadores and 'log into facebook' in marcadores) or  # Página específica de login forzado
+            ('name="email"' in marcadores and 'name="pass"' in marcadores and len(response.text) < 5000)  # Form de login pequeño
         )
         
         # Indicadores de que SÍ estamos autenticados
         es_autenticado = (
-            'feed' in response.url.lower() or
-            'home.php' in response.url.lower() or
-            'data-testid="search"' in contenido or
-            'navigation' in contenido[:5000] or
-            'userNavigationLabel' in contenido
+            'feed' in url_respuesta or
+            'home.php' in url_respuesta or
+            'data-testid="search"' in marcadores or
+            marcadores.get('navigation', 5000) < 5000 or
+            'usernavigationlabel' in marcadores
         )
         
         if es_autenticado and response.status_code == 200:
@@ -139,19 +173,40 @@ def verificar_sesion_valida(session):
             return False
             
     except Exception as e:
+        # None = no se pudo verificar (error de red), distinto de sesión inválida
         print(f"⚠️ Error al verificar sesión: {str(e)}")
-        return False
+        return None
+
+def sesion_valida_con_cache(session, huella, ttl=TTL_VALIDACION_DEFECTO):
+    """
+    Igual que verificar_sesion_valida, pero reutiliza el veredicto guardado
+    para este conjunto de cookies mientras no venza el TTL
+    """
+    veredicto = consultar_validez(ARCHIVO_VALIDEZ_SESIONES, huella, ttl)
+    if veredicto is not None:
+        print(f"♻️ Validez de sesión en caché: {'válida' if veredicto else 'inválida'}")
+        return veredicto
+    
+    valida = verificar_sesion_valida(session)
+    if valida is not None:
+        registrar_validez(ARCHIVO_VALIDEZ_SESIONES, huella, valida)
+    return valida
 
-def realizar_login_facebook(session):
+@etapa('realizar_login_facebook')
+def realizar_login_facebook(session, credenciales=None, guardar=guardar_sesion, al_rechazar=None):
     """
-    Realiza login en Facebook usando las credenciales proporcionadas
+    Realiza login en Facebook usando las credenciales proporcionadas (por
+    defecto FACEBOOK_CREDENTIALS) y guarda la sesión con `guardar`. Si
+    Facebook redirige al login o a un checkpoint llama a `al_rechazar` con
+    el motivo (pool_sesiones.MURO_LOGIN o CHECKPOINT)
     """
+    credenciales = credenciales or FACEBOOK_CREDENTIALS
     try:
         print("🔐 Iniciando sesión en Facebook...")
         
         # Obtener la página de login
         login_url = "https://www.facebook.com/login"
-        response = session.get(login_url)
+        response = obtener(session, login_url)
         
         if response.status_code != 200:
             print(f"❌ Error al acceder a la página de login: {response.status_code}")
@@ -165,6 +220,7 @@ def realizar_login_facebook(session):
         csrf_input = soup.find('input', {'name': 'fb_dtsg'})
         if csrf_input:
             csrf_token = csrf_input.get('value')
+        soup.decompose()  # árbol con referencias circulares: se libera ya, sin esperar al recolector
         
         if not csrf_token:
             print("⚠️ No se pudo obtener el token CSRF")
@@ -174,14 +230,16 @@ def realizar_login_facebook(session):
         
         # Preparar datos de login
         login_data = {
-            'email': FACEBOOK_CREDENTIALS['username'],
-            'pass': FACEBOOK_CREDENTIALS['password'],
+            'email': credenciales['username'],
+            'pass': credenciales['password'],
             'login': 'Iniciar sesión',
             'fb_dtsg': csrf_token
         }
         
         # Realizar el login
-        login_response = session.post(
+        login_response = solicitar(
+            session,
+            'POST',
             'https://www.facebook.com/login',
             data=login_data,
             allow_redirects=True
@@ -191,17 +249,66 @@ def realizar_login_facebook(session):
         if 'login' not in login_response.url.lower() and 'checkpoint' not in login_response.url.lower():
             print("✅ Login exitoso en Facebook")
             # Guardar la sesión para futuras ejecuciones
-            guardar_sesion(session)
+            guardar(session)
             return True
         else:
             print("❌ Login falló - redirigido a página de login")
+            if al_rechazar:
+                al_rechazar(pool_sesiones.CHECKPOINT if 'checkpoint' in login_response.url.lower() else pool_sesiones.MURO_LOGIN)
             return False
             
     except Exception as e:
         print(f"❌ Error durante el login: {str(e)}")
         return False
 
+def sesion_del_pool(ttl_validacion):
+    """
+    Toma cuentas del pool de sesiones hasta dar con una de sesión válida (o
+    que consiga iniciar sesión). Devuelve (cuenta, sesión, huella) o
+    (None, None, None) si ninguna sirve ahora
+    """
+    probadas = []
+    for _ in range(pool_sesiones.INTENTOS_POR_EXTRACCION):
+        cuenta = pool_sesiones.adquirir(excluir=probadas)
+        if cuenta is None:
+            break
+        probadas.append(cuenta.nombre)
+        print(f"👥 Usando cuenta del pool: {cuenta.nombre}")
+        session = cuenta.aplicar_cookies(nueva_sesion(HEADERS_NAVEGADOR, perfil='navegador'))
+        if cuenta.cookies:
+            huella = huella_cookies(session.cookies)
+            valida = sesion_valida_con_cache(session, huella, ttl_validacion)
+            if valida:
+                return cuenta, session, huella
+            if valida is None:
+                continue  # no se pudo verificar (error de red): la cuenta no tiene la culpa
+        if cuenta.credenciales:
+            if realizar_login_facebook(session, cuenta.credenciales, cuenta.guardar_cookies,
+                                       al_rechazar=lambda motivo: pool_sesiones.informar(cuenta, motivo)):
+                huella = huella_cookies(session.cookies)
+                registrar_validez(ARCHIVO_VALIDEZ_SESIONES, huella, True)
+                return cuenta, session, huella
+        else:
+            pool_sesiones.informar(cuenta, pool_sesiones.SESION_INVALIDA)
+    return None, None, None
+
 def extraer_pagina_facebook_simple(parametros):
+    """
+    Punto de entrada: reutiliza el resultado de la caché de resultados si
+    la página se resolvió hace poco; si no, lo extrae y lo guarda. El
+    resultado lleva el desglose de tiempos por etapa en 'timings' (y, con
+    perfil, la ruta de su perfil cProfile en 'perfil')
+    """
+    def extraer(parametros):
+        resultado = con_cache_resultados('facebook', 'pageName', parametros, extraer_pagina_facebook_sin_cache)
+        return almacen_resultados.registrar_reutilizado('facebook', parametros, resultado)
+    # Los ajustes que fijen los parámetros (cacheHttp, poolSesiones...) valen solo para esta extracción
+    return en_extraccion(
+        perfilado.con_perfil, 'facebook', 'pageName', parametros,
+        lambda parametros: con_tiempos('facebook', 'pageName', parametros, extraer)
+    )
+
+def extraer_pagina_facebook_sin_cache(parametros):
     """
     Extrae información básica de una página de Facebook usando múltiples métodos anti-login
     """
@@ -214,6 +321,28 @@ def extraer_pagina_facebook_simple(parametros):
         incluir_comentarios = params.get('incluirComentarios', False)
         incluir_reacciones = params.get('incluirReacciones', True)
         cookies_desde_js = params.get('cookies', None)  # NUEVO: cookies desde JavaScript
+        estrategias_paralelas = params.get('estrategiasParalelas', 1)  # >1: métodos en carrera
+        retardo_cobertura = params.get('retardoCobertura', None)  # segundos antes de lanzar el siguiente método
+        orden_adaptativo = params.get('ordenAdaptativo', True)  # ordenar métodos según su historial
+        ttl_validacion = params.get('ttlValidacionSesion', TTL_VALIDACION_DEFECTO)  # segundos
+        solo_cabecera = params.get('soloCabecera', False)  # leer solo la cabecera de la página
+        limite_bytes_cabecera = params.get('limiteBytesCabecera', LIMITE_BYTES_CABECERA)
+        parser_html = params.get('parserHtml', PARSER_HTML_DEFECTO)  # html.parser (defecto), lxml, selectolax o auto
+        cache_http.configurar_desde_parametros(params)  # caché HTTP en disco (cacheHttp)
+        gobernador_tasa.configurar_desde_parametros(params)  # tasa compartida por dominio (gobernadorTasa)
+        cortacircuitos.configurar_desde_parametros(params)  # saltar endpoints caídos (cortacircuitos)
+        presupuesto_reintentos.configurar_desde_parametros(params)  # reintentosMaximos, proporcionReintentos
+        grabacion_http.configurar_desde_parametros(params)  # grabarHttp / reproducirHttp, escalaLatencia
+        pool_sesiones.configurar_desde_parametros(params)  # varias cuentas con rotación (poolSesiones)
+        if 'urlBase' in params:
+            configurar_url_base(params['urlBase'], proceso=False)  # servidor sustituto (benchmarks sin red)
+        almacen_resultados.configurar_desde_parametros(params, directorio)  # resultados en SQLite (almacenResultados)
+        
+        def descargar(sesion, url, **kwargs):
+            # Página principal: completa o, si se pidió, solo hasta la cabecera
+            if solo_cabecera:
+                return obtener_cabecera(sesion, url, limite_bytes_cabecera, **kwargs)
+            return obtener(sesion, url, **kwargs)
         
         if not page_name:
             raise ValueError("Nombre de página es requerido")
@@ -227,18 +356,12 @@ def extraer_pagina_facebook_simple(parametros):
         # PRIORIDAD 1: Usar cookies desde JavaScript (Playwright) si se proporcionan
         session = None
         login_exitoso = False
+        huella_sesion = None  # huella de las cookies tal como se cargaron
+        cuenta = None  # cuenta del pool de sesiones en uso
         
         if cookies_desde_js:
             print("🍪 Usando cookies de Playwright (desde JavaScript)...")
-            session = requests.Session()
-            session.headers.update({
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9,es;q=0.8',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1'
-            })
+            session = nueva_sesion(HEADERS_NAVEGADOR, perfil='navegador')
             
             # Convertir cookies de Playwright a requests
             for cookie in cookies_desde_js:
@@ -250,18 +373,29 @@ def extraer_pagina_facebook_simple(parametros):
                 )
             
             # Verificar si las cookies son válidas
-            if verificar_sesion_valida(session):
+            huella_sesion = huella_cookies(session.cookies)
+            if sesion_valida_con_cache(session, huella_sesion, ttl_validacion):
                 login_exitoso = True
                 print("✅ Cookies de Playwright válidas y activas")
             else:
                 print("⚠️ Cookies de Playwright expiradas")
                 session = None
         
+        # PRIORIDAD 2 (con poolSesiones): una cuenta del pool en vez de la cuenta única
+        if not session and pool_sesiones.activo():
+            cuenta, session, huella_sesion = sesion_del_pool(ttl_validacion)
+            if session:
+                login_exitoso = True
+            else:
+                print("⚠️ Ninguna cuenta del pool disponible, continuando sin login...")
+                session = nueva_sesion(HEADERS_NAVEGADOR, perfil='navegador')
+        
         # PRIORIDAD 2: Intentar cargar sesión guardada
         if not session:
             session = cargar_sesion()
             if session:
-                if verificar_sesion_valida(session):
+                huella_sesion = huella_cookies(session.cookies)
+                if sesion_valida_con_cache(session, huella_sesion, ttl_validacion):
                     login_exitoso = True
                     print("✅ Usando sesión guardada válida")
                 else:
@@ -271,18 +405,13 @@ def extraer_pagina_facebook_simple(parametros):
         # PRIORIDAD 3: Si no hay sesión válida, crear una nueva y hacer login
         if not session:
             print("🔑 Creando nueva sesión de Facebook...")
-            session = requests.Session()
-            session.headers.update({
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9,es;q=0.8',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1'
-            })
+            session = nueva_sesion(HEADERS_NAVEGADOR, perfil='navegador')
             
             # Intentar hacer login
             login_exitoso = realizar_login_facebook(session)
+            if login_exitoso:
+                huella_sesion = huella_cookies(session.cookies)
+                registrar_validez(ARCHIVO_VALIDEZ_SESIONES, huella_sesion, True)
         
         # Métodos de acceso sin login - probamos varios enfoques
         metodos = [
@@ -343,66 +472,63 @@ def extraer_pagina_facebook_simple(parametros):
         ]
         
         response = None
-        session = None
         metodo_exitoso = None
         
         # Si el login fue exitoso, usar la sesión autenticada
         if login_exitoso:
             print("🔄 Usando sesión autenticada para acceder a la página...")
             try:
-                response = session.get(url_pagina, timeout=30, allow_redirects=True)
+                with tramo('sesion_autenticada'):
+                    response = descargar(session, url_pagina, timeout=30, allow_redirects=True)
                 metodo_exitoso = "Sesión autenticada"
                 
                 # Verificar si es exitoso
-                es_login = (
-                    'login' in response.url.lower() or
-                    'iniciar sesión' in response.text.lower() or
-                    'entrar en facebook' in response.text.lower() or
-                    'log in' in response.text.lower() or
-                    len(response.text.strip()) < 500
-                )
+                es_login = es_muro_login(clasificar_respuesta(response))
                 
                 if response.status_code == 200 and not es_login:
                     print(f"✅ Acceso exitoso con sesión autenticada")
+                    pool_sesiones.informar(cuenta, pool_sesiones.OK)
                 else:
                     print(f"⚠️ Sesión autenticada falló, probando métodos alternativos...")
                     login_exitoso = False
+                    metodo_exitoso = None
+                    if es_login and huella_sesion:
+                        # Muro de login: el veredicto cacheado ya no es fiable
+                        invalidar_validez(ARCHIVO_VALIDEZ_SESIONES, huella_sesion)
+                        pool_sesiones.informar(cuenta, pool_sesiones.CHECKPOINT if 'checkpoint' in response.url.lower()
+                                               else pool_sesiones.MURO_LOGIN)
             except Exception as e:
                 print(f"⚠️ Error con sesión autenticada: {str(e)}")
                 login_exitoso = False
         
         # Si no hay login o falló, probar métodos alternativos
         if not login_exitoso:
-            # Probar cada método hasta encontrar uno que funcione
-            for metodo in metodos:
-                try:
+            # Probar los métodos (ordenados por su historial de éxito y latencia,
+            # en carrera/cobertura si se configuró) hasta encontrar uno que funcione
+            def preparar_metodo(metodo):
+                def ejecutar():
                     print(f"🔄 Probando método: {metodo['nombre']}")
-                    
-                    session_alt = requests.Session()
-                    session_alt.headers.update(metodo['headers'])
-                    
-                    response = session_alt.get(metodo['url'], timeout=30, allow_redirects=True)
-                    
-                    # Verificar si es exitoso
-                    es_login = (
-                        'login' in response.url.lower() or
-                        'iniciar sesión' in response.text.lower() or
-                        'entrar en facebook' in response.text.lower() or
-                        'log in' in response.text.lower() or
-                        len(response.text.strip()) < 500  # Página muy vacía
-                    )
-                
-                    if response.status_code == 200 and not es_login:
-                        print(f"✅ Acceso exitoso con método: {metodo['nombre']}")
-                        metodo_exitoso = metodo['nombre']
-                        session = session_alt  # Usar la sesión que funcionó
-                        break
-                    else:
-                        print(f"⚠️ Método {metodo['nombre']} falló (login detectado o error)")
-                        
-                except Exception as e:
-                    print(f"⚠️ Error en método {metodo['nombre']}: {str(e)}")
-                    continue
+                    session_alt = nueva_sesion(metodo['headers'], perfil=metodo['nombre'])
+                    return descargar(session_alt, metodo['url'], timeout=30, allow_redirects=True), session_alt
+                return ejecutar
+            
+            def acceso_sin_login(resultado):
+                respuesta = resultado[0]
+                # Verificar si es exitoso
+                return respuesta.status_code == 200 and not es_muro_login(clasificar_respuesta(respuesta))
+            
+            estrategias = [
+                {'nombre': metodo['nombre'], 'ejecutar': preparar_metodo(metodo), 'es_valida': acceso_sin_login}
+                for metodo in metodos
+            ]
+            with tramo('metodos'):
+                nombre_ganador, resultado_ganador = correr_estrategias(
+                    estrategias, estrategias_paralelas, retardo_cobertura,
+                    grupo='facebook', orden_adaptativo=orden_adaptativo
+                )
+            if nombre_ganador:
+                metodo_exitoso = nombre_ganador
+                response, session = resultado_ganador  # Usar la sesión que funcionó
         
         # Si ningún método funcionó, intentar con facebook_scraper
         if not response or metodo_exitoso is None:
@@ -418,8 +544,8 @@ def extraer_pagina_facebook_simple(parametros):
             # Último intento con método básico
             print(f"⚠️ Todos los métodos fallaron, último intento básico...")
             try:
-                session = requests.Session()
-                response = session.get(url_pagina, timeout=30)
+                session = nueva_sesion()
+                response = descargar(session, url_pagina, timeout=30)
                 metodo_exitoso = "Último intento básico"
             except Exception as e:
                 print(f"❌ Error crítico: {str(e)}")
@@ -444,52 +570,40 @@ def extraer_pagina_facebook_simple(parametros):
             'codigo_respuesta': response.status_code if response else 0,
             'login_exitoso': login_exitoso
         }
+        if cuenta is not None:
+            datos_pagina['cuenta_sesion'] = cuenta.nombre
         
         if response and response.status_code == 200:
-            # Parsear HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # Parsear HTML (ya parseado durante la descarga si solo se leyó la cabecera)
+            documento = documento_de(response, parser_html)
+            if not documento.completo:
+                datos_pagina['bytes_leidos'] = documento.bytes_leidos
             
             # Extraer título
-            title_tag = soup.find('title')
-            if title_tag:
-                datos_pagina['titulo'] = title_tag.text.strip()
+            titulo = documento.titulo()
+            if titulo is not None:
+                datos_pagina['titulo'] = titulo.strip()
             
-            # Verificar si la página existe
-            login_detectado = (
-                'log in to facebook' in response.text.lower() or 
-                'log in' in response.text.lower() or
-                'iniciar sesión' in response.text.lower() or
-                'entrar en facebook' in response.text.lower() or
-                '/login/' in response.url or
-                len(soup.get_text().strip()) < 300
-            )
-            
-            # Detectar mensajes de bloqueo/error
-            texto_respuesta = response.text.lower()
+            # Verificar si la página existe: login, bloqueo y error en una sola pasada
+            # (con lectura parcial no se aplica el criterio de "poco texto visible")
+            veredicto = clasificar_respuesta(response, documento.texto() if documento.completo else None)
             
             # PRIORIDAD 1: Detectar páginas bloqueadas/no disponibles por navegador
-            if ('not available on this browser' in texto_respuesta or
-                'facebook is not available' in texto_respuesta or
-                'unsupported browser' in texto_respuesta or
-                'navegador no compatible' in texto_respuesta):
+            if veredicto['estado'] == 'navegador_bloqueado':
                 datos_pagina['pagina_existe'] = False
                 datos_pagina['error'] = 'Facebook no disponible en este navegador (posiblemente bloqueado)'
                 print(f"🚫 Página bloqueada por navegador")
             
             # PRIORIDAD 2: Detectar páginas no encontradas/eliminadas
-            elif ('not found' in texto_respuesta or 
-                  'page not found' in texto_respuesta or
-                  'no se encontró' in texto_respuesta or
-                  'contenido no está disponible' in texto_respuesta or
-                  'content isn\'t available' in texto_respuesta or
-                  'this content isn\'t available' in texto_respuesta):
+            elif veredicto['estado'] == 'no_encontrado':
                 datos_pagina['pagina_existe'] = False
                 datos_pagina['error'] = 'Página no encontrada o contenido no disponible'
                 print(f"🚫 Página no encontrada")
             
             # PRIORIDAD 3: Requiere login (pero la página EXISTE)
-            elif login_detectado:
+            elif veredicto['estado'] == 'muro_login':
                 print(f"🔒 Página requiere login - contenido limitado")
+                gobernador_tasa.informar_muro_login(url_pagina)
                 datos_pagina['pagina_existe'] = True
                 datos_pagina['requiere_login'] = True
                 datos_pagina['descripcion'] = 'Página de Facebook (requiere autenticación para ver contenido completo)'
@@ -499,72 +613,61 @@ def extraer_pagina_facebook_simple(parametros):
                 datos_pagina['pagina_existe'] = True
                 print(f"✅ Contenido de página accesible sin login")
         
-        # Intentar extraer información del meta description
-        meta_desc = soup.find('meta', {'name': 'description'})
-        if meta_desc and meta_desc.get('content'):
-            if not datos_pagina['descripcion'] or 'requiere autenticación' in datos_pagina['descripcion']:
-                datos_pagina['descripcion'] = meta_desc.get('content')
-        
-        # Intentar extraer información de Open Graph
-        og_title = soup.find('meta', {'property': 'og:title'})
-        if og_title and og_title.get('content'):
-            datos_pagina['titulo'] = og_title.get('content')
-        
-        og_desc = soup.find('meta', {'property': 'og:description'})
-        if og_desc and og_desc.get('content'):
-            if not datos_pagina['descripcion'] or 'requiere autenticación' in datos_pagina['descripcion']:
-                datos_pagina['descripcion'] = og_desc.get('content')
+            # Intentar extraer información del meta description
+            meta_desc = documento.meta(nombre='description')
+            if meta_desc:
+                if not datos_pagina['descripcion'] or 'requiere autenticación' in datos_pagina['descripcion']:
+                    datos_pagina['descripcion'] = meta_desc
+        
+            # Intentar extraer información de Open Graph
+            og_title = documento.meta(propiedad='og:title')
+            if og_title:
+                datos_pagina['titulo'] = og_title
+        
+            og_desc = documento.meta(propiedad='og:description')
+            if og_desc:
+                if not datos_pagina['descripcion'] or 'requiere autenticación' in datos_pagina['descripcion']:
+                    datos_pagina['descripcion'] = og_desc
             
-            # Buscar imagen de perfil
-            imagen_url = None
-            try:
-                # Buscar meta tags de Open Graph para imagen
-                og_image = soup.find('meta', {'property': 'og:image'})
+                # Buscar imagen de perfil
+                imagen_url = None
+                try:
+                    # Buscar meta tags de Open Graph para imagen
+                    og_image = documento.meta(propiedad='og:image')
                 
-                if og_image and og_image.get('content'):
-                    imagen_url = og_image.get('content')
-                else:
-                    # Buscar en otros lugares del HTML
-                    img_tags = soup.find_all('img')
-                    for img in img_tags:
-                        src = img.get('src', '')
-                        if 'profile' in src.lower() or 'avatar' in src.lower() or 'scontent' in src:
-                            imagen_url = src
-                            break
+                    if og_image:
+                        imagen_url = og_image
+                    else:
+                        # Buscar en otros lugares del HTML
+                        for src in documento.imagenes():
+                            if 'profile' in src.lower() or 'avatar' in src.lower() or 'scontent' in src:
+                                imagen_url = src
+                                break
                 
-                if imagen_url:
-                    datos_pagina['imagen_perfil'] = imagen_url
+                    if imagen_url:
+                        datos_pagina['imagen_perfil'] = imagen_url
                     
-                    # Intentar descargar la imagen de perfil
-                    try:
-                        directorio_imagenes = os.path.join(directorio, 'profile_images')
-                        os.makedirs(directorio_imagenes, exist_ok=True)
-                        
-                        img_response = session.get(imagen_url, timeout=30)
-                        if img_response.status_code == 200 and len(img_response.content) > 1000:
-                            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                            extension = os.path.splitext(urlparse(imagen_url).path)[1] or '.jpg'
-                            nombre_imagen = f'profile_{page_name}_{timestamp}{extension}'
-                            ruta_imagen = os.path.join(directorio_imagenes, nombre_imagen)
-                            
-                            with open(ruta_imagen, 'wb') as f:
-                                f.write(img_response.content)
-                            
-                            datos_pagina['imagen_perfil_descargada'] = True
-                            datos_pagina['ruta_imagen_perfil'] = ruta_imagen
-                            datos_pagina['tamanio_imagen_perfil'] = len(img_response.content)
-                            datos_pagina['pagina_existe'] = True
+                        # Intentar descargar la imagen de perfil
+                        try:
+                            # Almacén por contenido: una imagen ya guardada no se vuelve a escribir
+                            imagen = descargar_imagen(session, imagen_url, directorio, 'facebook', page_name, minimo_bytes=1001)
+                            if imagen['exito']:
+                                datos_pagina['imagen_perfil_descargada'] = True
+                                datos_pagina['ruta_imagen_perfil'] = imagen['ruta']
+                                datos_pagina['tamanio_imagen_perfil'] = imagen['tamanio']
+                                datos_pagina['hash_imagen_perfil'] = imagen['hash']
+                                datos_pagina['pagina_existe'] = True
                             
-                            print(f"✅ Imagen de perfil descargada: {ruta_imagen}")
-                        else:
-                            print(f"⚠️ No se pudo descargar imagen de perfil: HTTP {img_response.status_code}")
-                    except Exception as e:
-                        print(f"⚠️ Error al descargar imagen de perfil: {str(e)}")
-                else:
-                    print(f"⚠️ No se encontró imagen de perfil en la página")
+                                print(f"✅ Imagen de perfil descargada: {imagen['ruta']}")
+                            else:
+                                print(f"⚠️ No se pudo descargar imagen de perfil: {imagen['error']}")
+                        except Exception as e:
+                            print(f"⚠️ Error al descargar imagen de perfil: {str(e)}")
+                    else:
+                        print(f"⚠️ No se encontró imagen de perfil en la página")
                     
-            except Exception as e:
-                print(f"⚠️ Error al buscar imagen de perfil: {str(e)}")
+                except Exception as e:
+                    print(f"⚠️ Error al buscar imagen de perfil: {str(e)}")
         
         elif response and response.status_code == 404:
             datos_pagina['pagina_existe'] = False
@@ -575,10 +678,10 @@ def extraer_pagina_facebook_simple(parametros):
                 datos_pagina['pagina_existe'] = False
                 datos_pagina['error'] = f'Error HTTP {response.status_code if response else "sin respuesta"}'
         
-        # Guardar datos en archivo JSON
-        archivo_salida = os.path.join(directorio, f'facebook_page_{page_name}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
-        with open(archivo_salida, 'w', encoding='utf-8') as f:
-            json.dump(datos_pagina, f, ensure_ascii=False, indent=2)
+        # Guardar datos en archivo JSON (o en el almacén de resultados si está activo)
+        archivo_salida = almacen_resultados.guardar_datos(
+            directorio, f'facebook_page_{page_name}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json', 'facebook', page_name, datos_pagina
+        )
         
         return {
             'exito': True,
@@ -594,17 +697,21 @@ def extraer_pagina_facebook_simple(parametros):
             'mensaje': f'Error al extraer página: {str(e)}'
         }
 
+@etapa('facebook_scraper')
 def extraer_con_facebook_scraper(page_name, directorio):
     """
     Extrae información de Facebook usando facebook_scraper como método alternativo
     """
     try:
-        if not FACEBOOK_SCRAPER_DISPONIBLE:
+        facebook_scraper = cargar_opcional(
+            'facebook_scraper', "⚠️ facebook_scraper no disponible, usando solo método web scraping"
+        )
+        if facebook_scraper is None:
             raise Exception("facebook_scraper no está disponible")
             
         print(f"🔄 Extrayendo información de {page_name} con facebook_scraper...")
         
-        page_info = get_page_info(page_name)
+        page_info = facebook_scraper.get_page_info(page_name)
         
         datos_pagina = {
             'page_name': page_name,
@@ -630,7 +737,7 @@ def extraer_con_facebook_scraper(page_name, directorio):
         
         # Intentar extraer algunos posts recientes
         try:
-            posts = list(get_posts(page_name, pages=1))[:5]
+            posts = list(facebook_scraper.get_posts(page_name, pages=1))[:5]
             posts_info = []
             
             for post in posts:
@@ -654,31 +761,24 @@ def extraer_con_facebook_scraper(page_name, directorio):
         # Intentar descargar imagen de perfil si está disponible
         if 'profile_picture' in page_info and page_info['profile_picture']:
             try:
-                import urllib.request
-                directorio_imagenes = os.path.join(directorio, 'profile_images')
-                os.makedirs(directorio_imagenes, exist_ok=True)
-                
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                nombre_imagen = f'profile_{page_name}_{timestamp}.jpg'
-                ruta_imagen = os.path.join(directorio_imagenes, nombre_imagen)
-                
-                urllib.request.urlretrieve(page_info['profile_picture'], ruta_imagen)
+                imagen = descargar_imagen(None, page_info['profile_picture'], directorio, 'facebook', page_name)
+                if not imagen['exito']:
+                    raise Exception(imagen['error'])
                 
                 datos_pagina['imagen_perfil_descargada'] = True
-                datos_pagina['ruta_imagen_perfil'] = ruta_imagen
+                datos_pagina['ruta_imagen_perfil'] = imagen['ruta']
                 datos_pagina['imagen_perfil'] = page_info['profile_picture']
+                datos_pagina['tamanio_imagen_perfil'] = imagen['tamanio']
+                datos_pagina['hash_imagen_perfil'] = imagen['hash']
                 
-                if os.path.exists(ruta_imagen):
-                    datos_pagina['tamanio_imagen_perfil'] = os.path.getsize(ruta_imagen)
-                
-                print(f"✅ Imagen de perfil descargada con facebook_scraper: {ruta_imagen}")
+                print(f"✅ Imagen de perfil descargada con facebook_scraper: {imagen['ruta']}")
             except Exception as e:
                 print(f"⚠️ Error al descargar imagen con facebook_scraper: {str(e)}")
         
-        # Guardar datos en archivo JSON
-        archivo_salida = os.path.join(directorio, f'facebook_page_{page_name}_{datetime.now().strftime("%Y%m%d_%H%M%S")}_facebook_scraper.json')
-        with open(archivo_salida, 'w', encoding='utf-8') as f:
-            json.dump(datos_pagina, f, ensure_ascii=False, indent=2)
+        # Guardar datos en archivo JSON (o en el almacén de resultados si está activo)
+        archivo_salida = almacen_resultados.guardar_datos(
+            directorio, f'facebook_page_{page_name}_{datetime.now().strftime("%Y%m%d_%H%M%S")}_facebook_scraper.json', 'facebook', page_name, datos_pagina
+        )
         
         return {
             'exito': True,
@@ -696,14 +796,42 @@ def extraer_con_facebook_scraper(page_name, directorio):
         }
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
+    from registro_eventos import separar_opciones, modo_maquina
+    try:
+        formato_registro, nivel_registro, argumentos = separar_opciones(sys.argv[1:])
+        opciones_grabacion, argumentos = grabacion_http.separar_opciones(argumentos)
+        grabacion_http.configurar_desde_parametros(opciones_grabacion, proceso=True)
+        opciones_perfil, argumentos = perfilado.separar_opciones(argumentos)
+        perfilado.configurar_desde_parametros(opciones_perfil, proceso=True)
+    except ValueError as e:
+        print(json.dumps({'exito': False, 'error': 'Parámetros incorrectos', 'mensaje': str(e)}))
+        sys.exit(1)
+    
+    if argumentos == ['--serve']:
+        from servidor_jsonl import servir
+        servir(extraer_pagina_facebook_simple, formato=formato_registro or 'texto', nivel_minimo=nivel_registro)
+        sys.exit(0)
+    
+    if argumentos and argumentos[0] == '--startup-report':
+        from arranque import reporte_arranque
+        sys.exit(reporte_arranque(__file__, argumentos[1:], dependencias_diferidas=('facebook_scraper',)))
+    
+    if len(argumentos) != 1:
         print(json.dumps({
             'exito': False,
             'error': 'Parámetros incorrectos',
-            'mensaje': 'Uso: python facebook_page_scraper_simple.py <parametros_json>'
+            'mensaje': 'Uso: python facebook_page_scraper_simple.py [--maquina] [--registro json|texto|ninguno] '
+                       '[--nivel-registro error|aviso|info] [--grabar DIR | --reproducir DIR] [--escala-latencia X] '
+                       '[--perfil[=DIR]] <parametros_json> | --serve | --startup-report [--presupuesto-ms N]'
         }))
         sys.exit(1)
     
-    parametros = sys.argv[1]
+    parametros = argumentos[0]
+    salida = sys.stdout
+    if formato_registro is not None:
+        # Modo máquina: el progreso va a stderr (o se descarta) hasta el final del
+        # proceso, hilos y atexit incluidos, y el stdout original solo lleva el resultado
+        salida = modo_maquina(formato_registro, nivel_registro)
     resultado = extraer_pagina_facebook_simple(parametros)
-    print(json.dumps(resultado, ensure_ascii=False))
+    salida.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+    salida.flush()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Gobernador de tasa compartido para los hosts de Facebook e Instagram.
+
+Cada dominio gobernado (facebook.com, instagram.com y sus subdominios)
+tiene una cubeta de fichas: cada petición consume una y las fichas se
+reponen a la tasa actual del dominio, con un máximo de RAFAGA. El estado
+de las cubetas vive en una base SQLite pequeña, así todos los hilos y
+procesos de una máquina (lotes, modo --serve, llamadas sueltas desde
+Node) reparten el mismo presupuesto.
+
+La tasa se adapta (AIMD): un 429 o un 401 la reducen a la mitad y un
+veredicto de muro de login a tres cuartos, vaciando la cubeta; cada
+respuesta limpia la sube un poco, hasta la tasa máxima del dominio. Así el ritmo sostenido se queda
+cerca del límite real en lugar de una pausa fija conservadora.
+
+Parámetros del extractor: gobernadorTasa (true o ruta de la base) y
+tasasMaximas ({dominio: peticiones por segundo}).
+"""
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from ajustes_extraccion import Ajuste
+
+ARCHIVO_GOBERNADOR_DEFECTO = os.path.join(os.getcwd(), 'gobernador_tasa', 'cubetas.sqlite3')
+
+# Peticiones por segundo máximas por dominio (incluye subdominios). Los CDN
+# de imágenes y los hosts sin regla no se gobiernan
+TASAS_MAXIMAS_DEFECTO = {
+    'facebook.com': 1.0,
+    'instagram.com': 0.5
+}
+RAFAGA = 5
+# Fracción de la tasa máxima por debajo de la que nunca se baja
+FRACCION_TASA_MINIMA = 0.05
+# Incremento por respuesta limpia, como fracción de la tasa máxima
+FRACCION_INCREMENTO = 0.05
+FACTOR_REDUCCION = 0.5
+# Un muro de login es una señal más débil que un 429/401 explícito
+FACTOR_REDUCCION_MURO = 0.75
+# Espera máxima entre comprobaciones de cancelación
+PASO_ESPERA = 0.5
+
+ESTADOS_LIMITADOS = (401, 429)
+
+_ajuste = Ajuste('gobernador_tasa')
+_lock = threading.Lock()
+_preparadas = set()
+
+
+def _preparar(ruta):
+    # Tabla de cubetas, una vez por base y proceso
+    with _lock:
+        if ruta in _preparadas:
+            return
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        conexion = sqlite3.connect(ruta, timeout=30)
+        try:
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('''
+                CREATE TABLE IF NOT EXISTS cubetas (
+                    dominio TEXT PRIMARY KEY,
+                    fichas REAL,
+                    tasa REAL,
+                    actualizada REAL
+                )
+            ''')
+            conexion.commit()
+        finally:
+            conexion.close()
+        _preparadas.add(ruta)
+
+
+def configurar(ruta=None, tasas_maximas=None, proceso=True):
+    """
+    Activa el gobernador con la base `ruta` para todo el proceso o, con
+    proceso=False, solo para la extracción en curso
+    """
+    configuracion = {
+        'ruta': os.path.abspath(ruta or ARCHIVO_GOBERNADOR_DEFECTO),
+        'tasas_maximas': {**TASAS_MAXIMAS_DEFECTO, **(tasas_maximas or {})}
+    }
+    _preparar(configuracion['ruta'])
+    _ajuste.fijar(configuracion, proceso)
+
+
+def configurar_desde_parametros(params, proceso=False):
+    """
+    Parámetros del extractor: gobernadorTasa (true o ruta; false lo
+    desactiva) y tasasMaximas ({dominio: peticiones/s}). Sin gobernadorTasa
+    se mantiene la configuración del proceso
+    """
+    if 'gobernadorTasa' not in params:
+        return
+    valor = params['gobernadorTasa']
+    if not valor:
+        _ajuste.fijar(None, proceso)
+        return
+    configurar(valor if isinstance(valor, str) else None, params.get('tasasMaximas'), proceso)
+
+
+def activo():
+    return _ajuste.valor() is not None
+
+
+def dominio_gobernado(url):
+    """
+    Dominio con regla de tasa al que pertenece la URL, o None
+    """
+    if _ajuste.valor() is None:
+        return None
+    host = (urlparse(url).hostname or '').lower()
+    for dominio in _ajuste.valor()['tasas_maximas']:
+        if host == dominio or host.endswith('.' + dominio):
+            return dominio
+    return None
+
+
+@contextmanager
+def _transaccion():
+    # BEGIN IMMEDIATE: lectura y actualización de la cubeta sin que otro proceso se cuele
+    conexion = sqlite3.connect(_ajuste.valor()['ruta'], timeout=30, isolation_level=None)
+    try:
+        conexion.execute('BEGIN IMMEDIATE')
+        try:
+            yield conexion
+            conexion.execute('COMMIT')
+        except BaseException:
+            conexion.execute('ROLLBACK')
+            raise
+    finally:
+        conexion.close()
+
+
+@contextmanager
+def _lectura():
+    # Lectura sin reservar la base: no bloquea a los demás procesos
+    conexion = sqlite3.connect(_ajuste.valor()['ruta'], timeout=30)
+    try:
+        yield conexion
+    finally:
+        conexion.close()
+
+
+def _cubeta(conexion, dominio, ahora):
+    """
+    (fichas, tasa) del dominio con las fichas repuestas hasta `ahora`
+    """
+    tasa_maxima = _ajuste.valor()['tasas_maximas'][dominio]
+    fila = conexion.execute('SELECT fichas, tasa, actualizada FROM cubetas WHERE dominio = ?', (dominio,)).fetchone()
+    if fila is None:
+        return float(RAFAGA), tasa_maxima
+    fichas, tasa, actualizada = fila
+    tasa = min(tasa, tasa_maxima)  # la tasa máxima pudo bajar desde la última vez
+    return min(float(RAFAGA), fichas + max(0.0, ahora - actualizada) * tasa), tasa
+
+
+def _guardar(conexion, dominio, fichas, tasa, ahora):
+    conexion.execute('INSERT OR REPLACE INTO cubetas VALUES (?, ?, ?, ?)', (dominio, fichas, tasa, ahora))
+
+
+def esperar_turno(url, verificar=None):
+    """
+    Bloquea hasta que haya una ficha para el dominio de `url` y la consume.
+    `verificar` se llama entre esperas (para respetar la cancelación).
+    Devuelve los segundos esperados.
+
+    La espera se calcula con una lectura; solo se abre una transacción de
+    escritura cuando hay ficha que consumir. Si la base falla, la petición
+    sigue sin esperar
+    """
+    dominio = dominio_gobernado(url)
+    if dominio is None:
+        return 0.0
+    inicio = time.monotonic()
+    while True:
+        ahora = time.time()
+        try:
+            with _lectura() as conexion:
+                fichas, tasa = _cubeta(conexion, dominio, ahora)
+            if fichas >= 1:
+                with _transaccion() as conexion:
+                    # Otro proceso pudo llevarse la ficha entre la lectura y la reserva
+                    fichas, tasa = _cubeta(conexion, dominio, ahora)
+                    if fichas >= 1:
+                        _guardar(conexion, dominio, fichas - 1, tasa, ahora)
+                        return time.monotonic() - inicio
+        except sqlite3.Error as e:
+            print(f"⚠️ No se pudo consultar el gobernador de tasa, se sigue sin esperar: {str(e)}")
+            return time.monotonic() - inicio
+        if verificar:
+            verificar()
+        time.sleep(min(PASO_ESPERA, (1 - fichas) / tasa))
+
+
+def informar(url, limitado, factor=FACTOR_REDUCCION):
+    """
+    Ajusta la tasa del dominio de `url`: multiplicada por `factor` (y
+    cubeta vacía) si la respuesta fue limitada, un poco más alta si fue limpia
+    """
+    dominio = dominio_gobernado(url)
+    if dominio is None:
+        return
+    tasa_maxima = _ajuste.valor()['tasas_maximas'][dominio]
+    ahora = time.time()
+    try:
+        with _transaccion() as conexion:
+            fichas, tasa = _cubeta(conexion, dominio, ahora)
+            if limitado:
+                nueva_tasa = max(tasa_maxima * FRACCION_TASA_MINIMA, tasa * factor)
+                fichas = 0.0
+                print(f"🐢 Tasa de {dominio} reducida a {nueva_tasa:.2f} peticiones/s")
+            else:
+                nueva_tasa = min(tasa_maxima, tasa + tasa_maxima * FRACCION_INCREMENTO)
+            if limitado or nueva_tasa != tasa:
+                _guardar(conexion, dominio, fichas, nueva_tasa, ahora)
+    except sqlite3.Error as e:
+        print(f"⚠️ No se pudo actualizar el gobernador de tasa: {str(e)}")
+
+
+def informar_respuesta(url, respuesta):
+    """
+    Ajusta la tasa del dominio pedido (`url`, no la URL final tras
+    redirecciones o reescrituras) según el código HTTP de la respuesta
+    """
+    if respuesta.status_code in ESTADOS_LIMITADOS:
+        informar(url, True)
+    elif respuesta.status_code < 400:
+        informar(url, False)
+
+
+def informar_muro_login(url):
+    """
+    Un muro de login cuenta como respuesta limitada del dominio pedido
+    (`url`: el muro suele llegar tras una redirección)
+    """
+    informar(url, True, FACTOR_REDUCCION_MURO)
+
+
+def estado():
+    """
+    {dominio: {'fichas', 'tasa', 'tasa_maxima'}} de las cubetas conocidas
+    """
+    if _ajuste.valor() is None:
+        return {}
+    ahora = time.time()
+    with _transaccion() as conexion:
+        dominios = [fila[0] for fila in conexion.execute('SELECT dominio FROM cubetas')]
+        cubetas = {}
+        for dominio in dominios:
+            if dominio in _ajuste.valor()['tasas_maximas']:
+                fichas, tasa = _cubeta(conexion, dominio, ahora)
+                cubetas[dominio] = {
+                    'fichas': round(fichas, 2), 'tasa': round(tasa, 3),
+                    'tasa_maxima': _ajuste.valor()['tasas_maximas'][dominio]
+                }
+    return cubetas
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Grabación y reproducción de intercambios HTTP (tipo VCR) por debajo de
+red_scraping.
+
+- Grabar (grabarHttp / --grabar DIR): cada petición que sale a la red se
+  guarda en DIR/intercambios.jsonl con método, URL, cabeceras de la
+  petición, estado, cabeceras y Set-Cookie de la respuesta (y de sus
+  redirecciones), URL final y duración. Los cuerpos se guardan aparte por
+  su hash SHA-256 en DIR/cuerpos/.
+- Reproducir (reproducirHttp / --reproducir DIR): las peticiones se
+  responden desde la grabación sin tocar la red, esperando la duración
+  grabada multiplicada por escalaLatencia (1 = la original, 0 = sin
+  esperas). Las cookies grabadas se aplican a la sesión, así el login y la
+  validación de sesión siguen el mismo camino que en la ejecución real.
+
+Los intercambios se emparejan por método, URL completa y forma de la
+petición (si sigue redirecciones y si se lee en streaming: la misma URL
+pedida con allow_redirects=False devuelve el 302 y no la página final), en
+el orden en que se grabaron; si una URL se pide más veces que las grabadas se repite
+la última respuesta. Una petición sin grabación falla con SinGrabacion
+(un ConnectionError, como un host caído) en vez de salir a la red.
+
+No se guardan los cuerpos de las peticiones ni las cabeceras Cookie y
+Authorization (solo su huella), pero las respuestas sí incluyen Set-Cookie:
+una grabación con login contiene cookies de sesión y debe tratarse como
+un secreto. Las peticiones leídas en streaming se graban completas.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from datetime import timedelta
+from http.cookies import SimpleCookie, CookieError
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from ajustes_extraccion import Ajuste
+
+MODOS = ('grabar', 'reproducir')
+ARCHIVO_INTERCAMBIOS = 'intercambios.jsonl'
+
+# Cabeceras de la petición que se guardan solo como huella
+CABECERAS_SENSIBLES = ('cookie', 'authorization')
+# Cabeceras de la respuesta que no se reproducen: el cuerpo se guarda ya
+# descomprimido y Set-Cookie se guarda como lista aparte
+CABECERAS_EXCLUIDAS = ('set-cookie', 'content-encoding', 'content-length', 'transfer-encoding', 'connection')
+
+_ajuste = Ajuste('grabacion_http')
+_lock = threading.Lock()
+_grabaciones = {}  # directorio -> {clave de la petición: intercambios en orden de grabación}
+_posiciones = {}   # (directorio, clave de la petición) -> siguiente intercambio a reproducir
+
+
+class SinGrabacion(requests.ConnectionError):
+    """
+    La petición no está en la grabación que se reproduce
+    """
+
+
+def _cargar_grabacion(directorio):
+    # Intercambios de una grabación, leídos una vez por directorio y proceso
+    with _lock:
+        if directorio in _grabaciones:
+            return
+        ruta = os.path.join(directorio, ARCHIVO_INTERCAMBIOS)
+        if not os.path.exists(ruta):
+            raise ValueError(f"No hay grabación en {directorio}")
+        grabados = {}
+        with open(ruta, encoding='utf-8') as f:
+            for numero, linea in enumerate(f, 1):
+                if not linea.strip():
+                    continue
+                intercambio = json.loads(linea)
+                try:
+                    clave = _clave_grabada(intercambio)
+                except KeyError as e:
+                    raise ValueError(f"Intercambio {numero} de {ruta} sin el campo {e}: hay que volver a grabar")
+                grabados.setdefault(clave, []).append(intercambio)
+        _grabaciones[directorio] = grabados
+
+
+def configurar(modo, directorio, escala_latencia=1.0, proceso=True):
+    """
+    Activa la grabación o la reproducción en `directorio` para todo el
+    proceso o, con proceso=False, solo para la extracción en curso
+    """
+    if modo not in MODOS:
+        raise ValueError(f"Modo de grabación desconocido: {modo}")
+    configuracion = {
+        'modo': modo,
+        'directorio': os.path.abspath(directorio),
+        'escala': max(0.0, float(escala_latencia if escala_latencia is not None else 1.0))
+    }
+    if modo == 'grabar':
+        os.makedirs(os.path.join(configuracion['directorio'], 'cuerpos'), exist_ok=True)
+    else:
+        _cargar_grabacion(configuracion['directorio'])
+    _ajuste.fijar(configuracion, proceso)
+
+
+def configurar_desde_parametros(params, proceso=False):
+    """
+    Parámetros del extractor: grabarHttp o reproducirHttp (directorio) y
+    escalaLatencia. Sin ninguno de los dos se mantiene la configuración
+    del proceso
+    """
+    if params.get('reproducirHttp'):
+        configurar('reproducir', params['reproducirHttp'], params.get('escalaLatencia'), proceso)
+    elif params.get('grabarHttp'):
+        configurar('grabar', params['grabarHttp'], params.get('escalaLatencia'), proceso)
+
+
+def grabando():
+    configuracion = _ajuste.valor()
+    return configuracion is not None and configuracion['modo'] == 'grabar'
+
+
+def reproduciendo():
+    configuracion = _ajuste.valor()
+    return configuracion is not None and configuracion['modo'] == 'reproducir'
+
+
+def separar_opciones(argumentos):
+    """
+    Separa --grabar DIR, --reproducir DIR y --escala-latencia X de los
+    argumentos de un script. Devuelve (parámetros a añadir, resto)
+    """
+    nombres = {'--grabar': 'grabarHttp', '--reproducir': 'reproducirHttp', '--escala-latencia': 'escalaLatencia'}
+    opciones, resto = {}, []
+    iterador = iter(argumentos)
+    for argumento in iterador:
+        nombre, igual, valor = argumento.partition('=')
+        if nombre not in nombres:
+            resto.append(argumento)
+            continue
+        valor = valor if igual else next(iterador, '')
+        if not valor:
+            raise ValueError(f"{nombre} necesita un valor")
+        opciones[nombres[nombre]] = float(valor) if nombre == '--escala-latencia' else valor
+    return opciones, resto
+
+
+def _url_completa(metodo, url, kwargs):
+    if not kwargs.get('params'):
+        return url
+    return requests.Request(metodo, url, params=kwargs['params']).prepare().url
+
+
+def _clave(metodo, url, kwargs):
+    """
+    Clave con la que se empareja una petición: método, URL completa, si
+    sigue redirecciones y si se lee en streaming
+    """
+    return (
+        metodo.upper(), _url_completa(metodo, url, kwargs),
+        bool(kwargs.get('allow_redirects', True)), bool(kwargs.get('stream', False))
+    )
+
+
+def _clave_grabada(intercambio):
+    return intercambio['metodo'], intercambio['url'], intercambio['redirecciones'], intercambio['stream']
+
+
+def _huella(texto):
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()[:16]
+
+
+def _ruta_cuerpo(huella):
+    return os.path.join(_ajuste.valor()['directorio'], 'cuerpos', huella[:2], huella)
+
+
+def _guardar_cuerpo(contenido):
+    huella = hashlib.sha256(contenido).hexdigest()
+    ruta = _ruta_cuerpo(huella)
+    if not os.path.exists(ruta):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f'{ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporal, 'wb') as f:
+            f.write(contenido)
+        os.replace(temporal, ruta)
+    return huella
+
+
+def _set_cookies(respuesta):
+    cabeceras = getattr(respuesta.raw, 'headers', None)
+    if cabeceras is not None and hasattr(cabeceras, 'getlist'):
+        return cabeceras.getlist('Set-Cookie')
+    valor = respuesta.headers.get('Set-Cookie')
+    return [valor] if valor else []
+
+
+def _describir_respuesta(respuesta):
+    return {
+        'estado': respuesta.status_code,
+        'razon': respuesta.reason,
+        'url_final': respuesta.url,
+        'cabeceras': {k: v for k, v in respuesta.headers.items() if k.lower() not in CABECERAS_EXCLUIDAS},
+        'set_cookie': _set_cookies(respuesta)
+    }
+
+
+def grabar(session, metodo, url, kwargs, respuesta, segundos):
+    """
+    Añade a la grabación el intercambio de una petición real
+    """
+    cabeceras = {**session.headers, **(kwargs.get('headers') or {})}
+    if session.cookies:
+        cabeceras['Cookie'] = '; '.join(f'{c.name}={c.value}' for c in session.cookies)
+    cabeceras = {
+        k: (f'<{_huella(v)}>' if k.lower() in CABECERAS_SENSIBLES else v)
+        for k, v in cabeceras.items() if v is not None
+    }
+    cuerpo_peticion = kwargs.get('data') or kwargs.get('json')
+    metodo, url_completa, redirecciones, stream = _clave(metodo, url, kwargs)
+    intercambio = {
+        'metodo': metodo,
+        'url': url_completa,
+        'redirecciones': redirecciones,
+        'stream': stream,
+        'peticion': {
+            'cabeceras': cabeceras,
+            'huella_cuerpo': _huella(json.dumps(cuerpo_peticion, sort_keys=True, default=str)) if cuerpo_peticion else None
+        },
+        **_describir_respuesta(respuesta),
+        'historial': [_describir_respuesta(previa) for previa in respuesta.history],
+        'cuerpo': _guardar_cuerpo(respuesta.content),  # también lee por completo las respuestas en streaming
+        'tamanio': len(respuesta.content),
+        'duracion_ms': round(segundos * 1000, 1),
+        'hasta_cabeceras_ms': round(respuesta.elapsed.total_seconds() * 1000, 1),
+        'grabado_en': time.time()
+    }
+    linea = json.dumps(intercambio, ensure_ascii=False)
+    with _lock, open(os.path.join(_ajuste.valor()['directorio'], ARCHIVO_INTERCAMBIOS), 'a', encoding='utf-8') as f:
+        f.write(linea + '\n')
+
+
+def _aplicar_cookies(session, descripcion):
+    host = (urlparse(descripcion['url_final']).hostname or '').lower()
+    for valor in descripcion.get('set_cookie') or []:
+        try:
+            galletas = SimpleCookie(valor)
+        except CookieError:
+            continue
+        for nombre, morsel in galletas.items():
+            session.cookies.set(nombre, morsel.value, domain=morsel['domain'] or host, path=morsel['path'] or '/')
+
+
+def _construir_respuesta(descripcion, contenido, metodo):
+    respuesta = requests.Response()
+    respuesta.status_code = descripcion['estado']
+    respuesta.reason = descripcion.get('razon') or ''
+    respuesta.headers = CaseInsensitiveDict(descripcion['cabeceras'])
+    respuesta.url = descripcion['url_final']
+    respuesta.encoding = get_encoding_from_headers(respuesta.headers)
+    respuesta.request = requests.Request(metodo, descripcion['url_final']).prepare()
+    respuesta._content = contenido
+    respuesta._content_consumed = True
+    return respuesta
+
+
+def reproducir(session, metodo, url, kwargs):
+    """
+    Respuesta grabada para la petición y segundos a esperar antes de
+    entregarla (duración grabada × escala)
+    """
+    configuracion = _ajuste.valor()
+    clave = _clave(metodo, url, kwargs)
+    with _lock:
+        intercambios = _grabaciones[configuracion['directorio']].get(clave)
+        if not intercambios:
+            raise SinGrabacion(
+                f"Sin grabación para {clave[0]} {clave[1]} (allow_redirects={clave[2]}, stream={clave[3]})"
+            )
+        posicion = _posiciones.get((configuracion['directorio'], clave), 0)
+        _posiciones[(configuracion['directorio'], clave)] = posicion + 1
+    intercambio = intercambios[min(posicion, len(intercambios) - 1)]
+
+    try:
+        with open(_ruta_cuerpo(intercambio['cuerpo']), 'rb') as f:
+            contenido = f.read()
+    except OSError:
+        raise SinGrabacion(f"Falta el cuerpo grabado de {clave[0]} {clave[1]}")
+
+    for descripcion in intercambio['historial'] + [intercambio]:
+        _aplicar_cookies(session, descripcion)
+    respuesta = _construir_respuesta(intercambio, contenido, clave[0])
+    respuesta.history = [_construir_respuesta(previa, b'', clave[0]) for previa in intercambio['historial']]
+    respuesta.elapsed = timedelta(milliseconds=intercambio['hasta_cabeceras_ms'] * configuracion['escala'])
+    return respuesta, intercambio['duracion_ms'] / 1000 * configuracion['escala']
+
+
+def resumen(directorio):
+    """
+    Intercambios, bytes y tiempo de red de una grabación
+    """
+    intercambios = []
+    with open(os.path.join(directorio, ARCHIVO_INTERCAMBIOS), encoding='utf-8') as f:
+        intercambios = [json.loads(linea) for linea in f if linea.strip()]
+    por_host = {}
+    for intercambio in intercambios:
+        host = (urlparse(intercambio['url']).hostname or '').lower()
+        datos = por_host.setdefault(host, {'intercambios': 0, 'bytes': 0, 'duracion_ms': 0.0})
+        datos['intercambios'] += 1
+        datos['bytes'] += intercambio['tamanio']
+        datos['duracion_ms'] = round(datos['duracion_ms'] + intercambio['duracion_ms'], 1)
+    return {
+        'intercambios': len(intercambios),
+        'urls_distintas': len({(i['metodo'], i['url']) for i in intercambios}),
+        'bytes': sum(i['tamanio'] for i in intercambios),
+        'duracion_ms': round(sum(i['duracion_ms'] for i in intercambios), 1),
+        'por_host': por_host
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 3 or sys.argv[1] != 'resumen':
+        print("Uso: python grabacion_http.py resumen DIRECTORIO")
+        sys.exit(1)
+    print(json.dumps(resumen(sys.argv[2]), ensure_ascii=False, indent=2))
@@ -2,21 +2,52 @@
 import sys
 import json
 import os
-import requests
+import time
 from datetime import datetime
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse
 import re
+from red_scraping import obtener, nueva_sesion, configurar_url_base
+from carrera_estrategias import correr_estrategias
+import estadisticas_estrategias
+from arranque import esta_instalado, cargar_opcional
+import cache_http
+import gobernador_tasa
+import grabacion_http
+import perfilado
+import cortacircuitos
+import presupuesto_reintentos
+from cache_resultados import con_cache_resultados
+import almacen_resultados
+from tiempos import con_tiempos, etapa, tramo
+from ajustes_extraccion import en_extraccion
+from almacen_imagenes import descargar_imagen
+from clasificador_paginas import clasificar
+from json_embebido import JsonEmbebido
+from documento_html import obtener_cabecera, documento_de, LIMITE_BYTES_CABECERA, PARSER_HTML_DEFECTO
 
-# Intentar importar instaloader como método alternativo
-try:
-    import instaloader
-    INSTALOADER_DISPONIBLE = True
-except ImportError:
-    INSTALOADER_DISPONIBLE = False
-    print("⚠️ instaloader no disponible, usando solo método web scraping")
+# instaloader (método alternativo) se importa solo la primera vez que se usa
+INSTALOADER_DISPONIBLE = esta_instalado('instaloader')
+
+# Probabilidad de éxito (muestreada del historial) por debajo de la cual no
+# se intenta instaloader al inicio
+UMBRAL_INSTALOADER = 0.05
 
 def extraer_perfil_instagram_simple(parametros):
+    """
+    Punto de entrada: reutiliza el resultado de la caché de resultados si
+    el perfil se resolvió hace poco; si no, lo extrae y lo guarda. El
+    resultado lleva el desglose de tiempos por etapa en 'timings' (y, con
+    perfil, la ruta de su perfil cProfile en 'perfil')
+    """
+    def extraer(parametros):
+        resultado = con_cache_resultados('instagram', 'username', parametros, extraer_perfil_instagram_sin_cache)
+        return almacen_resultados.registrar_reutilizado('instagram', parametros, resultado)
+    # Los ajustes que fijen los parámetros (cacheHttp, poolSesiones...) valen solo para esta extracción
+    return en_extraccion(
+        perfilado.con_perfil, 'instagram', 'username', parametros,
+        lambda parametros: con_tiempos('instagram', 'username', parametros, extraer)
+    )
+
+def extraer_perfil_instagram_sin_cache(parametros):
     """
     Extrae información básica de un perfil de Instagram usando múltiples métodos:
     1. Primero intenta con instaloader (más confiable)
@@ -30,6 +61,26 @@ def extraer_perfil_instagram_simple(parametros):
         directorio = params.get('directorio', 'scraped_data')
         max_posts = params.get('maxPosts', 10)
         incluir_comentarios = params.get('incluirComentarios', False)
+        estrategias_paralelas = params.get('estrategiasParalelas', 1)  # >1: métodos en carrera
+        retardo_cobertura = params.get('retardoCobertura', None)  # segundos antes de lanzar el siguiente método
+        orden_adaptativo = params.get('ordenAdaptativo', True)  # ordenar métodos según su historial
+        solo_cabecera = params.get('soloCabecera', False)  # leer solo la cabecera del perfil
+        limite_bytes_cabecera = params.get('limiteBytesCabecera', LIMITE_BYTES_CABECERA)
+        parser_html = params.get('parserHtml', PARSER_HTML_DEFECTO)  # html.parser (defecto), lxml, selectolax o auto
+        cache_http.configurar_desde_parametros(params)  # caché HTTP en disco (cacheHttp)
+        gobernador_tasa.configurar_desde_parametros(params)  # tasa compartida por dominio (gobernadorTasa)
+        cortacircuitos.configurar_desde_parametros(params)  # saltar endpoints caídos (cortacircuitos)
+        presupuesto_reintentos.configurar_desde_parametros(params)  # reintentosMaximos, proporcionReintentos
+        grabacion_http.configurar_desde_parametros(params)  # grabarHttp / reproducirHttp, escalaLatencia
+        if 'urlBase' in params:
+            configurar_url_base(params['urlBase'], proceso=False)  # servidor sustituto (benchmarks sin red)
+        almacen_resultados.configurar_desde_parametros(params, directorio)  # resultados en SQLite (almacenResultados)
+        
+        def descargar(sesion, url, **kwargs):
+            # Página del perfil: completa o, si se pidió, solo hasta la cabecera
+            if solo_cabecera:
+                return obtener_cabecera(sesion, url, limite_bytes_cabecera, **kwargs)
+            return obtener(sesion, url, **kwargs)
         
         if not username:
             raise ValueError("Username es requerido")
@@ -37,11 +88,22 @@ def extraer_perfil_instagram_simple(parametros):
         # Crear directorio de salida
         os.makedirs(directorio, exist_ok=True)
         
-        # Intentar primero con instaloader (método más confiable)
-        if INSTALOADER_DISPONIBLE:
+        # Intentar primero con instaloader (método más confiable), salvo que su
+        # historial reciente diga que casi nunca funciona
+        if INSTALOADER_DISPONIBLE and orden_adaptativo and \
+                estadisticas_estrategias.probabilidad_muestreada('instagram:instaloader') < UMBRAL_INSTALOADER:
+            print(f"⏭️ Instaloader omitido para {username} (historial de fallos recientes)")
+        elif INSTALOADER_DISPONIBLE:
             print(f"🔄 Intentando extracción con instaloader para {username}...")
             try:
+                inicio_instaloader = time.monotonic()
                 resultado_instaloader = extraer_con_instaloader(username, directorio)
+                if orden_adaptativo:
+                    estadisticas_estrategias.registrar(
+                        'instagram:instaloader',
+                        bool(resultado_instaloader and resultado_instaloader.get('exito')),
+                        time.monotonic() - inicio_instaloader
+                    )
                 if resultado_instaloader and resultado_instaloader.get('exito'):
                     print(f"✅ Datos extraídos exitosamente con instaloader")
                     return resultado_instaloader
@@ -90,60 +152,58 @@ def extraer_perfil_instagram_simple(parametros):
         }
         
         # Crear sesión para mantener cookies
-        session = requests.Session()
-        session.headers.update(headers)
+        session = nueva_sesion(headers, perfil='navegador')
         
-        # Intentar múltiples estrategias para evitar login
+        # Intentar múltiples estrategias para evitar login, en orden o en
+        # carrera/cobertura si se configuró
         response = None
         metodos_intentados = []
-        
-        # Método 1: URL con parámetro __a=1 (API antigua de Instagram)
-        try:
-            url_api = f"https://www.instagram.com/{username}/?__a=1&__d=1"
-            response = session.get(url_api, timeout=30)
-            metodos_intentados.append("API __a=1")
-            
-            if response.status_code == 200 and 'login' not in response.url.lower():
-                print(f"✅ Acceso exitoso con API __a=1")
-            else:
-                raise Exception("API method failed")
-                
-        except Exception as e:
-            print(f"⚠️ Método API falló: {str(e)}")
-            
+        sesion_basica = {}
+        
+        def intentar(nombre, url, **kwargs):
+            def ejecutar():
+                respuesta = descargar(session, url, timeout=30, **kwargs)
+                metodos_intentados.append(nombre)
+                return respuesta
+            return ejecutar
+        
+        def intentar_url_basica():
+            # Limpiar sesión y usar nuevos headers
+            sesion_nueva = nueva_sesion({**headers, 'User-Agent': random.choice(user_agents)}, perfil='navegador')
+            respuesta = descargar(sesion_nueva, url_perfil, timeout=30, allow_redirects=False)
+            sesion_basica['session'] = sesion_nueva
+            metodos_intentados.append("URL básica sin redirects")
+            return respuesta
+        
+        def acceso_directo(respuesta):
+            return respuesta.status_code == 200 and 'login' not in respuesta.url.lower()
+        
+        estrategias = [
+            # Método 1: URL con parámetro __a=1 (API antigua de Instagram)
+            {'nombre': 'API __a=1', 'es_valida': acceso_directo,
+             'ejecutar': intentar("API __a=1", f"https://www.instagram.com/{username}/?__a=1&__d=1")},
             # Método 2: URL estándar con headers mejorados
-            try:
-                response = session.get(url_perfil, timeout=30)
-                metodos_intentados.append("URL estándar")
-                
-                if 'login' in response.url.lower() or response.status_code != 200:
-                    raise Exception("Standard method redirected to login")
-                    
-            except Exception as e:
-                print(f"⚠️ Método estándar falló: {str(e)}")
-                
-                # Método 3: URL con embed (para widgets)
-                try:
-                    url_embed = f"https://www.instagram.com/p/{username}/embed/"
-                    response = session.get(url_embed, timeout=30)
-                    metodos_intentados.append("Embed URL")
-                    
-                except Exception as e:
-                    print(f"⚠️ Método embed falló: {str(e)}")
-                    
-                    # Método 4: Última oportunidad con URL básica
-                    try:
-                        # Limpiar sesión y usar nuevos headers
-                        session = requests.Session()
-                        headers['User-Agent'] = random.choice(user_agents)
-                        session.headers.update(headers)
-                        response = session.get(url_perfil, timeout=30, allow_redirects=False)
-                        metodos_intentados.append("URL básica sin redirects")
-                        
-                    except Exception as e:
-                        print(f"❌ Todos los métodos fallaron: {str(e)}")
-                        response = session.get(url_perfil, timeout=30)  # Último intento
-                        metodos_intentados.append("Último intento")
+            {'nombre': 'URL estándar', 'es_valida': acceso_directo,
+             'ejecutar': intentar("URL estándar", url_perfil)},
+            # Método 3: URL con embed (para widgets), se acepta cualquier respuesta:
+            # solo se prueba si fallaron los métodos comprobados
+            {'nombre': 'Embed URL', 'es_valida': lambda respuesta: True, 'respaldo': True,
+             'ejecutar': intentar("Embed URL", f"https://www.instagram.com/p/{username}/embed/")},
+            # Método 4: Última oportunidad con URL básica
+            {'nombre': 'URL básica sin redirects', 'es_valida': lambda respuesta: True, 'respaldo': True,
+             'ejecutar': intentar_url_basica}
+        ]
+        
+        with tramo('estrategias'):
+            nombre_ganador, response = correr_estrategias(
+                estrategias, estrategias_paralelas, retardo_cobertura, 'instagram', orden_adaptativo
+            )
+        if nombre_ganador == 'URL básica sin redirects':
+            session = sesion_basica['session']
+        elif not nombre_ganador:
+            print(f"❌ Todos los métodos fallaron")
+            response = descargar(session, url_perfil, timeout=30)  # Último intento
+            metodos_intentados.append("Último intento")
         
         print(f"📝 Métodos intentados: {', '.join(metodos_intentados)}")
         
@@ -156,7 +216,7 @@ def extraer_perfil_instagram_simple(parametros):
             try:
                 # Intentar con una URL directa diferente
                 url_alternativa = f"https://www.instagram.com/{username}/?__a=1"
-                response_alt = session.get(url_alternativa, timeout=30)
+                response_alt = descargar(session, url_alternativa, timeout=30)
                 
                 if response_alt.status_code == 200 and 'login' not in response_alt.url:
                     response = response_alt
@@ -169,27 +229,33 @@ def extraer_perfil_instagram_simple(parametros):
         if response.status_code != 200 and response.status_code != 302:
             raise Exception(f"Error HTTP {response.status_code}: {response.reason}")
         
-        # Parsear HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # Parsear HTML (ya parseado durante la descarga si solo se leyó la cabecera)
+        documento = documento_de(response, parser_html)
+        
+        # Clasificar la página (login, no disponible, no encontrada) en una sola pasada
+        # (con lectura parcial el texto visible está incompleto y no se usa)
+        veredicto = clasificar(
+            response.text, response.url, 'instagram',
+            texto_visible=documento.texto() if documento.completo else None
+        )
         
         # Verificar si estamos en página de login (detección mejorada)
         login_detectado = (
-            'login' in response.url.lower() or 
-            '/accounts/login/' in response.url or
-            soup.find('input', {'name': 'username'}) is not None or
-            'log in' in soup.get_text().lower()[:1000] or
-            'iniciar sesión' in soup.get_text().lower()[:1000] or
-            'sign up' in soup.get_text().lower()[:1000] or
-            'registrate' in soup.get_text().lower()[:1000] or
-            'not available' in soup.get_text().lower()[:1000] or
-            len(soup.get_text().strip()) < 500  # Página muy vacía, probablemente restringida
+            veredicto['muro_login'] or  # URL de login, textos de login o página muy vacía
+            documento.hay_input('username')
         )
+        if login_detectado:
+            gobernador_tasa.informar_muro_login(url_perfil)
+        titulo_html = documento.titulo()
+        # Scripts embebidos (_sharedData, ld+json, URLs de imagen) indexados en una pasada
+        with tramo('json_embebido'):
+            embebidos = JsonEmbebido(response.text)
         
         # Extraer información básica del perfil
         datos_perfil = {
             'username': username,
             'url': url_perfil,
-            'titulo': soup.find('title').text if soup.find('title') else f"@{username}",
+            'titulo': titulo_html if titulo_html is not None else f"@{username}",
             'descripcion': '',
             'seguidores': 'N/A',
             'seguidos': 'N/A',
@@ -208,6 +274,8 @@ def extraer_perfil_instagram_simple(parametros):
             'login_requerido': login_detectado,
             'acceso_limitado': login_detectado
         }
+        if not documento.completo:
+            datos_perfil['bytes_leidos'] = documento.bytes_leidos
         
         # Si detectamos login, intentar método alternativo con instaloader
         if login_detectado:
@@ -236,7 +304,7 @@ def extraer_perfil_instagram_simple(parametros):
             
             # Intentar extraer datos básicos incluso con restricción de login
             try:
-                datos_limitados = extraer_datos_instagram_alternativos(username, session)
+                datos_limitados = extraer_datos_instagram_alternativos(username, session, estrategias_paralelas, retardo_cobertura, orden_adaptativo)
                 if datos_limitados:
                     print(f"🔓 Datos básicos extraídos a pesar de restricción de login")
                     datos_perfil.update(datos_limitados)
@@ -246,28 +314,27 @@ def extraer_perfil_instagram_simple(parametros):
                 print(f"⚠️ No se pudieron extraer datos limitados: {str(e)}")
             
             # Intentar extraer el título si está disponible
-            title_tag = soup.find('title')
-            if title_tag and title_tag.text:
-                title_text = title_tag.text
+            if titulo_html:
+                title_text = titulo_html
                 if username.lower() in title_text.lower() and 'instagram' in title_text.lower():
                     datos_perfil['titulo'] = title_text
                     datos_perfil['usuario_existe'] = True
             
             # Buscar cualquier meta información disponible
-            meta_desc = soup.find('meta', {'name': 'description'})
-            if meta_desc and meta_desc.get('content'):
-                datos_perfil['descripcion'] = meta_desc.get('content')
+            meta_desc = documento.meta(nombre='description')
+            if meta_desc:
+                datos_perfil['descripcion'] = meta_desc
             
             # Intentar buscar imagen de perfil en meta tags
-            og_image = soup.find('meta', {'property': 'og:image'})
-            if og_image and og_image.get('content'):
-                datos_perfil['imagen_perfil'] = og_image.get('content')
+            og_image = documento.meta(propiedad='og:image')
+            if og_image:
+                datos_perfil['imagen_perfil'] = og_image
         else:
             print(f"✅ Acceso completo para {username}")
             # Procesar normalmente si no hay restricción de login
             
             # Intentar extraer datos usando métodos alternativos primero
-            datos_alternativos = extraer_datos_instagram_alternativos(username, session)
+            datos_alternativos = extraer_datos_instagram_alternativos(username, session, estrategias_paralelas, retardo_cobertura, orden_adaptativo)
             if datos_alternativos:
                 print(f"🎯 Datos alternativos encontrados, actualizando perfil...")
                 datos_perfil.update(datos_alternativos)
@@ -276,48 +343,34 @@ def extraer_perfil_instagram_simple(parametros):
             
             # Intentar extraer datos del JSON embebido en el HTML
             try:
-                # Buscar scripts que contengan datos JSON
-                script_tags = soup.find_all('script', type='text/javascript')
-                for script in script_tags:
-                    if script.string and 'window._sharedData' in script.string:
-                        # Extraer JSON de window._sharedData
-                        start = script.string.find('window._sharedData = ') + len('window._sharedData = ')
-                        end = script.string.find(';</script>', start)
-                        if end == -1:
-                            end = script.string.find(';', start)
+                # Objetos window._sharedData decodificables, en orden de aparición
+                for data in embebidos.shared_data():
+                    if 'entry_data' in data and 'ProfilePage' in data['entry_data']:
+                        profile_data = data['entry_data']['ProfilePage'][0]['graphql']['user']
                         
-                        if start > 0 and end > start:
-                            json_str = script.string[start:end]
-                            try:
-                                data = json.loads(json_str)
-                                if 'entry_data' in data and 'ProfilePage' in data['entry_data']:
-                                    profile_data = data['entry_data']['ProfilePage'][0]['graphql']['user']
-                                    
-                                    datos_perfil.update({
-                                        'seguidores': profile_data.get('edge_followed_by', {}).get('count', datos_perfil['seguidores']),
-                                        'seguidos': profile_data.get('edge_follow', {}).get('count', datos_perfil['seguidos']),
-                                        'posts': profile_data.get('edge_owner_to_timeline_media', {}).get('count', datos_perfil['posts']),
-                                        'biografia': profile_data.get('biography', datos_perfil['biografia']),
-                                        'enlace_externo': profile_data.get('external_url', datos_perfil['enlace_externo']),
-                                        'es_privado': profile_data.get('is_private', datos_perfil['es_privado']),
-                                        'es_verificado': profile_data.get('is_verified', datos_perfil['es_verificado']),
-                                        'nombre_completo': profile_data.get('full_name', datos_perfil.get('nombre_completo', '')),
-                                        'imagen_perfil': profile_data.get('profile_pic_url_hd', profile_data.get('profile_pic_url', datos_perfil['imagen_perfil'])),
-                                        'usuario_existe': True
-                                    })
-                                    
-                                    print(f"🎯 Datos extraídos de window._sharedData")
-                                    break
-                            except json.JSONDecodeError:
-                                continue
+                        datos_perfil.update({
+                            'seguidores': profile_data.get('edge_followed_by', {}).get('count', datos_perfil['seguidores']),
+                            'seguidos': profile_data.get('edge_follow', {}).get('count', datos_perfil['seguidos']),
+                            'posts': profile_data.get('edge_owner_to_timeline_media', {}).get('count', datos_perfil['posts']),
+                            'biografia': profile_data.get('biography', datos_perfil['biografia']),
+                            'enlace_externo': profile_data.get('external_url', datos_perfil['enlace_externo']),
+                            'es_privado': profile_data.get('is_private', datos_perfil['es_privado']),
+                            'es_verificado': profile_data.get('is_verified', datos_perfil['es_verificado']),
+                            'nombre_completo': profile_data.get('full_name', datos_perfil.get('nombre_completo', '')),
+                            'imagen_perfil': profile_data.get('profile_pic_url_hd', profile_data.get('profile_pic_url', datos_perfil['imagen_perfil'])),
+                            'usuario_existe': True
+                        })
+                        
+                        print(f"🎯 Datos extraídos de window._sharedData")
+                        break
                                 
             except Exception as e:
                 print(f"⚠️ Error extrayendo _sharedData: {str(e)}")
         
         # Intentar extraer información del meta description (solo si no hay login)
-        meta_desc = soup.find('meta', {'name': 'description'})
-        if meta_desc and meta_desc.get('content'):
-            descripcion = meta_desc.get('content')
+        meta_desc = documento.meta(nombre='description')
+        if meta_desc:
+            descripcion = meta_desc
             if not datos_perfil['descripcion']:  # Solo si no tenemos descripción ya
                 datos_perfil['descripcion'] = descripcion
             
@@ -330,48 +383,35 @@ def extraer_perfil_instagram_simple(parametros):
                     datos_perfil['posts'] = numeros[2]
         
             # Intentar extraer biografía y verificar si el usuario existe (solo si no hay login)
-        script_tags = soup.find_all('script', type='application/ld+json')
-        for script in script_tags:
-            try:
-                data = json.loads(script.string)
-                if isinstance(data, dict) and 'mainEntity' in data:
-                    main_entity = data['mainEntity']
-                    if isinstance(main_entity, dict):
-                        if 'description' in main_entity:
-                            datos_perfil['biografia'] = main_entity['description']
-                        if 'url' in main_entity:
-                            datos_perfil['enlace_externo'] = main_entity['url']
-            except:
-                continue
+        for data in embebidos.ld_json():
+            if isinstance(data, dict) and 'mainEntity' in data:
+                main_entity = data['mainEntity']
+                if isinstance(main_entity, dict):
+                    if 'description' in main_entity:
+                        datos_perfil['biografia'] = main_entity['description']
+                    if 'url' in main_entity:
+                        datos_perfil['enlace_externo'] = main_entity['url']
         
         # Buscar imagen de perfil en el HTML (funciona tanto con login como sin login)
         try:
             imagen_url = None
             
             # Buscar meta tags de Open Graph
-            og_image = soup.find('meta', {'property': 'og:image'})
-            if og_image and og_image.get('content'):
-                imagen_url = og_image.get('content')
+            og_image = documento.meta(propiedad='og:image')
+            if og_image:
+                imagen_url = og_image
                 datos_perfil['imagen_perfil'] = imagen_url
                 
             # Si no encontramos imagen, buscar en otros lugares del HTML
             if not imagen_url:
                 # Buscar en script tags (a veces contienen URLs de imágenes)
-                script_tags = soup.find_all('script')
-                for script in script_tags:
-                    if script.string:
-                        # Buscar URLs de imágenes en JavaScript
-                        img_matches = re.findall(r'https://[^"\']*\.instagram\.com[^"\']*\.jpg', script.string)
-                        if img_matches:
-                            imagen_url = img_matches[0]
-                            datos_perfil['imagen_perfil'] = imagen_url
-                            break
+                imagen_url = embebidos.url_imagen()
+                if imagen_url:
+                    datos_perfil['imagen_perfil'] = imagen_url
                 
                 # Si aún no encontramos, buscar en img tags
                 if not imagen_url:
-                    img_tags = soup.find_all('img')
-                    for img in img_tags:
-                        src = img.get('src', '')
+                    for src in documento.imagenes():
                         if 'profile' in src.lower() or 'avatar' in src.lower() or 'instagram.com' in src:
                             imagen_url = src
                             datos_perfil['imagen_perfil'] = imagen_url
@@ -380,31 +420,19 @@ def extraer_perfil_instagram_simple(parametros):
             # Intentar descargar la imagen de perfil si la encontramos
             if imagen_url:
                 try:
-                    # Crear directorio para imágenes de perfil
-                    directorio_imagenes = os.path.join(directorio, 'profile_images')
-                    os.makedirs(directorio_imagenes, exist_ok=True)
-                    
-                    # Descargar imagen de perfil usando la sesión
-                    img_response = session.get(imagen_url, timeout=30)
-                    if img_response.status_code == 200 and len(img_response.content) > 1000:  # Verificar que no sea imagen vacía
-                        # Generar nombre de archivo único
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        extension = os.path.splitext(urlparse(imagen_url).path)[1] or '.jpg'
-                        nombre_imagen = f'profile_{username}_{timestamp}{extension}'
-                        ruta_imagen = os.path.join(directorio_imagenes, nombre_imagen)
-                        
-                        # Guardar imagen
-                        with open(ruta_imagen, 'wb') as f:
-                            f.write(img_response.content)
-                        
+                    # Descargar imagen de perfil usando la sesión, al almacén por contenido
+                    # (más de 1000 bytes: que no sea una imagen vacía)
+                    imagen = descargar_imagen(session, imagen_url, directorio, 'instagram', username, minimo_bytes=1001)
+                    if imagen['exito']:
                         datos_perfil['imagen_perfil_descargada'] = True
-                        datos_perfil['ruta_imagen_perfil'] = ruta_imagen
-                        datos_perfil['tamanio_imagen_perfil'] = len(img_response.content)
+                        datos_perfil['ruta_imagen_perfil'] = imagen['ruta']
+                        datos_perfil['tamanio_imagen_perfil'] = imagen['tamanio']
+                        datos_perfil['hash_imagen_perfil'] = imagen['hash']
                         datos_perfil['usuario_existe'] = True  # Si podemos descargar la imagen, el usuario existe
                         
-                        print(f"✅ Imagen de perfil descargada: {ruta_imagen}")
+                        print(f"✅ Imagen de perfil descargada: {imagen['ruta']}")
                     else:
-                        print(f"⚠️ No se pudo descargar imagen de perfil: HTTP {img_response.status_code} o imagen muy pequeña")
+                        print(f"⚠️ No se pudo descargar imagen de perfil: {imagen['error']}")
                 except Exception as e:
                     print(f"⚠️ Error al descargar imagen de perfil: {str(e)}")
                     datos_perfil['error_imagen_perfil'] = str(e)
@@ -414,18 +442,13 @@ def extraer_perfil_instagram_simple(parametros):
             datos_perfil['error_busqueda_imagen'] = str(e)
         
         # Verificar si el usuario existe basándose en el contenido de la página
-        texto_respuesta = response.text.lower()
-        
         # PRIORIDAD 1: Detectar páginas bloqueadas/no disponibles
-        if ('sorry, this page isn\'t available' in texto_respuesta or
-            'this page isn\'t available' in texto_respuesta or
-            'lo sentimos, esta página no está disponible' in texto_respuesta or
-            'página no está disponible' in texto_respuesta):
+        if veredicto['no_disponible']:
             datos_perfil['usuario_existe'] = False
             datos_perfil['error'] = 'Página no disponible (posiblemente eliminada o bloqueada)'
         
         # PRIORIDAD 2: Detectar usuario no encontrado
-        elif 'not found' in texto_respuesta or 'page not found' in texto_respuesta:
+        elif veredicto['no_encontrado']:
             datos_perfil['usuario_existe'] = False
             datos_perfil['error'] = 'Usuario no encontrado'
         
@@ -436,11 +459,7 @@ def extraer_perfil_instagram_simple(parametros):
         # PRIORIDAD 4: Si detectamos login, probablemente el usuario existe
         elif login_detectado:
             # Verificar que no sea un caso de perfil eliminado que redirige a login
-            if not any(blocked_msg in texto_respuesta for blocked_msg in [
-                'this page isn\'t available',
-                'página no está disponible',
-                'sorry, this page'
-            ]):
+            if not veredicto['bloqueo_tras_login']:
                 datos_perfil['usuario_existe'] = True
                 datos_perfil['acceso_limitado'] = True
             else:
@@ -451,10 +470,10 @@ def extraer_perfil_instagram_simple(parametros):
         elif 'instagram' in datos_perfil['titulo'].lower() and username in datos_perfil['titulo'].lower():
             datos_perfil['usuario_existe'] = True
         
-        # Guardar datos en archivo JSON
-        archivo_salida = os.path.join(directorio, f'instagram_profile_{username}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
-        with open(archivo_salida, 'w', encoding='utf-8') as f:
-            json.dump(datos_perfil, f, ensure_ascii=False, indent=2)
+        # Guardar datos en archivo JSON (o en el almacén de resultados si está activo)
+        archivo_salida = almacen_resultados.guardar_datos(
+            directorio, f'instagram_profile_{username}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json', 'instagram', username, datos_perfil
+        )
         
         # Crear mensaje informativo
         estado_acceso = "acceso limitado (requiere login)" if login_detectado else "acceso completo"
@@ -474,7 +493,9 @@ def extraer_perfil_instagram_simple(parametros):
             'mensaje': f'Error al extraer perfil: {str(e)}'
         }
 
-def extraer_datos_instagram_alternativos(username, session):
+@etapa('datos_alternativos')
+def extraer_datos_instagram_alternativos(username, session, estrategias_paralelas=1, retardo_cobertura=None,
+                                         orden_adaptativo=True):
     """
     Extrae datos usando métodos alternativos de Instagram
     """
@@ -482,51 +503,76 @@ def extraer_datos_instagram_alternativos(username, session):
     
     # Método 1: Intentar extraer de JSON embebido
     try:
-        # Probar diferentes endpoints
+        # Probar diferentes endpoints (la plantilla sirve de nombre de la estrategia)
         endpoints = [
-            f"https://www.instagram.com/api/v1/users/web_profile_info/?username={username}",
-            f"https://www.instagram.com/{username}/?__a=1",
-            f"https://i.instagram.com/api/v1/users/web_profile_info/?username={username}"
+            "https://www.instagram.com/api/v1/users/web_profile_info/?username={username}",
+            "https://www.instagram.com/{username}/?__a=1",
+            "https://i.instagram.com/api/v1/users/web_profile_info/?username={username}"
         ]
         
-        for endpoint in endpoints:
-            try:
-                response = session.get(endpoint, timeout=15)
-                if response.status_code == 200:
+        def consultar(endpoint):
+            def ejecutar():
+                response = obtener(session, endpoint.format(username=username), timeout=15)
+                if response.status_code >= 500:
+                    response.raise_for_status()  # endpoint caído: cuenta para su cortacircuitos
+                if response.status_code != 200:
+                    return None
+                try:
                     data = response.json()
-                    if 'data' in data and 'user' in data['data']:
-                        user_data = data['data']['user']
-                        datos_encontrados = {
-                            'username': user_data.get('username', username),
-                            'seguidores': user_data.get('edge_followed_by', {}).get('count', 'N/A'),
-                            'seguidos': user_data.get('edge_follow', {}).get('count', 'N/A'),
-                            'posts': user_data.get('edge_owner_to_timeline_media', {}).get('count', 'N/A'),
-                            'biografia': user_data.get('biography', ''),
-                            'enlace_externo': user_data.get('external_url', ''),
-                            'es_privado': user_data.get('is_private', False),
-                            'es_verificado': user_data.get('is_verified', False),
-                            'nombre_completo': user_data.get('full_name', ''),
-                            'imagen_perfil': user_data.get('profile_pic_url_hd', user_data.get('profile_pic_url', ''))
-                        }
-                        print(f"✅ Datos extraídos de endpoint: {endpoint}")
-                        return datos_encontrados
-            except:
-                continue
+                except ValueError:
+                    return None  # HTML (muro de login) en lugar de JSON
+                if 'data' in data and 'user' in data['data']:
+                    return data['data']['user']
+                return None
+            return ejecutar
+        
+        estrategias = [
+            {'nombre': endpoint, 'ejecutar': consultar(endpoint),
+             'es_valida': lambda user_data: user_data is not None}
+            for endpoint in endpoints
+        ]
+        endpoint, user_data = correr_estrategias(
+            estrategias, estrategias_paralelas, retardo_cobertura, 'instagram_api', orden_adaptativo
+        )
+        
+        if user_data:
+            datos_encontrados = {
+                'username': user_data.get('username', username),
+                'seguidores': user_data.get('edge_followed_by', {}).get('count', 'N/A'),
+                'seguidos': user_data.get('edge_follow', {}).get('count', 'N/A'),
+                'posts': user_data.get('edge_owner_to_timeline_media', {}).get('count', 'N/A'),
+                'biografia': user_data.get('biography', ''),
+                'enlace_externo': user_data.get('external_url', ''),
+                'es_privado': user_data.get('is_private', False),
+                'es_verificado': user_data.get('is_verified', False),
+                'nombre_completo': user_data.get('full_name', ''),
+                'imagen_perfil': user_data.get('profile_pic_url_hd', user_data.get('profile_pic_url', ''))
+            }
+            print(f"✅ Datos extraídos de endpoint: {endpoint.format(username=username)}")
                 
     except Exception as e:
         print(f"⚠️ Error extrayendo datos alternativos: {str(e)}")
     
     return datos_encontrados
 
+@etapa('instaloader')
 def extraer_con_instaloader(username, directorio):
     """
     Extrae información de Instagram usando instaloader como método alternativo
     """
     try:
-        if not INSTALOADER_DISPONIBLE:
+        instaloader = cargar_opcional('instaloader', "⚠️ instaloader no disponible, usando solo método web scraping")
+        if instaloader is None:
             raise Exception("instaloader no está disponible")
             
-        # Configurar instaloader con opciones para evitar rate limiting
+        # Crear directorio temporal para instaloader (uno por perfil, así varias
+        # extracciones en paralelo no comparten ni borran el mismo directorio)
+        directorio_temp = os.path.join(directorio, 'temp_instaloader', username)
+        os.makedirs(directorio_temp, exist_ok=True)
+        
+        # Configurar instaloader con opciones para evitar rate limiting.
+        # dirname_pattern reemplaza al antiguo os.chdir, que cambiaba el
+        # directorio de trabajo de todo el proceso
         loader = instaloader.Instaloader(
             download_pictures=False,  # Desactivar para ser menos invasivos
             download_videos=False,
@@ -535,17 +581,10 @@ def extraer_con_instaloader(username, directorio):
             download_comments=False,
             save_metadata=False,  # Desactivar para ser más rápido
             compress_json=False,
-            max_connection_attempts=3
+            max_connection_attempts=3,
+            dirname_pattern=directorio_temp
         )
         
-        # Crear directorio temporal para instaloader
-        directorio_temp = os.path.join(directorio, 'temp_instaloader')
-        os.makedirs(directorio_temp, exist_ok=True)
-        
-        # Cambiar al directorio temporal
-        old_cwd = os.getcwd()
-        os.chdir(directorio_temp)
-        
         try:
             # Cargar perfil
             profile = instaloader.Profile.from_username(loader.context, username)
@@ -578,31 +617,23 @@ def extraer_con_instaloader(username, directorio):
             # Intentar descargar imagen de perfil
             try:
                 if profile.profile_pic_url:
-                    import urllib.request
-                    directorio_imagenes = os.path.join(directorio, 'profile_images')
-                    os.makedirs(directorio_imagenes, exist_ok=True)
-                    
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    nombre_imagen = f'profile_{username}_{timestamp}.jpg'
-                    ruta_imagen = os.path.join(directorio_imagenes, nombre_imagen)
-                    
-                    urllib.request.urlretrieve(profile.profile_pic_url, ruta_imagen)
+                    imagen = descargar_imagen(None, profile.profile_pic_url, directorio, 'instagram', username)
+                    if not imagen['exito']:
+                        raise Exception(imagen['error'])
                     
                     datos_perfil['imagen_perfil_descargada'] = True
-                    datos_perfil['ruta_imagen_perfil'] = ruta_imagen
+                    datos_perfil['ruta_imagen_perfil'] = imagen['ruta']
+                    datos_perfil['tamanio_imagen_perfil'] = imagen['tamanio']
+                    datos_perfil['hash_imagen_perfil'] = imagen['hash']
                     
-                    # Obtener tamaño del archivo
-                    if os.path.exists(ruta_imagen):
-                        datos_perfil['tamanio_imagen_perfil'] = os.path.getsize(ruta_imagen)
-                    
-                    print(f"✅ Imagen de perfil descargada con instaloader: {ruta_imagen}")
+                    print(f"✅ Imagen de perfil descargada con instaloader: {imagen['ruta']}")
             except Exception as e:
                 print(f"⚠️ Error al descargar imagen con instaloader: {str(e)}")
             
-            # Guardar datos en archivo JSON
-            archivo_salida = os.path.join(directorio, f'instagram_profile_{username}_{datetime.now().strftime("%Y%m%d_%H%M%S")}_instaloader.json')
-            with open(archivo_salida, 'w', encoding='utf-8') as f:
-                json.dump(datos_perfil, f, ensure_ascii=False, indent=2)
+            # Guardar datos en archivo JSON (o en el almacén de resultados si está activo)
+            archivo_salida = almacen_resultados.guardar_datos(
+                directorio, f'instagram_profile_{username}_{datetime.now().strftime("%Y%m%d_%H%M%S")}_instaloader.json', 'instagram', username, datos_perfil
+            )
             
             return {
                 'exito': True,
@@ -612,9 +643,6 @@ def extraer_con_instaloader(username, directorio):
             }
             
         finally:
-            # Volver al directorio original
-            os.chdir(old_cwd)
-            
             # Limpiar directorio temporal
             try:
                 import shutil
@@ -631,14 +659,42 @@ def extraer_con_instaloader(username, directorio):
         }
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
+    from registro_eventos import separar_opciones, modo_maquina
+    try:
+        formato_registro, nivel_registro, argumentos = separar_opciones(sys.argv[1:])
+        opciones_grabacion, argumentos = grabacion_http.separar_opciones(argumentos)
+        grabacion_http.configurar_desde_parametros(opciones_grabacion, proceso=True)
+        opciones_perfil, argumentos = perfilado.separar_opciones(argumentos)
+        perfilado.configurar_desde_parametros(opciones_perfil, proceso=True)
+    except ValueError as e:
+        print(json.dumps({'exito': False, 'error': 'Parámetros incorrectos', 'mensaje': str(e)}))
+        sys.exit(1)
+    
+    if argumentos == ['--serve']:
+        from servidor_jsonl import servir
+        servir(extraer_perfil_instagram_simple, formato=formato_registro or 'texto', nivel_minimo=nivel_registro)
+        sys.exit(0)
+    
+    if argumentos and argumentos[0] == '--startup-report':
+        from arranque import reporte_arranque
+        sys.exit(reporte_arranque(__file__, argumentos[1:], dependencias_diferidas=('instaloader',)))
+    
+    if len(argumentos) != 1:
         print(json.dumps({
             'exito': False,
             'error': 'Parámetros incorrectos',
-            'mensaje': 'Uso: python instagram_profile_scraper_simple.py <parametros_json>'
+            'mensaje': 'Uso: python instagram_profile_scraper_simple.py [--maquina] [--registro json|texto|ninguno] '
+                       '[--nivel-registro error|aviso|info] [--grabar DIR | --reproducir DIR] [--escala-latencia X] '
+                       '[--perfil[=DIR]] <parametros_json> | --serve | --startup-report [--presupuesto-ms N]'
         }))
         sys.exit(1)
     
-    parametros = sys.argv[1]
+    parametros = argumentos[0]
+    salida = sys.stdout
+    if formato_registro is not None:
+        # Modo máquina: el progreso va a stderr (o se descarta) hasta el final del
+        # proceso, hilos y atexit incluidos, y el stdout original solo lleva el resultado
+        salida = modo_maquina(formato_registro, nivel_registro)
     resultado = extraer_perfil_instagram_simple(parametros)
-    print(json.dumps(resultado, ensure_ascii=False))
+    salida.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+    salida.flush()
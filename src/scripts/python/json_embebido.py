@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Extracción de los datos embebidos en los <script> de una página de
+Instagram sin construir el árbol DOM.
+
+Una sola pasada sobre el HTML crudo localiza cada <script> (posición de su
+contenido y tipo) y, con str.find acotado a ese tramo, si contiene
+window._sharedData. Después cada consulta trabaja por posición sobre el
+texto original: el JSON se decodifica in situ con raw_decode (sin copiar
+el script) y solo cuando se pide; la regex de imágenes recorre los
+scripts únicamente si hace falta.
+"""
+import re
+import json
+
+_APERTURA_SCRIPT = re.compile(r'<script\b([^>]*)>', re.IGNORECASE)
+_CIERRE_SCRIPT = re.compile(r'</script\s*>', re.IGNORECASE)
+_ATRIBUTO_TIPO = re.compile(r'''\btype\s*=\s*["']?([^"'\s>]+)''', re.IGNORECASE)
+_ESPACIOS = re.compile(r'\s*')
+
+MARCA_SHARED_DATA = 'window._sharedData'
+TIPOS_JAVASCRIPT = (None, 'text/javascript')
+PATRON_IMAGEN_INSTAGRAM = re.compile(r'https://[^"\']*\.instagram\.com[^"\']*\.jpg')
+
+_decodificador = json.JSONDecoder()
+
+
+class JsonEmbebido:
+    """
+    Índice de los scripts de una página: (inicio, fin, tipo) del contenido
+    de cada uno y posiciones de window._sharedData
+    """
+
+    def __init__(self, html):
+        self.html = html or ''
+        self.scripts = []
+        self.posiciones_shared_data = []
+
+        posicion = 0
+        while True:
+            apertura = _APERTURA_SCRIPT.search(self.html, posicion)
+            if not apertura:
+                break
+            inicio = apertura.end()
+            cierre = _CIERRE_SCRIPT.search(self.html, inicio)
+            fin = cierre.start() if cierre else len(self.html)
+            tipo = _ATRIBUTO_TIPO.search(apertura.group(1))
+            tipo = tipo.group(1).lower() if tipo else None
+            self.scripts.append((inicio, fin, tipo))
+
+            if tipo in TIPOS_JAVASCRIPT:
+                marca = self.html.find(MARCA_SHARED_DATA, inicio, fin)
+                if marca != -1:
+                    self.posiciones_shared_data.append(marca)
+            posicion = cierre.end() if cierre else fin
+
+    def _decodificar(self, posicion):
+        # raw_decode lee un único valor JSON desde `posicion` y deja lo que sigue (';', etc.)
+        return _decodificador.raw_decode(self.html, _ESPACIOS.match(self.html, posicion).end())[0]
+
+    def shared_data(self):
+        """
+        Genera, en orden, los objetos window._sharedData que se pueden decodificar
+        """
+        for marca in self.posiciones_shared_data:
+            igual = self.html.find('=', marca + len(MARCA_SHARED_DATA))
+            if igual == -1:
+                continue
+            try:
+                datos = self._decodificar(igual + 1)
+            except ValueError:
+                continue
+            if isinstance(datos, dict):
+                yield datos
+
+    def ld_json(self):
+        """
+        Genera, en orden, los bloques application/ld+json que se pueden decodificar
+        """
+        for inicio, fin, tipo in self.scripts:
+            if tipo != 'application/ld+json':
+                continue
+            try:
+                yield json.loads(self.html[inicio:fin])
+            except ValueError:
+                continue
+
+    def url_imagen(self, patron=PATRON_IMAGEN_INSTAGRAM):
+        """
+        Primera URL de imagen que aparece dentro de algún script, o None
+        """
+        for inicio, fin, _ in self.scripts:
+            coincidencia = patron.search(self.html, inicio, fin)
+            if coincidencia:
+                return coincidencia.group(0)
+        return None
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Modo lote: procesa un archivo de URLs mezcladas de Facebook e Instagram en un
+solo proceso.
+
+Cada entrada se enruta al extractor correspondiente derivando el nombre de
+página o el username igual que ejecutarScrapingFacebook/ejecutarScrapingInstagram
+en integratedScrapingService.js. Los resultados se emiten como NDJSON (un
+objeto JSON por línea) a medida que terminan, así el progreso es visible
+mientras la corrida sigue en marcha.
+
+Uso:
+    python lote_scraping.py 20250113791_instagram_facebook.txt \
+        --concurrencia-facebook 2 --concurrencia-instagram 4 > resultados.ndjson
+"""
+import sys
+import json
+import asyncio
+import argparse
+from urllib.parse import urlparse, parse_qs
+
+import almacen_resultados
+import perfilado
+import pool_sesiones
+from registro_eventos import modo_maquina, FORMATOS_REGISTRO, NIVELES
+from red_scraping import MotorFetchAsync, configurar_pool_conexiones, configurar_url_base
+from presupuesto_memoria import TechoMemoria
+from facebook_page_scraper_simple import extraer_pagina_facebook_simple
+from instagram_profile_scraper_simple import extraer_perfil_instagram_simple
+
+PLATAFORMAS = ('facebook', 'instagram')
+
+EXTRACTORES = {
+    'facebook': extraer_pagina_facebook_simple,
+    'instagram': extraer_perfil_instagram_simple
+}
+
+
+def leer_entradas(ruta_archivo):
+    """
+    Lee el archivo de URLs línea a línea (sin cargarlo completo), ignorando
+    líneas vacías y comentarios
+    """
+    with open(ruta_archivo, 'r', encoding='utf-8') as f:
+        for numero_linea, linea in enumerate(f, start=1):
+            linea = linea.strip()
+            if linea and not linea.startswith('#'):
+                yield numero_linea, linea
+
+
+def derivar_objetivo(url):
+    """
+    Determina plataforma y objetivo (pageName o username) de una URL.
+    Devuelve un dict con 'plataforma', 'objetivo' y, si la URL no se puede
+    scrapear como perfil, 'omitido' con el resultado a reportar
+    """
+    url_completa = url if url.startswith('http') else f'https://{url}'
+    url_obj = urlparse(url_completa)
+    host = (url_obj.hostname or '').lower()
+    path_parts = [p for p in url_obj.path.split('/') if p]
+
+    if host == 'facebook.com' or host.endswith('.facebook.com'):
+        page_name = path_parts[0] if path_parts else ''
+
+        # Manejar URLs con parámetro id (ej: profile.php?id=123456)
+        if page_name in ('profile.php', 'profile'):
+            id_param = parse_qs(url_obj.query).get('id', [''])[0]
+            if id_param:
+                page_name = id_param
+
+        es_video = any(p in path_parts for p in ('videos', 'posts', 'watch'))
+        es_post_especifico = len(path_parts) > 1 and path_parts[-1].isdigit()
+        if es_video or es_post_especifico:
+            return {
+                'plataforma': 'facebook',
+                'objetivo': page_name,
+                'omitido': {
+                    'exito': False,
+                    'error': 'URL de contenido específico - verificar con screenshot',
+                    'datos': {
+                        'pagina_existe': None,
+                        'es_contenido_especifico': True,
+                        'tipo_contenido': 'video' if es_video else 'post',
+                        'requiere_verificacion_visual': True
+                    }
+                }
+            }
+
+        if not page_name:
+            return {'plataforma': 'facebook', 'objetivo': '',
+                    'omitido': {'exito': False, 'error': 'No se pudo extraer nombre de página'}}
+        return {'plataforma': 'facebook', 'objetivo': page_name}
+
+    if host == 'instagram.com' or host.endswith('.instagram.com'):
+        username = path_parts[0] if path_parts else ''
+
+        if any(p in path_parts for p in ('p', 'reel', 'tv')):
+            return {
+                'plataforma': 'instagram',
+                'objetivo': username,
+                'omitido': {
+                    'exito': False,
+                    'error': 'URL de post/reel no soportada',
+                    'datos': {'usuario_existe': False}
+                }
+            }
+
+        if not username:
+            return {'plataforma': 'instagram', 'objetivo': '',
+                    'omitido': {'exito': False, 'error': 'No se pudo extraer username'}}
+        return {'plataforma': 'instagram', 'objetivo': username}
+
+    return {'plataforma': None, 'objetivo': '',
+            'omitido': {'exito': False, 'error': 'URL no es de Facebook ni de Instagram'}}
+
+
+def construir_parametros(plataforma, objetivo, directorio, max_posts, opciones=None):
+    """
+    Construye los parámetros JSON que espera cada extractor. `opciones` se
+    añade tal cual (ej: estrategiasParalelas, retardoCobertura)
+    """
+    clave = 'pageName' if plataforma == 'facebook' else 'username'
+    return json.dumps({clave: objetivo, 'directorio': directorio, 'maxPosts': max_posts, **(opciones or {})})
+
+
+async def procesar_lote(ruta_archivo, concurrencia, directorio='scraped_data', max_posts=5, salida=None,
+                        timeout_objetivo=None, limite_por_host=None, opciones=None, rss_maximo_mb=None):
+    """
+    Procesa todas las entradas del archivo sobre el motor asyncio de
+    red_scraping. `concurrencia` es un dict {'facebook': n, 'instagram': n}
+    con las extracciones simultáneas por plataforma y `opciones` se pasa a
+    cada extractor. Con `rss_maximo_mb` la concurrencia de cada plataforma
+    baja (hasta 1) mientras el RSS del proceso supere ese techo. Escribe
+    cada resultado en `salida` como una línea NDJSON y devuelve un resumen
+    """
+    salida = salida or sys.stdout
+    resumen = {'total': 0, 'exitosos': 0, 'fallidos': 0, 'omitidos': 0}
+    techo = TechoMemoria(rss_maximo_mb) if rss_maximo_mb else None
+    efectiva = dict(concurrencia)
+    if techo is not None:
+        resumen['concurrencia_minima'] = dict(concurrencia)
+    motor = MotorFetchAsync(max_en_vuelo=sum(concurrencia.values()), limite_por_host=limite_por_host)
+
+    # El semáforo de cada plataforma limita las tareas en vuelo, así el
+    # archivo se consume en streaming sin crear miles de tareas en memoria
+    cupos = {p: asyncio.Semaphore(concurrencia[p]) for p in PLATAFORMAS}
+    pendientes = set()
+
+    def liberar_cupo(plataforma):
+        if techo is None:
+            cupos[plataforma].release()
+            return
+        nueva = techo.ajustar(efectiva[plataforma], concurrencia[plataforma])
+        if nueva < efectiva[plataforma]:
+            # El cupo no se devuelve: la plataforma queda con uno menos
+            print(f"⚠️ RSS por encima de {rss_maximo_mb} MB: concurrencia de {plataforma} baja a {nueva}")
+        else:
+            if nueva > efectiva[plataforma]:
+                cupos[plataforma].release()  # cupo recuperado
+            cupos[plataforma].release()
+        efectiva[plataforma] = nueva
+        resumen['concurrencia_minima'][plataforma] = min(resumen['concurrencia_minima'][plataforma], nueva)
+
+    def emitir(registro):
+        salida.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        salida.flush()
+        resumen['total'] += 1
+        if registro.get('omitido'):
+            resumen['omitidos'] += 1
+        elif registro.get('exito'):
+            resumen['exitosos'] += 1
+        else:
+            resumen['fallidos'] += 1
+
+    async def tarea(base, plataforma, parametros):
+        try:
+            resultado = await motor.ejecutar(EXTRACTORES[plataforma], parametros, timeout=timeout_objetivo)
+        except Exception as e:
+            resultado = {'exito': False, 'error': str(e), 'mensaje': f'Error inesperado: {str(e)}'}
+        finally:
+            liberar_cupo(plataforma)
+        emitir({**base, **resultado})
+
+    try:
+        for numero_linea, url in leer_entradas(ruta_archivo):
+            destino = derivar_objetivo(url)
+            base = {
+                'linea': numero_linea,
+                'url': url,
+                'plataforma': destino['plataforma'],
+                'objetivo': destino['objetivo']
+            }
+
+            if 'omitido' in destino:
+                emitir({**base, 'omitido': True, **destino['omitido']})
+                continue
+
+            plataforma = destino['plataforma']
+            parametros = construir_parametros(plataforma, destino['objetivo'], directorio, max_posts, opciones)
+            await cupos[plataforma].acquire()
+            tarea_objetivo = asyncio.create_task(tarea(base, plataforma, parametros))
+            pendientes.add(tarea_objetivo)
+            tarea_objetivo.add_done_callback(pendientes.discard)
+
+        if pendientes:
+            await asyncio.gather(*pendientes)
+    finally:
+        motor.cerrar()
+
+    return resumen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scraping por lotes de URLs de Facebook e Instagram (salida NDJSON)')
+    parser.add_argument('archivo', help='Archivo de texto con una URL por línea')
+    parser.add_argument('--concurrencia-facebook', type=int, default=2, help='Extracciones simultáneas de Facebook')
+    parser.add_argument('--concurrencia-instagram', type=int, default=2, help='Extracciones simultáneas de Instagram')
+    parser.add_argument('--directorio', default='scraped_data', help='Directorio de salida de los extractores')
+    parser.add_argument('--max-posts', type=int, default=5)
+    parser.add_argument('--limite-por-host', type=int, default=None, help='Conexiones simultáneas por host')
+    parser.add_argument('--conexiones-por-host', type=int, default=None,
+                        help='Conexiones keep-alive guardadas por host (por defecto = --limite-por-host)')
+    parser.add_argument('--timeout-objetivo', type=float, default=None,
+                        help='Segundos máximos por objetivo; al vencer se cancela la extracción')
+    parser.add_argument('--estrategias-paralelas', type=int, default=1,
+                        help='Métodos de acceso que compiten a la vez en cada objetivo (1 = secuencial)')
+    parser.add_argument('--retardo-cobertura', type=float, default=None,
+                        help='Segundos sin respuesta tras los que se lanza el siguiente método')
+    parser.add_argument('--solo-cabecera', action='store_true',
+                        help='Descargar solo la cabecera de cada página (título y metadatos)')
+    parser.add_argument('--limite-bytes-cabecera', type=int, default=None,
+                        help='Bytes máximos leídos por página con --solo-cabecera')
+    parser.add_argument('--parser-html', choices=('auto', 'html.parser', 'lxml', 'selectolax'), default=None,
+                        help='Backend para parsear el HTML (por defecto html.parser; auto = el más rápido instalado)')
+    parser.add_argument('--cache-http', nargs='?', const=True, default=None, metavar='DIRECTORIO',
+                        help='Caché HTTP en disco con revalidación (por defecto ./cache_http)')
+    parser.add_argument('--cache-http-max-mb', type=float, default=None, help='Tamaño máximo de la caché HTTP')
+    parser.add_argument('--frescura-cache', action='append', default=[], metavar='HOST=SEGUNDOS',
+                        help='Segundos que las respuestas de HOST (y subdominios) se sirven sin revalidar')
+    parser.add_argument('--cache-resultados', action='store_true',
+                        help='Reutilizar (y guardar) los resultados de objetivos ya resueltos')
+    parser.add_argument('--forzar-actualizacion', action='store_true',
+                        help='Volver a extraer aunque haya un resultado vigente en la caché')
+    parser.add_argument('--ttl-resultado', type=float, default=None,
+                        help='Segundos de vigencia de un resultado positivo en la caché')
+    parser.add_argument('--ttl-resultado-negativo', type=float, default=None,
+                        help='Segundos de vigencia de un resultado negativo (no existe / bloqueado)')
+    parser.add_argument('--almacen-resultados', nargs='?', const=True, default=None, metavar='BASE',
+                        help='Guardar los resultados en SQLite en vez de un JSON por objetivo '
+                             '(por defecto <directorio>/resultados.sqlite3)')
+    parser.add_argument('--id-ejecucion', default=None,
+                        help='Identificador de la ejecución en el almacén (por defecto fecha y PID)')
+    parser.add_argument('--gobernador-tasa', nargs='?', const=True, default=None, metavar='BASE',
+                        help='Limitar la tasa por dominio con cubetas compartidas entre procesos '
+                             '(por defecto ./gobernador_tasa/cubetas.sqlite3)')
+    parser.add_argument('--tasa-maxima', action='append', default=[], metavar='DOMINIO=PETICIONES_S',
+                        help='Peticiones por segundo máximas de DOMINIO (y subdominios)')
+    parser.add_argument('--registro', choices=FORMATOS_REGISTRO, default='texto',
+                        help='Formato del progreso en stderr: texto, eventos JSON o ninguno')
+    parser.add_argument('--nivel-registro', choices=NIVELES, default='info',
+                        help='Nivel mínimo de los mensajes de progreso')
+    parser.add_argument('--archivo-trazas', default=None, metavar='ARCHIVO',
+                        help='Añadir los tramos de tiempo de cada extracción (JSONL) a ARCHIVO')
+    parser.add_argument('--cortacircuitos', action='store_true',
+                        help='Saltar durante un tiempo las estrategias cuyo endpoint falla de forma continuada')
+    parser.add_argument('--reintentos-maximos', type=int, default=None,
+                        help='Reintentos por petición ante fallos transitorios (0 = ninguno)')
+    parser.add_argument('--proporcion-reintentos', type=float, default=None,
+                        help='Reintentos que aporta cada petición al presupuesto global (ej: 0.1)')
+    parser.add_argument('--url-base', default=None, metavar='URL',
+                        help='Enviar las peticiones a un servidor sustituto (ver servidor_sustituto.py)')
+    grabacion = parser.add_mutually_exclusive_group()
+    grabacion.add_argument('--grabar', default=None, metavar='DIR',
+                           help='Grabar todos los intercambios HTTP del lote en DIR')
+    grabacion.add_argument('--reproducir', default=None, metavar='DIR',
+                           help='Responder desde la grabación de DIR sin tocar la red')
+    parser.add_argument('--escala-latencia', type=float, default=None,
+                        help='Al reproducir: multiplicar la latencia grabada (1 = original, 0 = sin esperas)')
+    parser.add_argument('--perfil', nargs='?', const=True, default=None, metavar='DIR',
+                        help='Perfilar cada extracción (.pstats por objetivo) y la ejecución completa '
+                             '(pilas colapsadas para flamegraph; por defecto ./perfiles)')
+    parser.add_argument('--intervalo-muestreo-ms', type=float, default=None,
+                        help='Con --perfil: intervalo del muestreo de pilas')
+    parser.add_argument('--informe-memoria', action='store_true',
+                        help='Añadir a cada resultado el pico de memoria por etapa (tracemalloc)')
+    parser.add_argument('--rss-maximo-mb', type=float, default=None,
+                        help='Techo de RSS del proceso: por encima se reduce la concurrencia en vez de agotar la memoria')
+    parser.add_argument('--pool-sesiones', nargs='?', const=True, default=None, metavar='DIR',
+                        help='Rotar varias cuentas de Facebook (cookies o credenciales en DIR; por defecto ./sesiones/cuentas)')
+    parser.add_argument('--seleccion-sesiones', choices=pool_sesiones.SELECCIONES, default=None,
+                        help='Con --pool-sesiones: por turno (rotacion) o la usada hace más tiempo (lru)')
+    parser.add_argument('--usos-por-hora-cuenta', type=float, default=None,
+                        help='Con --pool-sesiones: usos autenticados por hora de cada cuenta')
+    parser.add_argument('--enfriamiento-cuenta', type=float, default=None,
+                        help='Con --pool-sesiones: segundos mínimos entre dos usos de la misma cuenta')
+    args = parser.parse_args(argv)
+
+    concurrencia = {
+        'facebook': max(1, args.concurrencia_facebook),
+        'instagram': max(1, args.concurrencia_instagram)
+    }
+
+    configurar_pool_conexiones(conexiones_por_host=args.conexiones_por_host)
+    if args.url_base:
+        configurar_url_base(args.url_base)
+    opciones = {'estrategiasParalelas': args.estrategias_paralelas}
+    if args.retardo_cobertura is not None:
+        opciones['retardoCobertura'] = args.retardo_cobertura
+    if args.solo_cabecera:
+        opciones['soloCabecera'] = True
+    if args.limite_bytes_cabecera is not None:
+        opciones['limiteBytesCabecera'] = args.limite_bytes_cabecera
+    if args.parser_html is not None:
+        opciones['parserHtml'] = args.parser_html
+    if args.cache_resultados:
+        opciones['cacheResultados'] = True
+    if args.forzar_actualizacion:
+        opciones['forzarActualizacion'] = True
+    if args.ttl_resultado is not None:
+        opciones['ttlResultado'] = args.ttl_resultado
+    if args.ttl_resultado_negativo is not None:
+        opciones['ttlResultadoNegativo'] = args.ttl_resultado_negativo
+    if args.almacen_resultados:
+        opciones['almacenResultados'] = args.almacen_resultados
+        opciones['idEjecucion'] = args.id_ejecucion or almacen_resultados.nuevo_id_ejecucion()
+    if args.archivo_trazas:
+        opciones['archivoTrazas'] = args.archivo_trazas
+    if args.cortacircuitos:
+        opciones['cortacircuitos'] = True
+    if args.reintentos_maximos is not None:
+        opciones['reintentosMaximos'] = args.reintentos_maximos
+    if args.proporcion_reintentos is not None:
+        opciones['proporcionReintentos'] = args.proporcion_reintentos
+    if args.grabar:
+        opciones['grabarHttp'] = args.grabar
+    if args.reproducir:
+        opciones['reproducirHttp'] = args.reproducir
+    if args.escala_latencia is not None:
+        opciones['escalaLatencia'] = args.escala_latencia
+    if args.informe_memoria:
+        opciones['informeMemoria'] = True
+    if args.perfil:
+        opciones['perfil'] = args.perfil
+        if args.intervalo_muestreo_ms is not None:
+            opciones['intervaloMuestreoMs'] = args.intervalo_muestreo_ms
+    if args.pool_sesiones:
+        opciones['poolSesiones'] = args.pool_sesiones
+        if args.seleccion_sesiones:
+            opciones['seleccionSesiones'] = args.seleccion_sesiones
+        if args.usos_por_hora_cuenta is not None:
+            opciones['usosPorHoraCuenta'] = args.usos_por_hora_cuenta
+        if args.enfriamiento_cuenta is not None:
+            opciones['enfriamientoCuenta'] = args.enfriamiento_cuenta
+    if args.gobernador_tasa:
+        opciones['gobernadorTasa'] = args.gobernador_tasa
+        if args.tasa_maxima:
+            opciones['tasasMaximas'] = {
+                dominio: float(tasa) for dominio, _, tasa in (regla.partition('=') for regla in args.tasa_maxima)
+            }
+    if args.cache_http:
+        opciones['cacheHttp'] = args.cache_http
+        if args.cache_http_max_mb is not None:
+            opciones['cacheHttpMaxMb'] = args.cache_http_max_mb
+        if args.frescura_cache:
+            opciones['frescuraCacheHttp'] = {
+                host: float(segundos) for host, _, segundos in (regla.partition('=') for regla in args.frescura_cache)
+            }
+
+    # El almacén y el perfilado se leen al terminar el lote: se fijan para todo el proceso
+    almacen_resultados.configurar_desde_parametros(opciones, args.directorio, proceso=True)
+    perfilado.configurar_desde_parametros(opciones, proceso=True)
+
+    # stdout queda reservado para el NDJSON; el progreso de los extractores (y de los
+    # hilos y atexit que escriban después) va a stderr hasta el final del proceso
+    salida = modo_maquina(args.registro, args.nivel_registro)
+    resumen = asyncio.run(procesar_lote(
+        args.archivo, concurrencia, args.directorio, args.max_posts, salida,
+        timeout_objetivo=args.timeout_objetivo, limite_por_host=args.limite_por_host, opciones=opciones,
+        rss_maximo_mb=args.rss_maximo_mb
+    ))
+    print(f"📊 Lote terminado: {resumen['total']} entradas - {resumen['exitosos']} exitosas, "
+          f"{resumen['fallidos']} fallidas, {resumen['omitidos']} omitidas")
+    if almacen_resultados.activo():
+        almacen_resultados.vaciar()
+        print(f"🗄️ Resultados de la ejecución {opciones['idEjecucion']} en {almacen_resultados.ruta_actual()}")
+    for ruta in perfilado.vaciar():
+        print(f"🔬 Perfil agregado: {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
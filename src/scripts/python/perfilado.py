@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Perfilado opcional de las extracciones (parámetro perfil / --perfil).
+
+Con el perfilado activo, cada llamada a un extractor:
+
+- se perfila con cProfile (determinista) y se guarda como
+  <directorio>/<plataforma>_<objetivo>_<fecha>.pstats; la ruta se añade
+  al resultado en 'perfil'. cProfile solo ve el hilo que llama al
+  extractor: las estrategias en carrera corren en otros hilos;
+- se suma al perfil agregado de la ejecución (agregado_<ejecucion>.pstats).
+
+Además, mientras haya extracciones perfiladas en curso, un hilo
+muestreador recorre las pilas de todos los hilos cada
+INTERVALO_MUESTREO_MS y cuenta las que pasan por código de estos scripts
+(incluidas las esperas de red de los hilos de estrategias). Al terminar se
+escriben en pilas_<ejecucion>.collapsed con el formato de pilas colapsadas
+("marco;marco;marco N") que entienden flamegraph.pl, speedscope o
+inferno, para ver de un vistazo si domina BeautifulSoup, las regex sobre
+scripts embebidos, el JSON o la red.
+
+El perfilado se activa para todo el proceso (--perfil) o solo para una
+extracción (parámetro perfil; ver ajustes_extraccion.py). Los archivos
+agregados de cada directorio se escriben con `vaciar()` (al final del lote
+y al salir del proceso).
+"""
+import os
+import re
+import sys
+import json
+import atexit
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from datetime import datetime
+
+from ajustes_extraccion import Ajuste
+
+DIRECTORIO_PERFILES_DEFECTO = os.path.join(os.getcwd(), 'perfiles')
+INTERVALO_MUESTREO_MS = 10
+
+# Solo se cuentan las pilas que pasan por código de este directorio
+_DIRECTORIO_SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+
+_ajuste = Ajuste('perfilado')
+_lock = threading.Lock()
+_ejecucion = f'{datetime.now().strftime("%Y%m%d_%H%M%S")}_{os.getpid()}'
+_agregados = {}  # directorio -> pstats.Stats de sus extracciones
+_en_curso = Counter()  # directorio -> extracciones perfiladas en curso
+_muestreador = None
+
+
+class Muestreador(threading.Thread):
+    """
+    Cuenta periódicamente las pilas de todos los hilos del proceso
+    """
+
+    def __init__(self, intervalo):
+        super().__init__(name='muestreador-perfil', daemon=True)
+        self.intervalo = intervalo
+        self.pilas = {}  # directorio -> Counter de pilas colapsadas
+        self.muestras = 0
+        self._parar = threading.Event()
+        self._etiquetas = {}
+        self._lock = threading.Lock()
+
+    def _etiqueta(self, codigo):
+        etiqueta = self._etiquetas.get(codigo)
+        if etiqueta is None:
+            etiqueta = f'{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})'
+            self._etiquetas[codigo] = etiqueta
+        return etiqueta
+
+    def muestrear(self):
+        contadas = []
+        for ident, marco in sys._current_frames().items():
+            if ident == self.ident:
+                continue
+            pila, propia = [], False
+            while marco is not None:
+                codigo = marco.f_code
+                propia = propia or codigo.co_filename.startswith(_DIRECTORIO_SCRIPTS)
+                pila.append(self._etiqueta(codigo))
+                marco = marco.f_back
+            if propia:
+                contadas.append(';'.join(reversed(pila)))
+        with _lock:
+            directorios = [directorio for directorio, cuenta in _en_curso.items() if cuenta > 0]
+        # Con varios directorios en curso a la vez cada muestra cuenta en todos
+        with self._lock:
+            for directorio in directorios:
+                self.pilas.setdefault(directorio, Counter()).update(contadas)
+            self.muestras += 1
+
+    def copia(self):
+        with self._lock:
+            return {directorio: dict(pilas) for directorio, pilas in self.pilas.items()}
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            with _lock:
+                en_curso = any(cuenta > 0 for cuenta in _en_curso.values())
+            if en_curso:
+                self.muestrear()
+
+    def detener(self):
+        self._parar.set()
+
+
+def configurar(directorio=None, intervalo_muestreo_ms=None, proceso=True):
+    """
+    Activa el perfilado guardando en `directorio` para todo el proceso o,
+    con proceso=False, solo para la extracción en curso
+    """
+    global _muestreador
+    directorio = os.path.abspath(directorio or DIRECTORIO_PERFILES_DEFECTO)
+    intervalo = max(1, float(intervalo_muestreo_ms or INTERVALO_MUESTREO_MS)) / 1000
+    os.makedirs(directorio, exist_ok=True)
+    with _lock:
+        if _muestreador is None:
+            _muestreador = Muestreador(intervalo)
+            _muestreador.start()
+        else:
+            _muestreador.intervalo = intervalo
+    _ajuste.fijar({'directorio': directorio, 'intervalo': intervalo}, proceso)
+
+
+def configurar_desde_parametros(params, proceso=False):
+    """
+    Parámetros del extractor: perfil (true o directorio; false lo
+    desactiva) e intervaloMuestreoMs. Sin perfil se mantiene la
+    configuración del proceso
+    """
+    if 'perfil' not in params:
+        return
+    valor = params['perfil']
+    if not valor:
+        _ajuste.fijar(None, proceso)
+        return
+    configurar(valor if isinstance(valor, str) else None, params.get('intervaloMuestreoMs'), proceso)
+
+
+def activo():
+    return _ajuste.valor() is not None
+
+
+def separar_opciones(argumentos):
+    """
+    Separa --perfil y --perfil=DIR de los argumentos de un script.
+    Devuelve (parámetros a añadir, resto)
+    """
+    opciones, resto = {}, []
+    for argumento in argumentos:
+        nombre, igual, valor = argumento.partition('=')
+        if nombre == '--perfil':
+            opciones['perfil'] = valor if igual and valor else True
+        else:
+            resto.append(argumento)
+    return opciones, resto
+
+
+def _nombre_archivo(plataforma, objetivo):
+    limpio = re.sub(r'[^\w.-]+', '_', str(objetivo or 'sin_objetivo'))[:80]
+    return f'{plataforma}_{limpio}_{datetime.now().strftime("%Y%m%d_%H%M%S_%f")}.pstats'
+
+
+def con_perfil(plataforma, campo_objetivo, parametros, extraer):
+    """
+    Envuelve un extractor: si el perfilado está activo (o lo piden los
+    parámetros) guarda el perfil de la extracción y lo suma al agregado
+    """
+    try:
+        params = json.loads(parametros)
+        configurar_desde_parametros(params)
+        objetivo = params.get(campo_objetivo, '')
+    except (TypeError, ValueError, AttributeError):
+        objetivo = ''
+    if not activo():
+        return extraer(parametros)
+
+    directorio = _ajuste.valor()['directorio']
+    with _lock:
+        _en_curso[directorio] += 1
+    try:
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Python 3.12+: un solo perfilador determinista a la vez en el proceso
+            return extraer(parametros)
+        try:
+            resultado = extraer(parametros)
+        finally:
+            perfil.disable()
+    finally:
+        with _lock:
+            _en_curso[directorio] -= 1
+
+    ruta = os.path.join(directorio, _nombre_archivo(plataforma, objetivo))
+    try:
+        perfil.dump_stats(ruta)
+        with _lock:
+            if directorio not in _agregados:
+                _agregados[directorio] = pstats.Stats(perfil)
+            else:
+                _agregados[directorio].add(perfil)
+        if isinstance(resultado, dict):
+            resultado['perfil'] = ruta
+    except (OSError, TypeError) as e:
+        print(f"⚠️ No se pudo guardar el perfil de {objetivo}: {str(e)}")
+    return resultado
+
+
+def vaciar():
+    """
+    Escribe el perfil agregado y las pilas colapsadas de la ejecución en
+    cada directorio con extracciones perfiladas. Devuelve las rutas escritas
+    """
+    rutas = []
+    try:
+        with _lock:
+            for directorio, agregado in _agregados.items():
+                ruta = os.path.join(directorio, f'agregado_{_ejecucion}.pstats')
+                agregado.dump_stats(ruta)
+                rutas.append(ruta)
+        pilas_por_directorio = _muestreador.copia() if _muestreador else {}
+        for directorio, pilas in pilas_por_directorio.items():
+            if not pilas:
+                continue
+            ruta = os.path.join(directorio, f'pilas_{_ejecucion}.collapsed')
+            temporal = f'{ruta}.tmp'
+            with open(temporal, 'w', encoding='utf-8') as f:
+                for pila, cuenta in sorted(pilas.items()):
+                    f.write(f'{pila} {cuenta}\n')
+            os.replace(temporal, ruta)
+            rutas.append(ruta)
+    except OSError as e:
+        print(f"⚠️ No se pudo escribir el perfil agregado: {str(e)}")
+    return rutas
+
+
+atexit.register(vaciar)
+
+
+def resumen(ruta, limite=25):
+    """
+    Funciones con más tiempo propio de un .pstats (para un vistazo rápido)
+    """
+    estadisticas = pstats.Stats(ruta)
+    filas = []
+    for (archivo, linea, funcion), (_, llamadas, propio, acumulado, _) in estadisticas.stats.items():
+        filas.append({
+            'funcion': f'{funcion} ({os.path.basename(archivo)}:{linea})',
+            'llamadas': llamadas,
+            'tiempo_propio_s': round(propio, 4),
+            'tiempo_acumulado_s': round(acumulado, 4)
+        })
+    filas.sort(key=lambda fila: fila['tiempo_propio_s'], reverse=True)
+    return {'tiempo_total_s': round(estadisticas.total_tt, 4), 'funciones': filas[:limite]}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != 'resumen':
+        print("Uso: python perfilado.py resumen ARCHIVO.pstats [LIMITE]")
+        sys.exit(1)
+    print(json.dumps(resumen(sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 25), ensure_ascii=False, indent=2))
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Pool de cuentas de Facebook con rotación y salud por cuenta.
+
+Con el parámetro poolSesiones (true o directorio; por defecto
+./sesiones/cuentas) el extractor de Facebook no usa la cuenta única de
+FACEBOOK_CREDENTIALS sino las cuentas del directorio:
+
+- <nombre>.json con una lista de cookies (formato Playwright),
+- <nombre>.json con {"usuario", "contrasena", "cookies" (opcional),
+  "usosPorHora" y "enfriamiento" (opcionales)}: si las cookies no valen se
+  inicia sesión y se guardan las nuevas en el mismo archivo,
+- <nombre>.pkl con un cookie jar de requests (como guardar_sesion).
+
+Cada extracción toma una cuenta con `adquirir`, por turno ('rotacion') o
+la usada hace más tiempo ('lru'), entre las que:
+
+- no están en cuarentena: un muro de login o una redirección a checkpoint
+  con la sesión de la cuenta la aparta CUARENTENA_MURO segundos (el doble
+  cada vez que se repite, hasta CUARENTENA_MAXIMA) o CUARENTENA_CHECKPOINT;
+  una sesión inválida sin credenciales la aparta hasta que se renueven sus
+  cookies (cambia su huella);
+- han cumplido su enfriamiento desde el último uso;
+- tienen saldo en su presupuesto de usos (cubeta de usosPorHora fichas por
+  hora con ráfaga RAFAGA_USOS).
+
+El estado (usos, cuarentenas, validez, saldo) se guarda en
+<directorio>/estado_pool.sqlite3 (estado_compartido.py): cada selección y
+cada cuarentena se deciden dentro de una transacción, así dos procesos no
+entregan la misma cuenta ni pierden el uso o la cuarentena del otro. `python pool_sesiones.py estado [DIR]` lo muestra.
+"""
+import os
+import json
+import time
+import pickle
+import sqlite3
+import threading
+
+import estado_compartido
+from ajustes_extraccion import Ajuste
+from cache_sesion import huella_cookies
+
+DIRECTORIO_POOL_DEFECTO = os.path.join(os.getcwd(), 'sesiones', 'cuentas')
+ARCHIVO_ESTADO = 'estado_pool.sqlite3'
+
+SELECCIONES = ('rotacion', 'lru')
+SELECCION_DEFECTO = 'rotacion'
+# Clave del cursor de rotación en el estado: las cuentas se guardan por el
+# nombre de su archivo, que no puede contener '/', así nunca coinciden
+CLAVE_ROTACION = 'pool/rotacion'
+
+# Presupuesto de usos autenticados por cuenta
+USOS_POR_HORA_DEFECTO = 60
+RAFAGA_USOS = 5
+# Segundos mínimos entre dos usos de la misma cuenta
+ENFRIAMIENTO_DEFECTO = 10
+
+# Segundos de cuarentena por motivo
+CUARENTENA_MURO = 3600
+CUARENTENA_CHECKPOINT = 24 * 3600
+CUARENTENA_MAXIMA = 24 * 3600
+
+# Cuentas que prueba una extracción antes de seguir sin autenticar
+INTENTOS_POR_EXTRACCION = 3
+
+# Desenlaces que informa el extractor
+OK = 'ok'
+MURO_LOGIN = 'muro_login'
+CHECKPOINT = 'checkpoint'
+SESION_INVALIDA = 'sesion_invalida'
+
+_ajuste = Ajuste('pool_sesiones')
+_lock = threading.Lock()
+_cuentas = {}  # directorio -> (firma de sus archivos, {nombre: Cuenta})
+
+
+class Cuenta:
+    """
+    Una cuenta del pool: sus cookies y, si las hay, sus credenciales
+    """
+
+    def __init__(self, nombre, ruta, cookies, credenciales=None, usos_por_hora=None, enfriamiento=None):
+        self.nombre = nombre
+        self.ruta = ruta
+        self.cookies = cookies
+        self.credenciales = credenciales
+        self.usos_por_hora = usos_por_hora
+        self.enfriamiento = enfriamiento
+        self.huella = huella_cookies(cookies) if cookies else None
+
+    def aplicar_cookies(self, session):
+        for cookie in self.cookies:
+            session.cookies.set(
+                name=cookie.get('name'),
+                value=cookie.get('value'),
+                domain=cookie.get('domain'),
+                path=cookie.get('path', '/')
+            )
+        return session
+
+    def guardar_cookies(self, session):
+        """
+        Guarda las cookies de la sesión en el archivo de la cuenta (tras un login)
+        """
+        cookies = [{'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path} for c in session.cookies]
+        try:
+            temporal = f'{self.ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+            if self.ruta.endswith('.pkl'):
+                with open(temporal, 'wb') as f:
+                    pickle.dump(session.cookies, f)
+            else:
+                contenido = cookies
+                if self.credenciales:
+                    contenido = {**_leer_json(self.ruta, {}), 'cookies': cookies}
+                with open(temporal, 'w', encoding='utf-8') as f:
+                    json.dump(contenido, f, ensure_ascii=False, indent=2)
+            os.replace(temporal, self.ruta)
+            print(f"💾 Sesión de la cuenta {self.nombre} guardada")
+            return True
+        except (OSError, pickle.PickleError, TypeError) as e:
+            print(f"⚠️ No se pudo guardar la sesión de la cuenta {self.nombre}: {str(e)}")
+            return False
+
+
+def _leer_json(ruta, defecto):
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return defecto
+
+
+def _cargar_cuenta(ruta):
+    nombre, extension = os.path.splitext(os.path.basename(ruta))
+    if extension == '.pkl':
+        with open(ruta, 'rb') as f:
+            jar = pickle.load(f)
+        cookies = [{'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path} for c in jar]
+        return Cuenta(nombre, ruta, cookies)
+    with open(ruta, 'r', encoding='utf-8') as f:
+        contenido = json.load(f)
+    if isinstance(contenido, list):
+        return Cuenta(nombre, ruta, contenido)
+    credenciales = None
+    if contenido.get('usuario') and contenido.get('contrasena'):
+        credenciales = {'username': contenido['usuario'], 'password': contenido['contrasena']}
+    return Cuenta(
+        nombre, ruta, contenido.get('cookies') or [], credenciales,
+        contenido.get('usosPorHora'), contenido.get('enfriamiento')
+    )
+
+
+def _firma(directorio):
+    try:
+        entradas = sorted(
+            (entrada.name, entrada.stat().st_mtime_ns) for entrada in os.scandir(directorio)
+            if entrada.is_file() and entrada.name != ARCHIVO_ESTADO and entrada.name.endswith(('.json', '.pkl'))
+        )
+    except OSError:
+        return ()
+    return tuple(entradas)
+
+
+def _cuentas_del_pool():
+    """
+    Cuentas del directorio del pool, recargadas si cambió algún archivo
+    """
+    directorio = _ajuste.valor()['directorio']
+    firma = _firma(directorio)
+    with _lock:
+        anterior = _cuentas.get(directorio)
+        if anterior is not None and anterior[0] == firma:
+            return anterior[1]
+    cuentas = {}
+    for nombre_archivo, _ in firma:
+        ruta = os.path.join(directorio, nombre_archivo)
+        try:
+            cuenta = _cargar_cuenta(ruta)
+        except (OSError, ValueError, AttributeError, pickle.UnpicklingError, EOFError) as e:
+            print(f"⚠️ Cuenta ignorada ({nombre_archivo}): {str(e)}")
+            continue
+        if cuenta.cookies or cuenta.credenciales:
+            cuentas[cuenta.nombre] = cuenta
+    with _lock:
+        _cuentas[directorio] = (firma, cuentas)
+    return cuentas
+
+
+def _almacen():
+    return estado_compartido.abrir(os.path.join(_ajuste.valor()['directorio'], ARCHIVO_ESTADO))
+
+
+def _entrada(estado, nombre):
+    return dict(estado.get(nombre) or {
+        'usos': 0, 'ultimo_uso': 0.0, 'fichas': float(RAFAGA_USOS), 'fichas_actualizadas': time.time(),
+        'valida': None, 'fallos': 0, 'cuarentena_hasta': 0.0, 'motivo_cuarentena': None, 'huella_cuarentena': None
+    })
+
+
+def configurar(directorio=None, seleccion=None, usos_por_hora=None, enfriamiento=None, proceso=True):
+    """
+    Activa el pool con las cuentas de `directorio` para todo el proceso o,
+    con proceso=False, solo para la extracción en curso
+    """
+    seleccion = seleccion or SELECCION_DEFECTO
+    if seleccion not in SELECCIONES:
+        raise ValueError(f"Selección de sesiones desconocida: {seleccion} (usar {', '.join(SELECCIONES)})")
+    configuracion = {
+        'directorio': os.path.abspath(directorio or DIRECTORIO_POOL_DEFECTO),
+        'seleccion': seleccion,
+        'usos_por_hora': float(usos_por_hora or USOS_POR_HORA_DEFECTO),
+        'enfriamiento': float(enfriamiento if enfriamiento is not None else ENFRIAMIENTO_DEFECTO)
+    }
+    os.makedirs(configuracion['directorio'], exist_ok=True)
+    _ajuste.fijar(configuracion, proceso)
+
+
+def configurar_desde_parametros(params, proceso=False):
+    """
+    Parámetros del extractor: poolSesiones (true o directorio; false lo
+    desactiva), seleccionSesiones, usosPorHoraCuenta y enfriamientoCuenta.
+    Sin poolSesiones se mantiene la configuración del proceso
+    """
+    if 'poolSesiones' not in params:
+        return
+    valor = params['poolSesiones']
+    if not valor:
+        _ajuste.fijar(None, proceso)
+        return
+    configurar(
+        directorio=valor if isinstance(valor, str) else None,
+        seleccion=params.get('seleccionSesiones'),
+        usos_por_hora=params.get('usosPorHoraCuenta'),
+        enfriamiento=params.get('enfriamientoCuenta'),
+        proceso=proceso
+    )
+
+
+def activo():
+    return _ajuste.valor() is not None
+
+
+def _disponible(cuenta, entrada, ahora):
+    """
+    Indica si la cuenta puede usarse ahora (dentro de la transacción). Levanta la
+    cuarentena si venció o si las cookies de la cuenta cambiaron
+    """
+    configuracion = _ajuste.valor()
+    if entrada['cuarentena_hasta'] > ahora:
+        if entrada['huella_cuarentena'] is None or entrada['huella_cuarentena'] == cuenta.huella:
+            return False
+        print(f"♻️ Cookies renovadas: la cuenta {cuenta.nombre} sale de cuarentena")
+        entrada.update({'cuarentena_hasta': 0.0, 'motivo_cuarentena': None, 'huella_cuarentena': None, 'fallos': 0})
+    enfriamiento = cuenta.enfriamiento if cuenta.enfriamiento is not None else configuracion['enfriamiento']
+    if ahora - entrada['ultimo_uso'] < enfriamiento:
+        return False
+    tasa = (cuenta.usos_por_hora or configuracion['usos_por_hora']) / 3600
+    entrada['fichas'] = min(float(RAFAGA_USOS), entrada['fichas'] + (ahora - entrada['fichas_actualizadas']) * tasa)
+    entrada['fichas_actualizadas'] = ahora
+    return entrada['fichas'] >= 1
+
+
+def adquirir(excluir=()):
+    """
+    Entrega una cuenta disponible (y gasta uno de sus usos) o None si
+    ahora mismo no hay ninguna
+    """
+    if not activo():
+        return None
+    configuracion = _ajuste.valor()
+    cuentas = _cuentas_del_pool()
+    try:
+        with _almacen().transaccion() as transaccion:
+            estado = transaccion.todas()
+            ahora = time.time()
+            nombres = sorted(nombre for nombre in cuentas if nombre not in excluir)
+            if configuracion['seleccion'] == 'lru':
+                nombres.sort(key=lambda nombre: _entrada(estado, nombre)['ultimo_uso'])
+            else:
+                # Rotación: empezar por la siguiente a la última entregada
+                ultima = estado.get(CLAVE_ROTACION, {}).get('ultima')
+                posteriores = [nombre for nombre in nombres if ultima is not None and nombre > ultima]
+                nombres = posteriores + [nombre for nombre in nombres if nombre not in posteriores]
+            for nombre in nombres:
+                cuenta, entrada = cuentas[nombre], _entrada(estado, nombre)
+                if not _disponible(cuenta, entrada, ahora):
+                    continue
+                entrada['fichas'] -= 1
+                entrada['usos'] += 1
+                entrada['ultimo_uso'] = ahora
+                transaccion.escribir(nombre, entrada)
+                if configuracion['seleccion'] == 'rotacion':
+                    transaccion.escribir(CLAVE_ROTACION, {'ultima': nombre})
+                return cuenta
+    except sqlite3.Error as e:
+        print(f"⚠️ No se pudo leer el estado del pool de sesiones: {str(e)}")
+    return None
+
+
+def informar(cuenta, desenlace):
+    """
+    Registra cómo le fue a la sesión de la cuenta: OK, MURO_LOGIN,
+    CHECKPOINT o SESION_INVALIDA (los tres últimos la ponen en cuarentena)
+    """
+    if not activo() or cuenta is None:
+        return
+    try:
+        with _almacen().transaccion() as transaccion:
+            entrada = _entrada({cuenta.nombre: transaccion.leer(cuenta.nombre)}, cuenta.nombre)
+            if desenlace == OK:
+                if entrada['valida'] is not True or entrada['fallos']:
+                    entrada.update({'valida': True, 'fallos': 0})
+                    transaccion.escribir(cuenta.nombre, entrada)
+                return
+            fallos = entrada['fallos'] + 1
+            if desenlace == CHECKPOINT:
+                duracion = CUARENTENA_CHECKPOINT
+            elif desenlace == SESION_INVALIDA:
+                duracion = CUARENTENA_MAXIMA
+            else:
+                duracion = min(CUARENTENA_MAXIMA, CUARENTENA_MURO * 2 ** (fallos - 1))
+            entrada.update({
+                'valida': False,
+                'fallos': fallos,
+                'cuarentena_hasta': time.time() + duracion,
+                'motivo_cuarentena': desenlace,
+                'huella_cuarentena': cuenta.huella
+            })
+            transaccion.escribir(cuenta.nombre, entrada)
+    except sqlite3.Error as e:
+        print(f"⚠️ No se pudo guardar el estado del pool de sesiones: {str(e)}")
+        return
+    print(f"🚧 Cuenta {cuenta.nombre} en cuarentena {int(duracion)}s ({desenlace})")
+
+
+def estado():
+    """
+    Resumen por cuenta (sin cookies ni credenciales)
+    """
+    cuentas = _cuentas_del_pool()
+    try:
+        estado_pool = _almacen().todas()
+    except sqlite3.Error:
+        estado_pool = {}
+    ahora = time.time()
+    resumen = []
+    for nombre, cuenta in sorted(cuentas.items()):
+        entrada = _entrada(estado_pool, nombre)
+        resumen.append({
+            'cuenta': nombre,
+            'tipo': 'credenciales' if cuenta.credenciales else 'cookies',
+            'usos': entrada['usos'],
+            'ultimo_uso': entrada['ultimo_uso'],
+            'valida': entrada['valida'],
+            'en_cuarentena': entrada['cuarentena_hasta'] > ahora,
+            'cuarentena_restante_s': max(0, int(entrada['cuarentena_hasta'] - ahora)),
+            'motivo_cuarentena': entrada['motivo_cuarentena']
+        })
+    return resumen
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2 or sys.argv[1] != 'estado':
+        print("Uso: python pool_sesiones.py estado [DIRECTORIO]")
+        sys.exit(1)
+    configurar(sys.argv[2] if len(sys.argv) > 2 else None)
+    print(json.dumps(estado(), ensure_ascii=False, indent=2))
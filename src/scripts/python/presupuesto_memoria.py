@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Presupuesto de memoria de las extracciones.
+
+- Liberación explícita: los documentos parseados y las respuestas de una
+  extracción se anotan (con referencias débiles) y al terminarla se
+  liberan: los árboles de BeautifulSoup se descomponen (están llenos de
+  referencias circulares y, si no, esperan al recolector de ciclos) y los
+  cuerpos de las respuestas que sigan vivas se vacían.
+- Informe (parámetro informeMemoria): con tracemalloc, el pico de memoria
+  reservada de cada etapa de tiempos.py (cargar_sesion, parseo,
+  imagen_perfil...) y de la extracción completa, en KB, más el RSS del
+  proceso al terminar. El pico de tracemalloc es del proceso: con varias
+  extracciones simultáneas cada etapa ve también lo que reservan las demás.
+  tracemalloc se detiene cuando termina la última extracción abierta que
+  pidió el informe (salvo si ya estaba activo antes).
+- TechoMemoria: el modo lote (--rss-maximo-mb) baja la concurrencia de una
+  plataforma cuando el RSS del proceso supera el techo, en vez de acabar
+  matado por falta de memoria, y la recupera cuando vuelve a haber margen.
+"""
+import os
+import gc
+import sys
+import json
+import weakref
+import threading
+import tracemalloc
+import contextvars
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Por debajo de esta fracción del techo se recupera la concurrencia
+MARGEN_RECUPERACION = 0.8
+
+_liberables_actuales = contextvars.ContextVar('liberables_extraccion', default=None)
+_informe_actual = contextvars.ContextVar('informe_memoria', default=None)
+
+# Etapas abiertas (de todos los hilos) que siguen el pico de tracemalloc
+_etapas_abiertas = set()
+_lock_pico = threading.Lock()
+# Extracciones abiertas con informe, y si tracemalloc lo arrancó este módulo
+_extracciones_con_informe = 0
+_tracemalloc_propio = False
+
+
+class _Liberables:
+    """
+    Objetos de una extracción pendientes de liberar (sin mantenerlos vivos)
+    """
+
+    def __init__(self):
+        self.referencias = []
+        self.lock = threading.Lock()
+
+    def anotar(self, objeto):
+        with self.lock:
+            self.referencias.append(weakref.ref(objeto))
+
+    def liberar(self):
+        with self.lock:
+            referencias, self.referencias = self.referencias, []
+        liberados = 0
+        for referencia in referencias:
+            objeto = referencia()
+            if objeto is None:
+                continue  # ya liberado por conteo de referencias
+            try:
+                if hasattr(objeto, 'decompose'):
+                    objeto.decompose()  # árbol de BeautifulSoup
+                elif hasattr(objeto, 'liberar'):
+                    objeto.liberar()
+                else:
+                    # requests.Response: conexión (si quedó a medio leer), cuerpo y documento parcial
+                    objeto.close()
+                    objeto.__dict__.pop('documento', None)
+                    objeto._content = b''
+                liberados += 1
+            except Exception:
+                pass
+        return liberados
+
+
+class _Etapa:
+    __slots__ = ('nombre', 'base', 'pico')
+
+    def __init__(self, nombre, base):
+        self.nombre = nombre
+        self.base = base
+        self.pico = base
+
+
+def _plegar_pico():
+    """
+    Reparte el pico de tracemalloc desde el último reinicio entre las
+    etapas abiertas y lo reinicia (con _lock_pico tomado)
+    """
+    actual, pico = tracemalloc.get_traced_memory()
+    for etapa in _etapas_abiertas:
+        if pico > etapa.pico:
+            etapa.pico = pico
+    tracemalloc.reset_peak()
+    return actual
+
+
+def _abrir(nombre):
+    with _lock_pico:
+        etapa = _Etapa(nombre, _plegar_pico())
+        _etapas_abiertas.add(etapa)
+    return etapa
+
+
+def _cerrar(etapa):
+    with _lock_pico:
+        _plegar_pico()
+        _etapas_abiertas.discard(etapa)
+    return max(0, etapa.pico - etapa.base) // 1024
+
+
+def rss_mb():
+    """
+    RSS actual del proceso en MB (en Linux); si no se puede leer, el pico
+    de getrusage o None
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            paginas = int(f.read().split()[1])
+        return round(paginas * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    return None
+
+
+def liberar_al_terminar(objeto):
+    """
+    Anota un documento, un árbol de BeautifulSoup o una respuesta para
+    liberarlo al terminar la extracción en curso. Devuelve el mismo objeto
+    """
+    liberables = _liberables_actuales.get()
+    if liberables is not None:
+        liberables.anotar(objeto)
+    return objeto
+
+
+def _empezar_seguimiento():
+    global _extracciones_con_informe, _tracemalloc_propio
+    with _lock_pico:
+        if _extracciones_con_informe == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_propio = True
+        _extracciones_con_informe += 1
+
+
+def _terminar_seguimiento():
+    # tracemalloc ralentiza todas las reservas: se para al cerrar la última extracción con informe
+    global _extracciones_con_informe, _tracemalloc_propio
+    with _lock_pico:
+        _extracciones_con_informe -= 1
+        if _extracciones_con_informe == 0 and _tracemalloc_propio:
+            tracemalloc.stop()
+            _tracemalloc_propio = False
+            _etapas_abiertas.clear()
+
+
+def abrir_extraccion(parametros):
+    """
+    Prepara la liberación (y, con informeMemoria, el informe) de una
+    extracción. Devuelve el estado que recibe cerrar_extraccion
+    """
+    try:
+        informe = bool(json.loads(parametros).get('informeMemoria'))
+    except (TypeError, ValueError, AttributeError):
+        informe = False
+    if informe:
+        _empezar_seguimiento()
+    estado = {
+        'liberables': _liberables_actuales.set(_Liberables()),
+        'informe': _informe_actual.set({'etapas': {}} if informe else None)
+    }
+    if informe:
+        estado['extraccion'] = _abrir('extraccion')
+    return estado
+
+
+def cerrar_extraccion(estado):
+    """
+    Libera los objetos anotados de la extracción y devuelve su informe de
+    memoria (o None si no se pidió)
+    """
+    informe = _informe_actual.get()
+    liberados = _liberables_actuales.get().liberar()
+    _liberables_actuales.reset(estado['liberables'])
+    _informe_actual.reset(estado['informe'])
+    if informe is None:
+        return None
+    pico_kb = _cerrar(estado['extraccion'])
+    _terminar_seguimiento()
+    return {
+        'pico_kb': pico_kb,
+        'etapas_pico_kb': informe['etapas'],
+        'objetos_liberados': liberados,
+        'rss_mb': rss_mb()
+    }
+
+
+def abrir_etapa(nombre):
+    """
+    Empieza a seguir el pico de memoria de una etapa (None si no hay informe)
+    """
+    if _informe_actual.get() is None or not tracemalloc.is_tracing():
+        return None
+    return _abrir(nombre)
+
+
+def cerrar_etapa(etapa):
+    if etapa is None:
+        return
+    pico_kb = _cerrar(etapa)
+    informe = _informe_actual.get()
+    if informe is not None:
+        etapas = informe['etapas']
+        etapas[etapa.nombre] = max(etapas.get(etapa.nombre, 0), pico_kb)
+
+
+class TechoMemoria:
+    """
+    Decide la concurrencia de una plataforma según el RSS del proceso
+    """
+
+    def __init__(self, rss_maximo_mb, margen=MARGEN_RECUPERACION):
+        self.rss_maximo = float(rss_maximo_mb)
+        self.margen = margen
+
+    def ajustar(self, actual, maxima):
+        """
+        Nueva concurrencia (entre 1 y `maxima`) tras terminar una extracción
+        """
+        rss = rss_mb()
+        if rss is None:
+            return actual
+        if rss > self.rss_maximo and actual > 1:
+            gc.collect()
+            rss = rss_mb()
+            if rss > self.rss_maximo:
+                return actual - 1
+        if rss < self.rss_maximo * self.margen and actual < maxima:
+            return actual + 1
+        return actual
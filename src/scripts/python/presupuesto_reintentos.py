@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Presupuesto global de reintentos con espera exponencial y jitter.
+
+Los fallos transitorios de red (conexión rechazada o cortada, 502/503/504)
+de las peticiones idempotentes (GET, HEAD; un POST como el login nunca se
+repite, y un error TLS no se arregla reintentando) se reintentan, pero
+solo mientras quede saldo: cada petición aporta
+PROPORCION_REINTENTOS y cada reintento gasta uno. Así, cuando un host cae
+del todo, los reintentos no multiplican el tráfico ni el tiempo de cada
+objetivo; como mucho añaden esa proporción. La espera entre intentos es
+aleatoria entre 0 y ESPERA_BASE * 2^intento ("full jitter"), para que los
+hilos de un lote no reintenten todos a la vez.
+
+El saldo es del proceso; los máximos y la proporción pueden cambiarse para
+una extracción con sus parámetros (ver ajustes_extraccion.py).
+"""
+import random
+import threading
+
+from ajustes_extraccion import Ajuste
+
+REINTENTOS_MAXIMOS_DEFECTO = 2
+# Reintentos que aporta cada petición al saldo
+PROPORCION_REINTENTOS = 0.1
+SALDO_INICIAL = 10.0
+SALDO_MAXIMO = 100.0
+ESPERA_BASE = 0.5
+ESPERA_MAXIMA = 8.0
+
+ESTADOS_TRANSITORIOS = (502, 503, 504)
+METODOS_REINTENTABLES = ('GET', 'HEAD')
+
+_lock = threading.Lock()
+_ajuste = Ajuste('presupuesto_reintentos', {'maximos': REINTENTOS_MAXIMOS_DEFECTO, 'proporcion': PROPORCION_REINTENTOS})
+_saldo = SALDO_INICIAL
+
+
+def configurar(maximos=None, proporcion=None, proceso=True):
+    """
+    Cambia los reintentos máximos por petición y la proporción que aporta
+    cada petición al saldo, para todo el proceso o, con proceso=False,
+    solo para la extracción en curso
+    """
+    configuracion = dict(_ajuste.valor())
+    if maximos is not None:
+        configuracion['maximos'] = max(0, int(maximos))
+    if proporcion is not None:
+        configuracion['proporcion'] = max(0.0, float(proporcion))
+    _ajuste.fijar(configuracion, proceso)
+
+
+def configurar_desde_parametros(params, proceso=False):
+    """
+    Parámetros del extractor: reintentosMaximos y proporcionReintentos
+    """
+    if params.get('reintentosMaximos') is not None or params.get('proporcionReintentos') is not None:
+        configurar(params.get('reintentosMaximos'), params.get('proporcionReintentos'), proceso)
+
+
+def reintentos_maximos():
+    return _ajuste.valor()['maximos']
+
+
+def registrar_peticion():
+    global _saldo
+    with _lock:
+        _saldo = min(SALDO_MAXIMO, _saldo + _ajuste.valor()['proporcion'])
+
+
+def consumir():
+    """
+    Gasta un reintento del saldo global; False si no queda
+    """
+    global _saldo
+    with _lock:
+        if _saldo < 1:
+            return False
+        _saldo -= 1
+        return True
+
+
+def espera(intento):
+    """
+    Segundos a esperar antes del reintento número `intento` (desde 0)
+    """
+    return random.uniform(0, min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** intento))
+
+
+def saldo():
+    with _lock:
+        return _saldo
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Capa de red compartida por los extractores de Facebook e Instagram.
+
+Todas las peticiones HTTP de ambos scripts pasan por `solicitar`/`obtener`,
+que aplican un límite de conexiones simultáneas por host y respetan la
+cancelación de la extracción en curso (y, si está activo, el gobernador de
+tasa compartido de gobernador_tasa.py); los fallos transitorios se
+reintentan dentro del presupuesto de presupuesto_reintentos.py y, si se
+pidió, los intercambios se graban o se reproducen con grabacion_http.py
+(ejecuciones deterministas sin red). Sobre esa
+base, `MotorFetchAsync` permite mantener cientos de extracciones en vuelo
+desde asyncio, con timeout y cancelación por petición y por objetivo.
+
+Las sesiones se crean con `nueva_sesion`: cada una tiene sus propios
+headers y cookies, pero todas las de un mismo perfil de headers comparten
+un adaptador HTTP con pools keep-alive por host, así un lote paga el DNS y
+el handshake TLS una vez por host y no una vez por petición.
+"""
+import time
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import cache_http
+import gobernador_tasa
+import grabacion_http
+import presupuesto_memoria
+import presupuesto_reintentos
+import tiempos
+from ajustes_extraccion import Ajuste
+
+# Conexiones simultáneas permitidas por host (www.facebook.com, i.instagram.com, ...)
+LIMITE_POR_HOST = 16
+
+# Tamaño de los pools keep-alive: conexiones guardadas por host (None = LIMITE_POR_HOST)
+# y hosts distintos con pool propio dentro de cada perfil de headers
+CONEXIONES_POR_HOST = None
+HOSTS_POR_PERFIL = 10
+
+# Servidor que sustituye a Facebook e Instagram (benchmarks sin red): las
+# URLs de estos dominios se reescriben como <url base>/<host>/<ruta>
+_url_base = Ajuste('url_base')
+DOMINIOS_SUSTITUIBLES = ('facebook.com', 'fbcdn.net', 'instagram.com', 'cdninstagram.com')
+
+_semaforos_host = {}
+_lock_semaforos = threading.Lock()
+
+_adaptadores = {}
+_lock_adaptadores = threading.Lock()
+
+# Eventos de cancelación que aplican al hilo actual (la extracción y, si
+# corre dentro de una carrera de estrategias, la estrategia). Se propagan a
+# los hilos de trabajo copiando el contexto.
+_cancelacion = contextvars.ContextVar('cancelacion_extraccion', default=())
+
+
+class ExtraccionCancelada(Exception):
+    """
+    La extracción fue cancelada (timeout o cancelación desde asyncio)
+    """
+
+
+def configurar_limite_por_host(limite):
+    """
+    Cambia el límite de conexiones por host. Solo afecta a hosts que aún
+    no se han usado en este proceso
+    """
+    global LIMITE_POR_HOST
+    LIMITE_POR_HOST = max(1, int(limite))
+
+
+def configurar_pool_conexiones(conexiones_por_host=None, hosts_por_perfil=None):
+    """
+    Cambia el tamaño de los pools keep-alive. Solo afecta a perfiles que aún
+    no han creado su adaptador en este proceso
+    """
+    global CONEXIONES_POR_HOST, HOSTS_POR_PERFIL
+    if conexiones_por_host is not None:
+        CONEXIONES_POR_HOST = max(1, int(conexiones_por_host))
+    if hosts_por_perfil is not None:
+        HOSTS_POR_PERFIL = max(1, int(hosts_por_perfil))
+
+
+def configurar_url_base(url_base, proceso=True):
+    """
+    Dirige las peticiones a Facebook, Instagram y sus CDN al servidor
+    `url_base` (ej: http://127.0.0.1:8765) en todo el proceso o, con
+    proceso=False, solo en la extracción en curso. None vuelve a la red real
+    """
+    _url_base.fijar(url_base.rstrip('/') if url_base else None, proceso)
+
+
+def reescribir_url(url):
+    """
+    URL efectiva de la petición según la url base configurada
+    """
+    url_base = _url_base.valor()
+    if url_base is None:
+        return url
+    partes = urlsplit(url)
+    host = (partes.hostname or '').lower()
+    if not any(host == dominio or host.endswith('.' + dominio) for dominio in DOMINIOS_SUSTITUIBLES):
+        return url
+    return f"{url_base}/{host}{partes.path or '/'}" + (f'?{partes.query}' if partes.query else '')
+
+
+def _adaptador_perfil(perfil):
+    with _lock_adaptadores:
+        adaptador = _adaptadores.get(perfil)
+        if adaptador is None:
+            adaptador = HTTPAdapter(
+                pool_connections=HOSTS_POR_PERFIL,
+                pool_maxsize=CONEXIONES_POR_HOST or LIMITE_POR_HOST
+            )
+            _adaptadores[perfil] = adaptador
+        return adaptador
+
+
+def nueva_sesion(headers=None, perfil=None):
+    """
+    Crea una requests.Session con headers y cookies propios montada sobre el
+    adaptador compartido de su perfil (por defecto, su User-Agent). Las
+    conexiones ya abiertas a cada host se reutilizan entre sesiones.
+    No llamar a close(): cerraría los pools compartidos
+    """
+    session = requests.Session()
+    if headers:
+        session.headers.update(headers)
+    adaptador = _adaptador_perfil(perfil or session.headers.get('User-Agent', 'defecto'))
+    session.mount('https://', adaptador)
+    session.mount('http://', adaptador)
+    return session
+
+
+def _semaforo_host(host):
+    with _lock_semaforos:
+        semaforo = _semaforos_host.get(host)
+        if semaforo is None:
+            semaforo = threading.BoundedSemaphore(LIMITE_POR_HOST)
+            _semaforos_host[host] = semaforo
+        return semaforo
+
+
+def verificar_cancelacion():
+    """
+    Lanza ExtraccionCancelada si la extracción actual fue cancelada
+    """
+    if any(evento.is_set() for evento in _cancelacion.get()):
+        raise ExtraccionCancelada("Extracción cancelada")
+
+
+def con_cancelacion(evento, funcion, *args, **kwargs):
+    """
+    Ejecuta `funcion` con un evento de cancelación adicional. Sus peticiones
+    se detienen si se activa este evento o cualquiera de los heredados
+    """
+    token = _cancelacion.set(_cancelacion.get() + (evento,))
+    try:
+        return funcion(*args, **kwargs)
+    finally:
+        _cancelacion.reset(token)
+
+
+def _esperar(segundos):
+    """
+    Duerme `segundos` comprobando la cancelación por el camino
+    """
+    limite = time.monotonic() + segundos
+    while True:
+        verificar_cancelacion()
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            return
+        time.sleep(min(restante, 0.25))
+
+
+def _enviar_una_vez(session, metodo, url, **kwargs):
+    host = (urlparse(url).hostname or '').lower()
+    if gobernador_tasa.activo():
+        # La ficha se espera antes de ocupar una conexión del host
+        gobernador_tasa.esperar_turno(url, verificar_cancelacion)
+    with _semaforo_host(host):
+        verificar_cancelacion()
+        if grabacion_http.reproduciendo():
+            respuesta, segundos = grabacion_http.reproducir(session, metodo, url, kwargs)
+            _esperar(segundos)
+        else:
+            inicio = time.monotonic()
+            respuesta = session.request(metodo, reescribir_url(url), **kwargs)
+            if grabacion_http.grabando():
+                grabacion_http.grabar(session, metodo, url, kwargs, respuesta, time.monotonic() - inicio)
+    tiempos.registrar_peticion(respuesta)
+    if gobernador_tasa.activo():
+        gobernador_tasa.informar_respuesta(url, respuesta)
+    return respuesta
+
+
+def _enviar(session, metodo, url, **kwargs):
+    """
+    Envía la petición reintentando los fallos transitorios (conexión
+    rechazada o cortada, 502, 503, 504) de GET y HEAD mientras lo permita
+    el presupuesto global de reintentos. Los demás métodos se envían una vez
+    """
+    presupuesto_reintentos.registrar_peticion()
+    if metodo.upper() not in presupuesto_reintentos.METODOS_REINTENTABLES:
+        return _enviar_una_vez(session, metodo, url, **kwargs)
+    intento = 0
+    while True:
+        try:
+            respuesta = _enviar_una_vez(session, metodo, url, **kwargs)
+        except (requests.Timeout, requests.exceptions.SSLError, grabacion_http.SinGrabacion):
+            # Un timeout ya costó su espera completa, y ni un error TLS ni una grabación cambian: no se repiten
+            raise
+        except requests.ConnectionError as e:
+            if intento >= presupuesto_reintentos.reintentos_maximos() or not presupuesto_reintentos.consumir():
+                raise
+            print(f"🔁 Reintentando {url} tras error de conexión: {str(e)}")
+        else:
+            if respuesta.status_code not in presupuesto_reintentos.ESTADOS_TRANSITORIOS or \
+                    intento >= presupuesto_reintentos.reintentos_maximos() or not presupuesto_reintentos.consumir():
+                return respuesta
+            respuesta.close()
+            print(f"🔁 Reintentando {url} tras HTTP {respuesta.status_code}")
+        _esperar(presupuesto_reintentos.espera(intento))
+        intento += 1
+
+
+def solicitar(session, metodo, url, **kwargs):
+    """
+    Realiza una petición HTTP con la sesión dada respetando el límite por
+    host y la cancelación de la extracción en curso. Los GET pasan por la
+    caché HTTP en disco si está activada
+    """
+    verificar_cancelacion()
+    if metodo.upper() == 'GET' and cache_http.activa():
+        respuesta = cache_http.solicitar_con_cache(
+            session, url, lambda **opciones: _enviar(session, metodo, url, **opciones), kwargs
+        )
+        if getattr(respuesta, 'desde_cache', False):
+            tiempos.registrar_peticion(respuesta)
+    else:
+        respuesta = _enviar(session, metodo, url, **kwargs)
+    # Su cuerpo se vacía al terminar la extracción si la respuesta sigue viva
+    return presupuesto_memoria.liberar_al_terminar(respuesta)
+
+
+def obtener(session, url, **kwargs):
+    """
+    GET a través de la capa de red compartida
+    """
+    return solicitar(session, 'GET', url, **kwargs)
+
+
+class MotorFetchAsync:
+    """
+    Motor asyncio sobre la capa de red compartida.
+
+    Las peticiones (basadas en requests) se ejecutan en un pool de hilos
+    dimensionado para `max_en_vuelo`, de modo que un solo proceso mantiene
+    cientos de peticiones o extracciones simultáneas mientras el límite por
+    host evita saturar cada dominio.
+    """
+
+    def __init__(self, max_en_vuelo=200, limite_por_host=None, timeout=30):
+        if limite_por_host is not None:
+            configurar_limite_por_host(limite_por_host)
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_en_vuelo, thread_name_prefix='fetch')
+
+    async def _en_hilo(self, limite, funcion, *args, **kwargs):
+        """
+        Ejecuta `funcion` en el pool con su propio evento de cancelación.
+        Si vence `limite` (segundos) o la corrutina se cancela, el evento se
+        activa y la función se detiene en su siguiente petición de red
+        """
+        evento = threading.Event()
+        contexto = contextvars.copy_context()
+
+        loop = asyncio.get_running_loop()
+        futuro = loop.run_in_executor(
+            self.executor,
+            lambda: contexto.run(con_cancelacion, evento, funcion, *args, **kwargs)
+        )
+        try:
+            return await asyncio.wait_for(futuro, timeout=limite)
+        except BaseException:
+            evento.set()
+            raise
+
+    async def obtener(self, session, url, timeout=None, **kwargs):
+        """
+        GET asíncrono con timeout por petición (se aplica también a requests)
+        """
+        timeout = timeout or self.timeout
+        return await self._en_hilo(timeout, obtener, session, url, timeout=timeout, **kwargs)
+
+    async def ejecutar(self, funcion_extraccion, parametros, timeout=None):
+        """
+        Ejecuta una extracción completa (extraer_pagina_facebook_simple o
+        extraer_perfil_instagram_simple) sin bloquear el loop. Devuelve el
+        resultado de la extracción o un resultado de error si vence el timeout
+        """
+        try:
+            return await self._en_hilo(timeout, funcion_extraccion, parametros)
+        except asyncio.TimeoutError:
+            return {
+                'exito': False,
+                'error': f'Tiempo agotado ({timeout}s)',
+                'mensaje': f'Extracción cancelada tras {timeout}s'
+            }
+
+    def cerrar(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
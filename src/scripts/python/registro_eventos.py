@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Modo máquina: stdout solo lleva resultados y los diagnósticos van a stderr.
+
+Los extractores informan del progreso con print(). En modo máquina stdout
+se desvía a un escritor que convierte cada línea en un evento JSON con
+nivel ({"ts", "nivel", "mensaje", "plataforma", "objetivo"}) y lo escribe
+en stderr, o la descarta, según el formato:
+
+- json: un evento JSON por línea en stderr.
+- texto: las mismas líneas de siempre, pero en stderr.
+- ninguno: sin diagnósticos.
+
+El nivel se deduce del prefijo del mensaje (❌ error, ⚠️ aviso, el resto
+info) y `nivel_minimo` filtra los de menor importancia.
+
+Los scripts entran en modo máquina con `modo_maquina`, que desvía stdout
+durante el resto del proceso: también escriben en stderr los hilos de
+estrategias que siguen vivos tras la extracción (🔁 Reintentando...) y los
+atexit (estadísticas, almacén de resultados, perfiles). Los resultados se
+escriben en el stdout original que devuelve.
+
+Opciones de línea de comandos (en ambos scripts y en modo lote):
+--maquina, --registro json|texto|ninguno (implica --maquina) y
+--nivel-registro error|aviso|info.
+"""
+import sys
+import json
+import threading
+from datetime import datetime
+
+import tiempos
+
+FORMATOS_REGISTRO = ('json', 'texto', 'ninguno')
+NIVELES = ('error', 'aviso', 'info')
+
+_PREFIJOS_NIVEL = (
+    ('❌', 'error'),
+    ('⚠', 'aviso')
+)
+
+
+def nivel_de(mensaje):
+    for prefijo, nivel in _PREFIJOS_NIVEL:
+        if mensaje.startswith(prefijo):
+            return nivel
+    return 'info'
+
+
+class EscritorEventos:
+    """
+    Objeto tipo archivo que recibe los print() y emite un evento por línea
+    """
+
+    def __init__(self, destino, formato='json', nivel_minimo='info'):
+        self.destino = destino
+        self.formato = formato
+        self.umbral = NIVELES.index(nivel_minimo)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def write(self, texto):
+        # Cada hilo arma sus propias líneas: print() escribe el mensaje y el salto por separado
+        pendiente = getattr(self._local, 'pendiente', '') + texto
+        *lineas, self._local.pendiente = pendiente.split('\n')
+        for linea in lineas:
+            self._emitir(linea)
+        return len(texto)
+
+    def flush(self):
+        pendiente = getattr(self._local, 'pendiente', '')
+        if pendiente:
+            self._local.pendiente = ''
+            self._emitir(pendiente)
+
+    def _emitir(self, linea):
+        mensaje = linea.strip()
+        if not mensaje or self.formato == 'ninguno':
+            return
+        nivel = nivel_de(mensaje)
+        if NIVELES.index(nivel) > self.umbral:
+            return
+        if self.formato == 'texto':
+            salida = linea
+        else:
+            evento = {'ts': datetime.now().isoformat(), 'nivel': nivel, 'mensaje': mensaje}
+            medicion = tiempos.actual()
+            if medicion is not None:
+                evento['plataforma'] = medicion.plataforma
+                evento['objetivo'] = medicion.objetivo
+            salida = json.dumps(evento, ensure_ascii=False)
+        with self._lock:
+            self.destino.write(salida + '\n')
+            self.destino.flush()
+
+
+def modo_maquina(formato='texto', nivel_minimo='info'):
+    """
+    Desvía stdout a stderr con el formato dado hasta que termine el
+    proceso. Devuelve el stdout original, reservado para los resultados
+    """
+    salida = sys.stdout
+    sys.stdout = EscritorEventos(sys.stderr, formato or 'texto', nivel_minimo or 'info')
+    return salida
+
+
+def separar_opciones(argumentos):
+    """
+    Separa --maquina, --registro y --nivel-registro del resto de argumentos.
+    Devuelve (formato o None si no es modo máquina, nivel_minimo, resto)
+    """
+    formato, nivel, resto = None, 'info', []
+    iterador = iter(argumentos)
+    for argumento in iterador:
+        nombre, igual, valor = argumento.partition('=')
+        if nombre == '--maquina':
+            formato = formato or 'json'
+        elif nombre in ('--registro', '--nivel-registro'):
+            valor = valor if igual else next(iterador, '')
+            opciones = FORMATOS_REGISTRO if nombre == '--registro' else NIVELES
+            if valor not in opciones:
+                raise ValueError(f"{nombre} debe ser uno de: {', '.join(opciones)}")
+            if nombre == '--registro':
+                formato = valor
+            else:
+                nivel = valor
+        else:
+            resto.append(argumento)
+    return formato, nivel, resto
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Modo servidor (--serve) compartido por los scripts de scraping.
+
+El proceso queda residente y atiende una petición JSON por línea en stdin,
+escribiendo un resultado JSON por línea en stdout. Así los imports y el
+estado del módulo se reutilizan entre miles de objetivos en lugar de pagar
+el arranque del intérprete en cada URL.
+"""
+import sys
+import json
+
+from registro_eventos import modo_maquina
+
+
+def servir(funcion_extraccion, entrada=None, salida=None, formato='texto', nivel_minimo='info'):
+    """
+    Atiende peticiones JSON-lines hasta fin de archivo.
+
+    Cada petición tiene la misma forma que los parámetros de la función de
+    extracción más un campo opcional 'id', que se devuelve en el resultado.
+    Los mensajes de progreso del proceso se desvían a stderr (como texto,
+    como eventos JSON o a ninguna parte según `formato`) para que stdout
+    solo contenga resultados, también entre peticiones.
+    """
+    entrada = entrada or sys.stdin
+    salida = salida or modo_maquina(formato, nivel_minimo)
+    atendidas = 0
+
+    for linea in entrada:
+        linea = linea.strip()
+        if not linea:
+            continue
+
+        id_peticion = None
+        try:
+            peticion = json.loads(linea)
+            if not isinstance(peticion, dict):
+                raise ValueError("La petición debe ser un objeto JSON")
+            id_peticion = peticion.pop('id', None)
+
+            resultado = funcion_extraccion(json.dumps(peticion))
+        except Exception as e:
+            resultado = {
+                'exito': False,
+                'error': str(e),
+                'mensaje': f'Petición inválida: {str(e)}'
+            }
+
+        salida.write(json.dumps({'id': id_peticion, **resultado}, ensure_ascii=False) + '\n')
+        salida.flush()
+        atendidas += 1
+
+    return atendidas
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Servidor HTTP local que sustituye a Facebook e Instagram en los benchmarks.
+
+Los extractores se apuntan a él con el parámetro urlBase: red_scraping
+reescribe https://<host>/<ruta> como <urlBase>/<host>/<ruta>, y este
+servidor responde según el host y el objetivo. El caso de cada objetivo se
+toma del prefijo de su nombre (ej: 'muro-003'):
+
+- Facebook: existe (página con metadatos Open Graph), muro (redirige al
+  login), nodisponible ("This content isn't available"), mbasic (muro en
+  www y m., página accesible en mbasic.facebook.com).
+- Instagram: shareddata (window._sharedData), ldjson (perfil ld+json),
+  muro (redirige a accounts/login), nodisponible ("Sorry, this page isn't
+  available"), más la API web_profile_info.
+- Imágenes de fbcdn.net y cdninstagram.com (bytes JPEG deterministas).
+
+Las páginas son plantillas sintéticas con la forma de las reales; con
+`directorio_fixtures` se pueden sustituir por páginas guardadas
+(<plataforma>_<caso>.html, con {objetivo} y {base} como marcadores).
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, quote
+
+CASOS_FACEBOOK = ('existe', 'muro', 'nodisponible', 'mbasic')
+CASOS_INSTAGRAM = ('shareddata', 'ldjson', 'muro', 'nodisponible')
+
+# Veredicto de existencia que debe dar el extractor en cada caso
+EXISTENCIA_ESPERADA = {
+    'facebook': {'existe': True, 'muro': True, 'nodisponible': False, 'mbasic': True},
+    'instagram': {'shareddata': True, 'ldjson': True, 'muro': True, 'nodisponible': False}
+}
+
+TAMANIO_IMAGEN = 24 * 1024
+
+_PARRAFOS = ''.join(
+    f'<div class="x1n2onr6"><span dir="auto">Publicación {i} de {{objetivo}}: texto de ejemplo con '
+    f'contenido suficiente para parecer una página real con actividad reciente.</span></div>'
+    for i in range(40)
+)
+
+PLANTILLAS = {
+    ('facebook', 'existe'): (
+        '<!DOCTYPE html><html lang="es"><head><meta charset="utf-8"><title>{objetivo} | Facebook</title>'
+        '<meta name="description" content="{objetivo}. 12.345 Me gusta · 678 personas están hablando de esto.">'
+        '<meta property="og:title" content="{objetivo}"><meta property="og:description" content="Página de {objetivo}">'
+        '<meta property="og:image" content="https://scontent.xx.fbcdn.net/v/t39/{objetivo}.jpg">'
+        + ''.join(f'<script type="application/json" data-sjs>{{{{"require":[["m{i}",{{{{"d":"{"x" * 3000}"}}}}]]}}}}</script>'
+                  for i in range(30)) +
+        '</head><body>' + _PARRAFOS + '</body></html>'
+    ),
+    ('facebook', 'mbasic'): (
+        '<html><head><title>{objetivo}</title>'
+        '<meta property="og:image" content="https://scontent.xx.fbcdn.net/v/t39/{objetivo}.jpg"></head>'
+        '<body><div id="root">' + _PARRAFOS + '</div></body></html>'
+    ),
+    ('facebook', 'nodisponible'): (
+        '<html><head><title>Facebook</title></head><body><div>'
+        '<h2>This content isn\'t available right now</h2>'
+        '<p>When this happens, it\'s usually because the owner only shared it with a small group of people, '
+        'changed who can see it or it\'s been deleted.</p>' + 'x' * 600 + '</div></body></html>'
+    ),
+    ('facebook', 'login'): (
+        '<html><head><title>Log in to Facebook</title></head><body>'
+        '<form method="post" action="/login/"><input name="email"><input name="pass" type="password">'
+        '<button name="login">Log In</button></form></body></html>'
+    ),
+    ('facebook', 'plugin'): (
+        '<html><head><title>{objetivo}</title></head><body><div class="pluginPage">' + _PARRAFOS + '</div></body></html>'
+    ),
+    ('instagram', 'shareddata'): (
+        '<!DOCTYPE html><html><head><title>{objetivo} (@{objetivo}) • Instagram photos and videos</title>'
+        '<meta name="description" content="1,234 Followers, 56 Following, 78 Posts - See Instagram photos and videos from {objetivo}">'
+        '<meta property="og:image" content="https://scontent.cdninstagram.com/v/t51/{objetivo}.jpg">'
+        + ''.join(f'<script>requireLazy(["m{i}"],function(){{{{{"z" * 2000}}}}});</script>' for i in range(20)) +
+        '</head><body>' + _PARRAFOS +
+        '<script type="text/javascript">window._sharedData = {{"entry_data": {{"ProfilePage": [{{"graphql": {{"user": '
+        '{{"username": "{objetivo}", "biography": "Biografía de {objetivo}", "edge_followed_by": {{"count": 1234}}, '
+        '"edge_follow": {{"count": 56}}, "edge_owner_to_timeline_media": {{"count": 78}}, '
+        '"profile_pic_url_hd": "https://scontent.cdninstagram.com/v/t51/{objetivo}.jpg"}}}}}}]}}}};</script>'
+        '</body></html>'
+    ),
+    ('instagram', 'ldjson'): (
+        '<!DOCTYPE html><html><head><title>{objetivo} (@{objetivo}) • Instagram photos and videos</title>'
+        '<meta name="description" content="987 Followers, 65 Following, 43 Posts - See Instagram photos and videos from {objetivo}">'
+        '<meta property="og:image" content="https://scontent.cdninstagram.com/v/t51/{objetivo}.jpg">'
+        '<script type="application/ld+json">{{"@type": "ProfilePage", "mainEntity": '
+        '{{"description": "Bio de {objetivo}", "url": "https://ejemplo.com/{objetivo}"}}}}</script>'
+        '</head><body>' + _PARRAFOS + '</body></html>'
+    ),
+    ('instagram', 'nodisponible'): (
+        '<html><head><title>Instagram</title></head><body><div>'
+        '<h2>Sorry, this page isn\'t available.</h2>'
+        '<p>The link you followed may be broken, or the page may have been removed.</p></div></body></html>'
+    ),
+    ('instagram', 'login'): (
+        '<html><head><title>Login • Instagram</title></head><body>'
+        '<form><input name="username"><input name="password" type="password"><button>Log in</button></form>'
+        '<p>Don\'t have an account? Sign up</p></body></html>'
+    ),
+    ('instagram', 'embed'): (
+        '<html><head><title>Instagram</title></head><body><div class="Embed">Instagram</div></body></html>'
+    )
+}
+
+
+def caso_de(objetivo):
+    return (objetivo or '').split('-', 1)[0].lower()
+
+
+def imagen_sintetica(semilla):
+    """
+    Bytes JPEG deterministas (cabecera válida + relleno derivado de la semilla)
+    """
+    bloque = hashlib.sha256(semilla.encode('utf-8')).digest()
+    relleno = (bloque * (TAMANIO_IMAGEN // len(bloque) + 1))[:TAMANIO_IMAGEN - 6]
+    return b'\xff\xd8\xff\xe0' + relleno + b'\xff\xd9'
+
+
+class ServidorSustituto:
+    """
+    Servidor en un hilo propio. `latencia_ms` se añade a cada respuesta
+    """
+
+    def __init__(self, latencia_ms=0, directorio_fixtures=None, puerto=0):
+        self.latencia = max(0, latencia_ms) / 1000
+        self.plantillas = dict(PLANTILLAS)
+        if directorio_fixtures:
+            for (plataforma, caso) in list(self.plantillas):
+                ruta = os.path.join(directorio_fixtures, f'{plataforma}_{caso}.html')
+                if os.path.exists(ruta):
+                    with open(ruta, 'r', encoding='utf-8') as f:
+                        self.plantillas[(plataforma, caso)] = f.read()
+        self.peticiones = 0
+        self._lock = threading.Lock()
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', puerto), self._manejador())
+        self.servidor.daemon_threads = True
+        self.url_base = f'http://127.0.0.1:{self.servidor.server_port}'
+        self._hilo = None
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True, name='servidor-sustituto')
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *excepcion):
+        self.detener()
+
+    def pagina(self, plataforma, caso, objetivo):
+        plantilla = self.plantillas[(plataforma, caso)]
+        return plantilla.replace('{{', '\0').replace('}}', '\1') \
+            .replace('{objetivo}', objetivo).replace('{base}', self.url_base) \
+            .replace('\0', '{').replace('\1', '}').encode('utf-8')
+
+    def responder(self, metodo, host, ruta, consulta):
+        """
+        (estado, cabeceras, cuerpo) para una petición ya separada en host y ruta
+        """
+        partes = [p for p in ruta.split('/') if p]
+        html = {'Content-Type': 'text/html; charset=utf-8'}
+
+        if host.endswith('fbcdn.net') or host.endswith('cdninstagram.com'):
+            return 200, {'Content-Type': 'image/jpeg'}, imagen_sintetica(host + ruta)
+
+        if host.endswith('facebook.com'):
+            login = f'{self.url_base}/www.facebook.com/login/'
+            if not partes or partes[0] in ('login', 'login.php'):
+                return 200, html, self.pagina('facebook', 'login', '')
+            if partes[0] == 'plugins':
+                objetivo = urlsplit(consulta.get('href', [''])[0]).path.strip('/')
+                if caso_de(objetivo) in ('existe', 'mbasic'):
+                    return 200, html, self.pagina('facebook', 'plugin', objetivo)
+                return 302, {'Location': login}, b''
+            objetivo = partes[0]
+            caso = caso_de(objetivo)
+            if caso == 'existe' or (caso == 'mbasic' and host.startswith('mbasic.')):
+                return 200, html, self.pagina('facebook', 'existe' if caso == 'existe' else 'mbasic', objetivo)
+            if caso in ('muro', 'mbasic'):
+                return 302, {'Location': f'{login}?next={quote(ruta)}'}, b''
+            if caso == 'nodisponible':
+                return 200, html, self.pagina('facebook', 'nodisponible', objetivo)
+            return 404, html, b'<html><body>Page not found</body></html>'
+
+        if host.endswith('instagram.com'):
+            json_ = {'Content-Type': 'application/json'}
+            if partes[:2] == ['accounts', 'login']:
+                return 200, html, self.pagina('instagram', 'login', '')
+            if partes[:4] == ['api', 'v1', 'users', 'web_profile_info']:
+                objetivo = consulta.get('username', [''])[0]
+                if caso_de(objetivo) in ('shareddata', 'ldjson'):
+                    usuario = {
+                        'username': objetivo, 'full_name': objetivo, 'biography': f'Biografía de {objetivo}',
+                        'edge_followed_by': {'count': 1234}, 'edge_follow': {'count': 56},
+                        'edge_owner_to_timeline_media': {'count': 78},
+                        'profile_pic_url_hd': f'https://scontent.cdninstagram.com/v/t51/{objetivo}.jpg'
+                    }
+                    return 200, json_, json.dumps({'data': {'user': usuario}}).encode('utf-8')
+                return 404, json_, b'{"status": "fail"}'
+            if partes and partes[0] == 'p':
+                return 200, html, self.pagina('instagram', 'embed', '')
+            objetivo = partes[0] if partes else ''
+            caso = caso_de(objetivo)
+            if caso in ('shareddata', 'ldjson', 'nodisponible'):
+                return 200, html, self.pagina('instagram', caso, objetivo)
+            if caso == 'muro':
+                return 302, {'Location': f'{self.url_base}/www.instagram.com/accounts/login/?next=/{objetivo}/'}, b''
+            return 404, html, b'<html><body>Page not found</body></html>'
+
+        return 404, html, b''
+
+    def _manejador(self):
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _atender(self):
+                longitud = int(self.headers.get('Content-Length') or 0)
+                if longitud:
+                    self.rfile.read(longitud)
+                partes = urlsplit(self.path)
+                host, _, ruta = partes.path.lstrip('/').partition('/')
+                estado, cabeceras, cuerpo = servidor.responder(
+                    self.command, host.lower(), '/' + ruta, parse_qs(partes.query)
+                )
+                with servidor._lock:
+                    servidor.peticiones += 1
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+                self.send_response(estado)
+                for nombre, valor in cabeceras.items():
+                    self.send_header(nombre, valor)
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            do_GET = _atender
+            do_POST = _atender
+
+            def log_message(self, *args):
+                pass
+
+        return Manejador
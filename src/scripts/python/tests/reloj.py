@@ -0,0 +1,21 @@
+"""
+Reloj falso para los módulos que usan time.time / time.monotonic
+"""
+
+
+class Reloj:
+
+    def __init__(self, ahora=1000.0):
+        self.ahora = ahora
+
+    def time(self):
+        return self.ahora
+
+    def monotonic(self):
+        return self.ahora
+
+    def sleep(self, segundos):
+        self.ahora += segundos
+
+    def avanzar(self, segundos):
+        self.ahora += segundos
@@ -0,0 +1,116 @@
+import os
+
+import pytest
+
+import almacen_imagenes
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'p' * 200
+JPG = b'\xff\xd8\xff\xe0' + b'j' * 200
+
+
+class Respuesta:
+    def __init__(self, cuerpo, estado=200):
+        self.cuerpo = cuerpo
+        self.status_code = estado
+        self.cerrada = False
+
+    def iter_content(self, tamanio):
+        for inicio in range(0, len(self.cuerpo), tamanio):
+            yield self.cuerpo[inicio:inicio + tamanio]
+
+    def close(self):
+        self.cerrada = True
+
+
+class Red:
+    """
+    `obtener` falso: sirve un cuerpo por URL y cuenta las descargas
+    """
+
+    def __init__(self, cuerpos):
+        self.cuerpos = cuerpos
+        self.descargas = []
+        self.respuestas = []
+
+    def __call__(self, session, url, **kwargs):
+        self.descargas.append(url)
+        cuerpo = self.cuerpos[url]
+        respuesta = Respuesta(*cuerpo) if isinstance(cuerpo, tuple) else Respuesta(cuerpo)
+        self.respuestas.append(respuesta)
+        return respuesta
+
+
+@pytest.fixture
+def red(monkeypatch):
+    def instalar(cuerpos):
+        falsa = Red(cuerpos)
+        monkeypatch.setattr(almacen_imagenes, 'obtener', falsa)
+        return falsa
+    return instalar
+
+
+def archivos(directorio):
+    almacen = almacen_imagenes._directorio_almacen(directorio)
+    return sorted(
+        nombre for _, _, nombres in os.walk(almacen) for nombre in nombres
+        if not nombre.startswith('indice.sqlite3')
+    )
+
+
+def test_guarda_por_hash_y_detecta_el_formato(tmp_path, red):
+    red({'https://cdn/a': PNG})
+    resultado = almacen_imagenes.descargar_imagen(object(), 'https://cdn/a', str(tmp_path), 'facebook', 'Pagina')
+    assert resultado['exito'] and resultado['nueva'] and resultado['tamanio'] == len(PNG)
+    assert resultado['ruta'].endswith(os.path.join(resultado['hash'][:2], resultado['hash'] + '.png'))
+    with open(resultado['ruta'], 'rb') as f:
+        assert f.read() == PNG
+    assert almacen_imagenes.imagen_de(str(tmp_path), 'facebook', 'PAGINA')['url'] == 'https://cdn/a'
+
+
+def test_misma_url_no_vuelve_a_descargar(tmp_path, red):
+    falsa = red({'https://cdn/a': PNG})
+    almacen_imagenes.descargar_imagen(object(), 'https://cdn/a', str(tmp_path), 'facebook', 'pagina')
+    repetida = almacen_imagenes.descargar_imagen(object(), 'https://cdn/a', str(tmp_path), 'facebook', 'pagina')
+    assert repetida['exito'] and not repetida['nueva']
+    assert falsa.descargas == ['https://cdn/a']
+
+
+def test_contenido_repetido_se_guarda_una_vez(tmp_path, red):
+    red({'https://cdn/a': JPG, 'https://cdn/b': JPG})
+    primera = almacen_imagenes.descargar_imagen(object(), 'https://cdn/a', str(tmp_path), 'instagram', 'uno')
+    segunda = almacen_imagenes.descargar_imagen(object(), 'https://cdn/b', str(tmp_path), 'instagram', 'dos')
+    assert primera['nueva'] and not segunda['nueva']
+    assert primera['ruta'] == segunda['ruta']
+    assert archivos(str(tmp_path)) == [os.path.basename(primera['ruta'])]
+    assert almacen_imagenes.imagen_de(str(tmp_path), 'instagram', 'dos')['hash'] == primera['hash']
+
+
+def test_imagen_grande_pasa_por_un_temporal(tmp_path, red, monkeypatch):
+    monkeypatch.setattr(almacen_imagenes, 'UMBRAL_MEMORIA', 100)
+    monkeypatch.setattr(almacen_imagenes, 'TAMANIO_BLOQUE', 64)
+    red({'https://cdn/a': PNG})
+    resultado = almacen_imagenes.descargar_imagen(object(), 'https://cdn/a', str(tmp_path), 'facebook', 'pagina')
+    with open(resultado['ruta'], 'rb') as f:
+        assert f.read() == PNG
+    assert archivos(str(tmp_path)) == [os.path.basename(resultado['ruta'])]
+
+
+def test_limites_de_tamanio_no_dejan_archivos(tmp_path, red, monkeypatch):
+    monkeypatch.setattr(almacen_imagenes, 'UMBRAL_MEMORIA', 100)
+    monkeypatch.setattr(almacen_imagenes, 'TAMANIO_BLOQUE', 64)
+    falsa = red({'https://cdn/a': PNG})
+    grande = almacen_imagenes.descargar_imagen(object(), 'https://cdn/a', str(tmp_path), 'facebook', 'pagina',
+                                               maximo_bytes=150)
+    pequena = almacen_imagenes.descargar_imagen(object(), 'https://cdn/a', str(tmp_path), 'facebook', 'pagina',
+                                                minimo_bytes=1000)
+    assert not grande['exito'] and 'máximo' in grande['error']
+    assert not pequena['exito'] and 'pequeña' in pequena['error']
+    assert archivos(str(tmp_path)) == []
+    assert all(respuesta.cerrada for respuesta in falsa.respuestas)
+    assert almacen_imagenes.imagen_de(str(tmp_path), 'facebook', 'pagina') is None
+
+
+def test_error_http(tmp_path, red):
+    red({'https://cdn/a': (b'', 404)})
+    resultado = almacen_imagenes.descargar_imagen(object(), 'https://cdn/a', str(tmp_path), 'facebook', 'pagina')
+    assert resultado == {'exito': False, 'error': 'HTTP 404'}
@@ -0,0 +1,71 @@
+import os
+import json
+
+import pytest
+
+import almacen_resultados
+
+
+@pytest.fixture
+def almacen(tmp_path, monkeypatch):
+    monkeypatch.setattr(almacen_resultados, '_pendientes', [])
+    ruta = str(tmp_path / 'resultados.sqlite3')
+    almacen_resultados.configurar(ruta, 'ejecucion-1')
+    yield ruta
+    almacen_resultados.vaciar()
+    almacen_resultados._ajuste.fijar(None, proceso=True)
+
+
+def test_sin_almacen_se_escribe_json(tmp_path):
+    almacen_resultados._ajuste.fijar(None, proceso=True)
+    ruta = almacen_resultados.guardar_datos(str(tmp_path), 'pagina.json', 'facebook', 'pagina', {'pagina_existe': True})
+    assert ruta == os.path.join(str(tmp_path), 'pagina.json')
+    with open(ruta, encoding='utf-8') as f:
+        assert json.load(f) == {'pagina_existe': True}
+
+
+def test_los_resultados_se_escriben_por_lotes(almacen, monkeypatch):
+    monkeypatch.setattr(almacen_resultados, 'TAMANIO_LOTE', 3)
+    monkeypatch.setattr(almacen_resultados, '_ultimo_vaciado', float('inf'))  # sin vaciado por tiempo
+    for i in range(2):
+        assert almacen_resultados.guardar_datos('no-usado', 'x.json', 'facebook', f'pagina{i}', {}) == almacen
+    assert not os.path.exists(almacen)
+    almacen_resultados.guardar_datos('no-usado', 'x.json', 'facebook', 'pagina2', {})
+    assert almacen_resultados._pendientes == []
+    assert len(almacen_resultados.resultados_de_ejecucion(almacen, 'ejecucion-1')) == 3
+
+
+def test_ultimo_veredicto_por_objetivo(almacen):
+    almacen_resultados.registrar('facebook', 'Pagina', {'pagina_existe': True, 'metodo': 'a'})
+    almacen_resultados.registrar('facebook', 'pagina', {'pagina_existe': False, 'metodo': 'b'})
+    almacen_resultados.registrar('instagram', 'usuario', {'usuario_existe': None})
+    almacen_resultados.vaciar()
+
+    ultimos = almacen_resultados.ultimo_veredicto_por_objetivo(almacen)
+    assert [(f['plataforma'], f['objetivo'], f['existe']) for f in ultimos] == [
+        ('facebook', 'pagina', False), ('instagram', 'usuario', None)
+    ]
+    assert ultimos[0]['metodo'] == 'b' and ultimos[0]['datos']['pagina_existe'] is False
+    solo_instagram = almacen_resultados.ultimo_veredicto_por_objetivo(almacen, 'instagram')
+    assert [f['objetivo'] for f in solo_instagram] == ['usuario']
+
+
+def test_configuracion_desde_parametros(tmp_path):
+    almacen_resultados._ajuste.fijar(None, proceso=True)
+    almacen_resultados.configurar_desde_parametros({}, str(tmp_path), proceso=True)
+    assert not almacen_resultados.activo()
+    almacen_resultados.configurar_desde_parametros(
+        {'almacenResultados': True, 'idEjecucion': 'e'}, str(tmp_path), proceso=True
+    )
+    assert almacen_resultados.ruta_actual() == os.path.join(str(tmp_path), 'resultados.sqlite3')
+    almacen_resultados.configurar_desde_parametros({'almacenResultados': False}, str(tmp_path), proceso=True)
+    assert not almacen_resultados.activo()
+
+
+def test_consulta_por_linea_de_comandos(almacen, capsys):
+    almacen_resultados.registrar('facebook', 'pagina', {'pagina_existe': True})
+    almacen_resultados.vaciar()
+    assert almacen_resultados.main([almacen, 'ejecucion', 'ejecucion-1']) == 0
+    fila = json.loads(capsys.readouterr().out)
+    assert fila['objetivo'] == 'pagina' and fila['existe'] is True
+    assert almacen_resultados.main([almacen + '.no', 'ultimos']) == 1
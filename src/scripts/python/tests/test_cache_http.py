@@ -0,0 +1,101 @@
+import io
+
+import pytest
+import requests
+
+import cache_http
+
+
+def respuesta(estado=200, cuerpo=b'<html>pagina</html>', url='https://www.facebook.com/x', cabeceras=None):
+    resultado = requests.Response()
+    resultado.status_code = estado
+    resultado._content = cuerpo
+    resultado.raw = io.BytesIO()
+    resultado.url = url
+    resultado.headers = requests.structures.CaseInsensitiveDict(cabeceras or {})
+    return resultado
+
+
+class Red:
+    """
+    `enviar` falso: devuelve las respuestas dadas y guarda las cabeceras enviadas
+    """
+
+    def __init__(self, *respuestas):
+        self.respuestas = list(respuestas)
+        self.enviadas = []
+
+    def __call__(self, **kwargs):
+        self.enviadas.append(kwargs)
+        return self.respuestas.pop(0)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache_http.configurar(str(tmp_path / 'cache'), frescura_por_host={'fbcdn.net': 3600})
+    yield cache_http
+    cache_http._ajuste.fijar(None, proceso=True)
+
+
+def test_host_fresco_se_sirve_sin_red(cache):
+    sesion = requests.Session()
+    url = 'https://scontent.fbcdn.net/imagen.jpg'
+    red = Red(respuesta(cuerpo=b'imagen', url=url))
+    assert cache.solicitar_con_cache(sesion, url, red, {}).content == b'imagen'
+    servida = cache.solicitar_con_cache(sesion, url, red, {})
+    assert servida.desde_cache and servida.content == b'imagen'
+    assert len(red.enviadas) == 1
+
+
+def test_revalidacion_con_etag(cache):
+    sesion = requests.Session()
+    url = 'https://www.facebook.com/x'
+    red = Red(respuesta(cabeceras={'ETag': '"v1"'}), respuesta(304))
+    cache.solicitar_con_cache(sesion, url, red, {})
+    servida = cache.solicitar_con_cache(sesion, url, red, {})
+    assert red.enviadas[1]['headers']['If-None-Match'] == '"v1"'
+    assert servida.desde_cache and servida.status_code == 200
+
+
+def test_sin_validadores_ni_frescura_no_se_guarda(cache):
+    sesion = requests.Session()
+    red = Red(respuesta(), respuesta())
+    cache.solicitar_con_cache(sesion, 'https://www.facebook.com/x', red, {})
+    cache.solicitar_con_cache(sesion, 'https://www.facebook.com/x', red, {})
+    assert 'If-None-Match' not in red.enviadas[1]['headers']
+
+
+def test_la_clave_distingue_allow_redirects(cache):
+    sesion = requests.Session()
+    url = 'https://scontent.fbcdn.net/imagen.jpg'
+    red = Red(respuesta(cuerpo=b'final', url=url), respuesta(302, b'', url))
+    cache.solicitar_con_cache(sesion, url, red, {})
+    # La página final guardada no se sirve a quien pide la redirección misma
+    assert cache.solicitar_con_cache(sesion, url, red, {'allow_redirects': False}).status_code == 302
+    assert len(red.enviadas) == 2
+
+
+def test_la_clave_distingue_cookies(cache):
+    url = 'https://scontent.fbcdn.net/imagen.jpg'
+    red = Red(respuesta(cuerpo=b'a', url=url), respuesta(cuerpo=b'b', url=url))
+    cache.solicitar_con_cache(requests.Session(), url, red, {})
+    con_sesion = requests.Session()
+    con_sesion.cookies.set('c_user', '1', domain='scontent.fbcdn.net')
+    assert cache.solicitar_con_cache(con_sesion, url, red, {}).content == b'b'
+
+
+def test_recorte_lru_al_pasar_del_maximo(tmp_path):
+    cache_http.configurar(str(tmp_path / 'cache'), tamanio_maximo_mb=1, frescura_por_host={'fbcdn.net': 3600})
+    try:
+        sesion = requests.Session()
+        cuerpo = 100 * 1024
+        urls = [f'https://scontent.fbcdn.net/{numero}.jpg' for numero in range(15)]
+        for numero, url in enumerate(urls):
+            cache_http.solicitar_con_cache(sesion, url, Red(respuesta(cuerpo=bytes([numero]) * cuerpo, url=url)), {})
+        with cache_http._indice() as conexion:
+            guardadas = {fila['url'] for fila in conexion.execute('SELECT url FROM respuestas')}
+            total = conexion.execute('SELECT SUM(tamanio) FROM respuestas').fetchone()[0]
+        assert total <= 1024 * 1024
+        assert urls[-1] in guardadas and urls[0] not in guardadas
+    finally:
+        cache_http._ajuste.fijar(None, proceso=True)
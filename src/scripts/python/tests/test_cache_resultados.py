@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+import cache_resultados
+
+
+@pytest.fixture(autouse=True)
+def base(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_resultados, 'ARCHIVO_CACHE_RESULTADOS', str(tmp_path / 'resultados.sqlite3'))
+    monkeypatch.setattr(cache_resultados, '_inicializada', False)
+
+
+class Extractor:
+    """
+    Extractor falso de Facebook que cuenta sus llamadas
+    """
+
+    def __init__(self, existe=True, codigo=200, exito=True):
+        self.llamadas = 0
+        self.resultado = {'exito': exito, 'datos': {'pagina_existe': existe, 'codigo_respuesta': codigo}}
+
+    def __call__(self, parametros):
+        self.llamadas += 1
+        return json.loads(json.dumps(self.resultado))
+
+
+def extraer(extractor, **params):
+    parametros = json.dumps({'pageName': 'CocaCola', **params})
+    return cache_resultados.con_cache_resultados('facebook', 'pageName', parametros, extractor)
+
+
+def test_desactivada_por_defecto():
+    extractor = Extractor()
+    extraer(extractor)
+    extraer(extractor)
+    assert extractor.llamadas == 2
+
+
+def test_reutiliza_el_resultado_vigente():
+    extractor = Extractor()
+    extraer(extractor, cacheResultados=True)
+    segundo = extraer(extractor, cacheResultados=True, pageName='@cocacola/')
+    assert extractor.llamadas == 1
+    assert segundo['datos']['pagina_existe'] and 'cache_resultado' in segundo
+
+    extraer(extractor, cacheResultados=True, forzarActualizacion=True)
+    assert extractor.llamadas == 2
+
+
+def test_opciones_que_cambian_el_resultado_separan_entradas():
+    extractor = Extractor()
+    extraer(extractor, cacheResultados=True)
+    extraer(extractor, cacheResultados=True, soloCabecera=True)
+    extraer(extractor, cacheResultados=True, directorio='otro')
+    assert extractor.llamadas == 3
+
+
+def test_veredicto_negativo_con_su_ttl(monkeypatch):
+    extractor = Extractor(existe=False)
+    extraer(extractor, cacheResultados=True, ttlResultadoNegativo=60)
+    extraer(extractor, cacheResultados=True, ttlResultadoNegativo=60)
+    assert extractor.llamadas == 1
+
+    ahora = cache_resultados.time.time()
+    monkeypatch.setattr(cache_resultados.time, 'time', lambda: ahora + 61)
+    extraer(extractor, cacheResultados=True, ttlResultadoNegativo=60)
+    assert extractor.llamadas == 2
+
+
+@pytest.mark.parametrize('extractor', [Extractor(existe=False, codigo=500), Extractor(exito=False)])
+def test_errores_y_veredictos_dudosos_no_se_guardan(extractor):
+    extraer(extractor, cacheResultados=True)
+    extraer(extractor, cacheResultados=True)
+    assert extractor.llamadas == 2
+
+
+def test_veredicto_definitivo():
+    assert cache_resultados.veredicto_definitivo('facebook', {'pagina_existe': False, 'codigo_respuesta': 404}) is False
+    assert cache_resultados.veredicto_definitivo('instagram', {'usuario_existe': True}) is True
+    assert cache_resultados.veredicto_definitivo('instagram', {'usuario_existe': False, 'error': 'No disponible'}) is False
+    assert cache_resultados.veredicto_definitivo('instagram', {'usuario_existe': False}) is None
+    assert cache_resultados.veredicto_definitivo('facebook', None) is None
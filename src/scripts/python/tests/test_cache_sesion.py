@@ -0,0 +1,61 @@
+import multiprocessing
+
+import pytest
+import requests
+
+import cache_sesion
+
+
+@pytest.fixture
+def archivo(tmp_path):
+    return str(tmp_path / 'validez_sesiones.sqlite3')
+
+
+def test_huella_no_depende_del_orden_de_las_cookies():
+    jar = requests.cookies.RequestsCookieJar()
+    jar.set('c_user', '1', domain='.facebook.com', path='/')
+    jar.set('xs', 'abc', domain='.facebook.com', path='/')
+    cookies = [
+        {'name': 'xs', 'value': 'abc', 'domain': '.facebook.com', 'path': '/'},
+        {'name': 'c_user', 'value': '1', 'domain': '.facebook.com'}
+    ]
+    assert cache_sesion.huella_cookies(jar) == cache_sesion.huella_cookies(cookies)
+    cookies[0]['value'] = 'otra'
+    assert cache_sesion.huella_cookies(jar) != cache_sesion.huella_cookies(cookies)
+
+
+def test_veredicto_vigente_y_vencido(archivo, monkeypatch):
+    assert cache_sesion.consultar_validez(archivo, 'h') is None
+    cache_sesion.registrar_validez(archivo, 'h', True)
+    assert cache_sesion.consultar_validez(archivo, 'h', ttl=60) is True
+    cache_sesion.registrar_validez(archivo, 'h', False)
+    assert cache_sesion.consultar_validez(archivo, 'h', ttl=60) is False
+
+    ahora = cache_sesion.time.time()
+    monkeypatch.setattr(cache_sesion.time, 'time', lambda: ahora + 61)
+    assert cache_sesion.consultar_validez(archivo, 'h', ttl=60) is None
+
+
+def test_invalidar(archivo):
+    cache_sesion.registrar_validez(archivo, 'h', True)
+    cache_sesion.invalidar_validez(archivo, 'h')
+    assert cache_sesion.consultar_validez(archivo, 'h') is None
+    cache_sesion.invalidar_validez(archivo, 'no_existe')
+
+
+def _registrar_varias(archivo, prefijo):
+    for numero in range(30):
+        cache_sesion.registrar_validez(archivo, f'{prefijo}{numero}', True)
+
+
+def test_invalidaciones_de_otro_proceso_no_se_pierden(archivo):
+    for numero in range(30):
+        cache_sesion.registrar_validez(archivo, f'vieja{numero}', True)
+    proceso = multiprocessing.get_context('spawn').Process(target=_registrar_varias, args=(archivo, 'nueva'))
+    proceso.start()
+    for numero in range(30):
+        cache_sesion.invalidar_validez(archivo, f'vieja{numero}')
+    proceso.join(60)
+    assert proceso.exitcode == 0
+    assert all(cache_sesion.consultar_validez(archivo, f'vieja{numero}') is None for numero in range(30))
+    assert all(cache_sesion.consultar_validez(archivo, f'nueva{numero}') for numero in range(30))
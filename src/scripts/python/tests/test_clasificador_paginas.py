@@ -0,0 +1,78 @@
+from clasificador_paginas import clasificar, escanear, MARCADORES_SESION
+
+TEXTO_LARGO = 'contenido de la página ' * 50
+
+
+def test_facebook_disponible():
+    veredicto = clasificar('<html><p>Coca-Cola</p></html>', 'https://www.facebook.com/cocacola', 'facebook', TEXTO_LARGO)
+    assert veredicto['estado'] == 'disponible'
+    assert not veredicto['muro_login']
+
+
+def test_facebook_navegador_bloqueado_tiene_prioridad_sobre_login():
+    veredicto = clasificar('<p>Facebook is not available on this browser. Log in</p>', '', 'facebook')
+    assert veredicto['estado'] == 'navegador_bloqueado'
+    assert veredicto['muro_login']
+
+
+def test_facebook_no_encontrado():
+    veredicto = clasificar('<p>This content isn\'t available right now</p>', '', 'facebook', TEXTO_LARGO)
+    assert veredicto['estado'] == 'no_encontrado'
+
+
+def test_facebook_muro_login_por_texto_y_por_url():
+    assert clasificar('<p>Log in to Facebook</p>', '', 'facebook', TEXTO_LARGO)['estado'] == 'muro_login'
+    veredicto = clasificar('<p>hola</p>', 'https://www.facebook.com/login/?next=x', 'facebook', TEXTO_LARGO)
+    assert veredicto['estado'] == 'muro_login'
+    assert veredicto['login_en_url']
+
+
+def test_facebook_texto_visible_corto_es_muro_login():
+    assert clasificar('<p>hola</p>', '', 'facebook', 'hola')['estado'] == 'muro_login'
+    # Sin texto visible no se usa la longitud
+    assert clasificar('<p>hola</p>', '', 'facebook')['estado'] == 'disponible'
+
+
+def test_instagram_no_disponible():
+    veredicto = clasificar('<h2>Sorry, this page isn\'t available.</h2>', 'https://www.instagram.com/x/', 'instagram', TEXTO_LARGO)
+    assert veredicto['estado'] == 'no_disponible'
+    assert veredicto['bloqueo_tras_login']
+
+
+def test_instagram_muro_login():
+    assert clasificar('<html></html>', 'https://www.instagram.com/accounts/login/', 'instagram', TEXTO_LARGO)['estado'] == 'muro_login'
+    assert clasificar('<html></html>', 'https://www.instagram.com/nasa/', 'instagram', 'Log in ' + TEXTO_LARGO)['estado'] == 'muro_login'
+
+
+def test_marcadores_sin_distinguir_mayusculas():
+    veredicto = clasificar('<p>PAGE NOT FOUND</p>', '', 'facebook', TEXTO_LARGO)
+    assert veredicto['no_encontrado']
+    assert 'page not found' in veredicto['marcadores']
+
+
+def test_escanear_encuentra_marcadores_solapados():
+    posiciones = escanear('<p>Log in to Facebook: page not found</p>')
+    assert posiciones['log in to facebook'] == posiciones['log in'] == 3
+    assert posiciones['page not found'] == 23
+    assert posiciones['not found'] == 28
+
+
+def test_escanear_devuelve_la_primera_posicion():
+    assert escanear('x not found y page not found')['not found'] == 2
+    assert escanear('nada que ver') == {}
+    assert escanear(None) == {}
+
+
+def test_escanear_con_otros_marcadores():
+    assert escanear('<input name="email"><input name="pass">', MARCADORES_SESION) == {
+        'name="email"': 7, 'name="pass"': 27
+    }
+    # Los marcadores de la portada no entran en la clasificación
+    assert 'name="email"' not in clasificar('<input name="email">', '', 'facebook')['marcadores']
+
+
+def test_clasificar_reutiliza_el_escaneo():
+    previo = clasificar('<p>Log in to Facebook</p>', '', 'facebook')
+    veredicto = clasificar('', '', 'facebook', TEXTO_LARGO, marcadores=previo['marcadores'])
+    assert veredicto['estado'] == 'muro_login'
+    assert veredicto['marcadores'] is previo['marcadores']
@@ -0,0 +1,117 @@
+import pytest
+
+import cortacircuitos
+from reloj import Reloj
+
+CLAVE = 'instagram_api:https://i.instagram.com/api/v1/users/web_profile_info/'
+
+
+@pytest.fixture
+def reloj(tmp_path, monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(cortacircuitos, 'time', reloj)
+    monkeypatch.setattr(cortacircuitos, 'ARCHIVO_CORTACIRCUITOS', str(tmp_path / 'cortacircuitos.sqlite3'))
+    cortacircuitos.configurar(True)
+    yield reloj
+    cortacircuitos.configurar(False)
+
+
+def abrir_circuito():
+    for _ in range(cortacircuitos.UMBRAL_FALLOS):
+        assert cortacircuitos.permitir(CLAVE) is True
+        cortacircuitos.registrar(CLAVE, False)
+
+
+def test_desactivados_siempre_permiten(tmp_path, monkeypatch):
+    monkeypatch.setattr(cortacircuitos, 'ARCHIVO_CORTACIRCUITOS', str(tmp_path / 'cortacircuitos.sqlite3'))
+    for _ in range(cortacircuitos.UMBRAL_FALLOS + 1):
+        cortacircuitos.registrar(CLAVE, False)
+    assert cortacircuitos.permitir(CLAVE) is True
+    assert cortacircuitos.estado(CLAVE) == cortacircuitos.CERRADO
+
+
+def test_se_abre_tras_umbral_de_fallos_seguidos(reloj):
+    for _ in range(cortacircuitos.UMBRAL_FALLOS - 1):
+        cortacircuitos.registrar(CLAVE, False)
+    assert cortacircuitos.estado(CLAVE) == cortacircuitos.CERRADO
+
+    cortacircuitos.registrar(CLAVE, False)
+    assert cortacircuitos.estado(CLAVE) == cortacircuitos.ABIERTO
+    assert cortacircuitos.permitir(CLAVE) is False
+
+
+def test_un_exito_reinicia_los_fallos(reloj):
+    for _ in range(cortacircuitos.UMBRAL_FALLOS - 1):
+        cortacircuitos.registrar(CLAVE, False)
+    cortacircuitos.registrar(CLAVE, True)
+    cortacircuitos.registrar(CLAVE, False)
+    assert cortacircuitos.estado(CLAVE) == cortacircuitos.CERRADO
+
+
+def test_sonda_unica_tras_el_enfriamiento(reloj):
+    abrir_circuito()
+    reloj.avanzar(cortacircuitos.ENFRIAMIENTO_INICIAL - 1)
+    assert cortacircuitos.permitir(CLAVE) is False
+
+    reloj.avanzar(1)
+    assert cortacircuitos.permitir(CLAVE) == cortacircuitos.SONDA
+    assert cortacircuitos.estado(CLAVE) == cortacircuitos.SEMIABIERTO
+    # Mientras la sonda está reservada nadie más prueba
+    assert cortacircuitos.permitir(CLAVE) is False
+
+
+def test_sonda_con_exito_cierra_el_circuito(reloj):
+    abrir_circuito()
+    reloj.avanzar(cortacircuitos.ENFRIAMIENTO_INICIAL)
+    assert cortacircuitos.permitir(CLAVE) == cortacircuitos.SONDA
+
+    cortacircuitos.registrar(CLAVE, True)
+    assert cortacircuitos.estado(CLAVE) == cortacircuitos.CERRADO
+    assert cortacircuitos.permitir(CLAVE) is True
+
+
+def test_sonda_fallida_duplica_el_enfriamiento(reloj):
+    abrir_circuito()
+    reloj.avanzar(cortacircuitos.ENFRIAMIENTO_INICIAL)
+    assert cortacircuitos.permitir(CLAVE) == cortacircuitos.SONDA
+
+    cortacircuitos.registrar(CLAVE, False)
+    assert cortacircuitos.estado(CLAVE) == cortacircuitos.ABIERTO
+    reloj.avanzar(cortacircuitos.ENFRIAMIENTO_INICIAL)
+    assert cortacircuitos.permitir(CLAVE) is False
+    reloj.avanzar(cortacircuitos.ENFRIAMIENTO_INICIAL)
+    assert cortacircuitos.permitir(CLAVE) == cortacircuitos.SONDA
+
+
+def test_liberar_sonda_permite_otra(reloj):
+    abrir_circuito()
+    reloj.avanzar(cortacircuitos.ENFRIAMIENTO_INICIAL)
+    assert cortacircuitos.permitir(CLAVE) == cortacircuitos.SONDA
+    cortacircuitos.liberar_sonda(CLAVE)
+    assert cortacircuitos.permitir(CLAVE) == cortacircuitos.SONDA
+
+
+def test_cortacircuitos_sin_orden_adaptativo(reloj, monkeypatch):
+    import estadisticas_estrategias
+    from carrera_estrategias import correr_estrategias
+
+    registradas = []
+    monkeypatch.setattr(estadisticas_estrategias, 'registrar', lambda *args: registradas.append(args))
+    lanzadas = []
+
+    def caida():
+        lanzadas.append('caida')
+        raise ConnectionError('conexión rechazada')
+
+    estrategias = [
+        {'nombre': 'caida', 'ejecutar': caida, 'es_valida': lambda resultado: True},
+        {'nombre': 'sana', 'ejecutar': lambda: 'ok', 'es_valida': lambda resultado: True}
+    ]
+    for _ in range(cortacircuitos.UMBRAL_FALLOS + 2):
+        assert correr_estrategias(estrategias, grupo='prueba', orden_adaptativo=False) == ('sana', 'ok')
+
+    assert cortacircuitos.estado('prueba:caida') == cortacircuitos.ABIERTO
+    # Con el circuito abierto la estrategia caída ya no se lanza
+    assert len(lanzadas) == cortacircuitos.UMBRAL_FALLOS
+    # Sin orden adaptativo no se registran estadísticas
+    assert registradas == []
@@ -0,0 +1,105 @@
+import pytest
+
+import gobernador_tasa
+from reloj import Reloj
+
+URL = 'https://www.facebook.com/cocacola'
+TASA_MAXIMA = 2.0
+
+
+@pytest.fixture
+def reloj(tmp_path, monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(gobernador_tasa, 'time', reloj)
+    gobernador_tasa.configurar(str(tmp_path / 'cubetas.sqlite3'), {'facebook.com': TASA_MAXIMA})
+    yield reloj
+    gobernador_tasa._ajuste.fijar(None, proceso=True)
+
+
+def cubeta():
+    return gobernador_tasa.estado()['facebook.com']
+
+
+def test_hosts_sin_regla_no_se_gobiernan(reloj):
+    assert gobernador_tasa.dominio_gobernado('https://scontent.xx.fbcdn.net/img.jpg') is None
+    assert gobernador_tasa.dominio_gobernado(URL) == 'facebook.com'
+    assert gobernador_tasa.esperar_turno('https://example.com/') == 0.0
+
+
+def test_rafaga_y_reposicion(reloj):
+    for _ in range(gobernador_tasa.RAFAGA):
+        assert gobernador_tasa.esperar_turno(URL) == 0.0
+    assert cubeta()['fichas'] == 0
+
+    # La siguiente ficha llega a 1 / tasa segundos
+    assert gobernador_tasa.esperar_turno(URL) == pytest.approx(1 / TASA_MAXIMA)
+
+    reloj.avanzar(1.0)
+    assert cubeta()['fichas'] == pytest.approx(TASA_MAXIMA)
+    # La cubeta no pasa de la ráfaga
+    reloj.avanzar(60)
+    assert cubeta()['fichas'] == gobernador_tasa.RAFAGA
+
+
+def test_respuesta_limitada_reduce_la_tasa_y_vacia_la_cubeta(reloj):
+    gobernador_tasa.informar(URL, True)
+    assert cubeta() == {'fichas': 0, 'tasa': TASA_MAXIMA * gobernador_tasa.FACTOR_REDUCCION, 'tasa_maxima': TASA_MAXIMA}
+
+    reloj.avanzar(1.0)
+    assert cubeta()['fichas'] == pytest.approx(TASA_MAXIMA * gobernador_tasa.FACTOR_REDUCCION)
+
+
+def test_respuestas_limpias_suben_la_tasa_hasta_el_maximo(reloj):
+    gobernador_tasa.informar(URL, True)
+    gobernador_tasa.informar(URL, False)
+    assert cubeta()['tasa'] == pytest.approx(
+        TASA_MAXIMA * gobernador_tasa.FACTOR_REDUCCION + TASA_MAXIMA * gobernador_tasa.FRACCION_INCREMENTO
+    )
+    for _ in range(100):
+        gobernador_tasa.informar(URL, False)
+    assert cubeta()['tasa'] == TASA_MAXIMA
+
+
+def test_la_tasa_no_baja_del_minimo(reloj):
+    for _ in range(20):
+        gobernador_tasa.informar(URL, True)
+    assert cubeta()['tasa'] == pytest.approx(TASA_MAXIMA * gobernador_tasa.FRACCION_TASA_MINIMA)
+
+
+def test_muro_login_reduce_menos(reloj):
+    gobernador_tasa.informar_muro_login(URL)
+    assert cubeta()['tasa'] == pytest.approx(TASA_MAXIMA * gobernador_tasa.FACTOR_REDUCCION_MURO)
+
+
+def test_informar_respuesta_usa_la_url_pedida(reloj):
+    class Respuesta:
+        status_code = 429
+        url = 'http://127.0.0.1:8000/cocacola'
+
+    gobernador_tasa.informar_respuesta(URL, Respuesta())
+    assert cubeta()['tasa'] == TASA_MAXIMA * gobernador_tasa.FACTOR_REDUCCION
+
+
+def test_la_espera_no_abre_transacciones(reloj, monkeypatch):
+    for _ in range(gobernador_tasa.RAFAGA):
+        gobernador_tasa.esperar_turno(URL)
+    transaccion = gobernador_tasa._transaccion
+    abiertas = []
+
+    def contar():
+        abiertas.append(reloj.time())
+        return transaccion()
+
+    monkeypatch.setattr(gobernador_tasa, 'PASO_ESPERA', 0.05)
+    monkeypatch.setattr(gobernador_tasa, '_transaccion', contar)
+    assert gobernador_tasa.esperar_turno(URL) == pytest.approx(1 / TASA_MAXIMA)
+    # Varias esperas de 0.05 s y una sola transacción, la que consume la ficha
+    assert len(abiertas) == 1
+
+
+def test_base_inservible_deja_pasar(reloj, tmp_path, capsys):
+    ruta = tmp_path / 'rota.sqlite3'
+    ruta.write_bytes(b'esto no es una base sqlite' * 100)
+    gobernador_tasa._ajuste.fijar({**gobernador_tasa._ajuste.valor(), 'ruta': str(ruta)}, proceso=True)
+    assert gobernador_tasa.esperar_turno(URL) == 0.0
+    assert 'sin esperar' in capsys.readouterr().out
@@ -0,0 +1,118 @@
+import io
+import json
+import os
+from datetime import timedelta
+
+import pytest
+import requests
+
+import grabacion_http
+import red_scraping
+from ajustes_extraccion import en_extraccion
+
+
+def respuesta(estado, cuerpo, url, cabeceras=None):
+    resultado = requests.Response()
+    resultado.status_code = estado
+    resultado._content = cuerpo
+    resultado.raw = io.BytesIO()
+    resultado.url = url
+    resultado.elapsed = timedelta(milliseconds=5)
+    resultado.headers = requests.structures.CaseInsensitiveDict(cabeceras or {'Content-Type': 'text/html'})
+    return resultado
+
+
+class SesionGrabada(requests.Session):
+    """
+    Sesión que responde sin red: una respuesta por (URL, allow_redirects)
+    """
+
+    def __init__(self, respuestas):
+        super().__init__()
+        self.respuestas = respuestas
+        self.peticiones = 0
+
+    def request(self, metodo, url, **kwargs):
+        self.peticiones += 1
+        return self.respuestas[(url, kwargs.get('allow_redirects', True))].pop(0)
+
+
+def grabar_y_reproducir(directorio, respuestas, peticiones):
+    """
+    Graba `peticiones` [(url, kwargs)] contra respuestas falsas y las
+    reproduce con una sesión sin red. Devuelve las respuestas reproducidas
+    """
+    def grabar():
+        grabacion_http.configurar('grabar', directorio, proceso=False)
+        sesion = SesionGrabada(respuestas)
+        for url, kwargs in peticiones:
+            red_scraping.solicitar(sesion, 'GET', url, **kwargs)
+
+    def reproducir():
+        grabacion_http.configurar('reproducir', directorio, 0, proceso=False)
+        sesion = SesionGrabada({})
+        reproducidas = [red_scraping.solicitar(sesion, 'GET', url, **kwargs) for url, kwargs in peticiones]
+        assert sesion.peticiones == 0
+        return reproducidas, sesion
+
+    en_extraccion(grabar)
+    return en_extraccion(reproducir)
+
+
+def test_reproduce_sin_red_en_orden(tmp_path):
+    url = 'https://www.facebook.com/cocacola'
+    reproducidas, _ = grabar_y_reproducir(
+        str(tmp_path), {(url, True): [respuesta(200, b'primera', url), respuesta(200, b'segunda', url)]},
+        [(url, {}), (url, {})]
+    )
+    assert [r.content for r in reproducidas] == [b'primera', b'segunda']
+    assert not grabacion_http.reproduciendo()
+
+
+def test_la_redireccion_y_la_pagina_final_no_se_mezclan(tmp_path):
+    url = 'https://www.facebook.com/cocacola'
+    reproducidas, _ = grabar_y_reproducir(
+        str(tmp_path),
+        {(url, False): [respuesta(302, b'', url, {'Location': '/login/'})],
+         (url, True): [respuesta(200, b'final', url)]},
+        [(url, {'allow_redirects': False}), (url, {})]
+    )
+    assert [r.status_code for r in reproducidas] == [302, 200]
+
+
+def test_aplica_las_cookies_grabadas(tmp_path):
+    url = 'https://www.facebook.com/'
+    _, sesion = grabar_y_reproducir(
+        str(tmp_path),
+        {(url, True): [respuesta(200, b'portada', url, {'Set-Cookie': 'datr=abc; Path=/; Domain=.facebook.com'})]},
+        [(url, {})]
+    )
+    assert sesion.cookies.get('datr') == 'abc'
+
+
+def test_peticion_sin_grabacion(tmp_path):
+    url = 'https://www.facebook.com/cocacola'
+    grabar_y_reproducir(str(tmp_path), {(url, True): [respuesta(200, b'x', url)]}, [(url, {})])
+
+    def otra():
+        grabacion_http.configurar('reproducir', str(tmp_path), 0, proceso=False)
+        red_scraping.solicitar(SesionGrabada({}), 'GET', url, stream=True)
+
+    with pytest.raises(grabacion_http.SinGrabacion):
+        en_extraccion(otra)
+
+
+def test_grabacion_sin_los_campos_de_la_clave(tmp_path):
+    os.makedirs(tmp_path / 'vieja')
+    with open(tmp_path / 'vieja' / grabacion_http.ARCHIVO_INTERCAMBIOS, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'metodo': 'GET', 'url': 'https://www.facebook.com/'}) + '\n')
+    with pytest.raises(ValueError):
+        en_extraccion(grabacion_http.configurar, 'reproducir', str(tmp_path / 'vieja'), proceso=False)
+
+
+def test_separar_opciones():
+    opciones, resto = grabacion_http.separar_opciones(['--reproducir', 'dir', '--escala-latencia=0.5', '{}'])
+    assert opciones == {'reproducirHttp': 'dir', 'escalaLatencia': 0.5}
+    assert resto == ['{}']
+    with pytest.raises(ValueError):
+        grabacion_http.separar_opciones(['--grabar'])
@@ -0,0 +1,36 @@
+from lote_scraping import derivar_objetivo
+
+
+def test_pagina_de_facebook():
+    assert derivar_objetivo('https://www.facebook.com/cocacola/') == {'plataforma': 'facebook', 'objetivo': 'cocacola'}
+    assert derivar_objetivo('m.facebook.com/cocacola') == {'plataforma': 'facebook', 'objetivo': 'cocacola'}
+
+
+def test_perfil_de_facebook_por_id():
+    assert derivar_objetivo('https://www.facebook.com/profile.php?id=123456')['objetivo'] == '123456'
+
+
+def test_contenido_especifico_de_facebook_se_omite():
+    for url in ('https://www.facebook.com/cocacola/videos/55', 'https://www.facebook.com/cocacola/posts/1234'):
+        objetivo = derivar_objetivo(url)
+        assert objetivo['objetivo'] == 'cocacola'
+        assert objetivo['omitido']['datos']['es_contenido_especifico']
+
+
+def test_perfil_de_instagram():
+    assert derivar_objetivo('https://instagram.com/nasa') == {'plataforma': 'instagram', 'objetivo': 'nasa'}
+
+
+def test_post_de_instagram_se_omite():
+    objetivo = derivar_objetivo('https://www.instagram.com/p/Cabc123/')
+    assert objetivo['plataforma'] == 'instagram'
+    assert objetivo['omitido']['error'] == 'URL de post/reel no soportada'
+
+
+def test_url_sin_objetivo_o_de_otra_plataforma():
+    assert derivar_objetivo('https://www.facebook.com/')['omitido']['error'] == 'No se pudo extraer nombre de página'
+    assert derivar_objetivo('https://www.instagram.com/')['omitido']['error'] == 'No se pudo extraer username'
+    otra = derivar_objetivo('https://twitter.com/nasa')
+    assert otra['plataforma'] is None
+    # Un dominio que solo termina igual no es Facebook
+    assert derivar_objetivo('https://notfacebook.com/x')['plataforma'] is None
@@ -0,0 +1,109 @@
+import json
+import multiprocessing
+
+import pytest
+
+import pool_sesiones
+from reloj import Reloj
+
+
+def crear_cuenta(directorio, nombre, valor='1'):
+    cookies = [{'name': 'c_user', 'value': valor, 'domain': '.facebook.com', 'path': '/'}]
+    with open(directorio / f'{nombre}.json', 'w', encoding='utf-8') as f:
+        json.dump(cookies, f)
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(pool_sesiones, 'time', reloj)
+    for nombre in ('ana', 'beto', 'carla'):
+        crear_cuenta(tmp_path, nombre)
+
+    def configurar(**opciones):
+        pool_sesiones.configurar(str(tmp_path), **{'enfriamiento': 0, **opciones})
+        return reloj
+
+    yield configurar
+    pool_sesiones._ajuste.fijar(None, proceso=True)
+
+
+def nombres(veces):
+    return [pool_sesiones.adquirir().nombre for _ in range(veces)]
+
+
+def test_rotacion(pool):
+    pool()
+    assert nombres(4) == ['ana', 'beto', 'carla', 'ana']
+    assert pool_sesiones.adquirir(excluir=('beto',)).nombre == 'carla'
+
+
+def test_una_cuenta_llamada_como_el_cursor(pool, tmp_path):
+    crear_cuenta(tmp_path, '_rotacion')
+    pool()
+    assert nombres(5) == ['_rotacion', 'ana', 'beto', 'carla', '_rotacion']
+
+
+def test_lru(pool):
+    reloj = pool(seleccion='lru')
+    primeras = []
+    for _ in range(3):
+        primeras.append(pool_sesiones.adquirir().nombre)
+        reloj.avanzar(1)
+    assert sorted(primeras) == ['ana', 'beto', 'carla']
+    assert pool_sesiones.adquirir().nombre == primeras[0]
+
+
+def test_enfriamiento_y_usos_por_hora(pool):
+    reloj = pool(enfriamiento=10, usos_por_hora=3600)
+    assert nombres(3) == ['ana', 'beto', 'carla']
+    assert pool_sesiones.adquirir() is None
+    reloj.avanzar(10)
+    assert pool_sesiones.adquirir().nombre == 'ana'
+
+    pool(usos_por_hora=1)
+    # Ráfaga de RAFAGA_USOS usos por cuenta y luego casi nada
+    usos = [pool_sesiones.adquirir() for _ in range(3 * pool_sesiones.RAFAGA_USOS)]
+    assert None in usos
+
+
+def test_cuarentena_por_muro_de_login(pool, tmp_path):
+    reloj = pool()
+    cuenta = pool_sesiones.adquirir()
+    pool_sesiones.informar(cuenta, pool_sesiones.MURO_LOGIN)
+    assert 'ana' not in nombres(4)
+    resumen = {entrada['cuenta']: entrada for entrada in pool_sesiones.estado()}
+    assert resumen['ana']['en_cuarentena'] and resumen['ana']['motivo_cuarentena'] == pool_sesiones.MURO_LOGIN
+
+    reloj.avanzar(pool_sesiones.CUARENTENA_MURO)
+    assert 'ana' in nombres(3)
+
+
+def test_cookies_renovadas_levantan_la_cuarentena(pool, tmp_path):
+    pool()
+    pool_sesiones.informar(pool_sesiones.adquirir(), pool_sesiones.CHECKPOINT)
+    crear_cuenta(tmp_path, 'ana', valor='2')
+    assert 'ana' in nombres(3)
+
+
+def _adquirir_varias(directorio, veces, salida):
+    pool_sesiones.configurar(directorio, enfriamiento=0, usos_por_hora=3600 * 1000)
+    salida.put(sum(pool_sesiones.adquirir() is not None for _ in range(veces)))
+
+
+def test_procesos_no_pierden_usos(tmp_path):
+    for nombre in ('ana', 'beto', 'carla'):
+        crear_cuenta(tmp_path, nombre)
+    contexto = multiprocessing.get_context('spawn')
+    salida = contexto.Queue()
+    procesos = [contexto.Process(target=_adquirir_varias, args=(str(tmp_path), 10, salida)) for _ in range(3)]
+    for proceso in procesos:
+        proceso.start()
+    entregadas = sum(salida.get(timeout=60) for _ in procesos)
+    for proceso in procesos:
+        proceso.join(60)
+    pool_sesiones.configurar(str(tmp_path))
+    try:
+        assert sum(entrada['usos'] for entrada in pool_sesiones.estado()) == entregadas
+    finally:
+        pool_sesiones._ajuste.fijar(None, proceso=True)
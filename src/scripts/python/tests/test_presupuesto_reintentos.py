@@ -0,0 +1,108 @@
+import io
+
+import pytest
+import requests
+
+import presupuesto_reintentos
+from ajustes_extraccion import en_extraccion
+
+
+@pytest.fixture
+def saldo(monkeypatch):
+    def fijar(valor):
+        monkeypatch.setattr(presupuesto_reintentos, '_saldo', valor)
+    return fijar
+
+
+def test_consumir_gasta_hasta_agotar(saldo):
+    saldo(2.0)
+    assert presupuesto_reintentos.consumir() is True
+    assert presupuesto_reintentos.consumir() is True
+    assert presupuesto_reintentos.consumir() is False
+    assert presupuesto_reintentos.saldo() == 0.0
+
+
+def test_cada_peticion_aporta_la_proporcion(saldo):
+    saldo(0.0)
+    # Once peticiones: diez sumas de 0.1 se quedan justo por debajo de 1
+    for _ in range(11):
+        presupuesto_reintentos.registrar_peticion()
+    assert presupuesto_reintentos.saldo() == pytest.approx(11 * presupuesto_reintentos.PROPORCION_REINTENTOS)
+    assert presupuesto_reintentos.consumir() is True
+    assert presupuesto_reintentos.consumir() is False
+
+
+def test_saldo_no_pasa_del_maximo(saldo):
+    saldo(presupuesto_reintentos.SALDO_MAXIMO - 0.05)
+    presupuesto_reintentos.registrar_peticion()
+    assert presupuesto_reintentos.saldo() == presupuesto_reintentos.SALDO_MAXIMO
+
+
+def test_proporcion_de_una_extraccion(saldo):
+    saldo(0.0)
+
+    def extraccion():
+        presupuesto_reintentos.configurar(maximos=0, proporcion=0.5, proceso=False)
+        presupuesto_reintentos.registrar_peticion()
+        return presupuesto_reintentos.reintentos_maximos()
+
+    assert en_extraccion(extraccion) == 0
+    assert presupuesto_reintentos.saldo() == pytest.approx(0.5)
+    # Fuera de la extracción vuelven los valores del proceso
+    assert presupuesto_reintentos.reintentos_maximos() == presupuesto_reintentos.REINTENTOS_MAXIMOS_DEFECTO
+
+
+def test_espera_con_jitter_acotada():
+    for intento in range(10):
+        espera = presupuesto_reintentos.espera(intento)
+        assert 0 <= espera <= min(presupuesto_reintentos.ESPERA_MAXIMA, presupuesto_reintentos.ESPERA_BASE * 2 ** intento)
+
+
+class SesionFalsa:
+    """
+    Devuelve (o lanza) en orden los desenlaces dados y cuenta las peticiones
+    """
+
+    def __init__(self, *desenlaces):
+        self.desenlaces = list(desenlaces)
+        self.peticiones = 0
+
+    def request(self, metodo, url, **kwargs):
+        self.peticiones += 1
+        desenlace = self.desenlaces.pop(0)
+        if isinstance(desenlace, Exception):
+            raise desenlace
+        respuesta = requests.Response()
+        respuesta.status_code = desenlace
+        respuesta._content = b''
+        respuesta.raw = io.BytesIO()
+        respuesta.url = url
+        return respuesta
+
+
+@pytest.fixture
+def enviar(saldo, monkeypatch):
+    import red_scraping
+    saldo(presupuesto_reintentos.SALDO_INICIAL)
+    monkeypatch.setattr(red_scraping, '_esperar', lambda segundos: None)
+    return red_scraping._enviar
+
+
+def test_get_se_reintenta_tras_error_transitorio(enviar):
+    sesion = SesionFalsa(requests.ConnectionError('cortada'), 503, 200)
+    assert enviar(sesion, 'GET', 'https://www.facebook.com/x').status_code == 200
+    assert sesion.peticiones == 3
+
+
+def test_post_no_se_reintenta(enviar):
+    sesion = SesionFalsa(503, 200)
+    assert enviar(sesion, 'POST', 'https://www.facebook.com/login/').status_code == 503
+    with pytest.raises(requests.ConnectionError):
+        enviar(SesionFalsa(requests.ConnectionError('cortada'), 200), 'POST', 'https://www.facebook.com/login/')
+
+
+def test_error_tls_no_se_reintenta(enviar):
+    sesion = SesionFalsa(requests.exceptions.SSLError('certificado'), 200)
+    with pytest.raises(requests.exceptions.SSLError):
+        enviar(sesion, 'GET', 'https://www.facebook.com/x')
+    assert sesion.peticiones == 1
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Instrumentación ligera por etapas de cada extracción.
+
+`con_tiempos` abre una medición para la extracción en curso (en una
+contextvar, así la ven también los hilos de las carreras de estrategias y
+del motor asyncio, que copian el contexto). Dentro de ella:
+
+- `tramo(nombre)` / `@etapa(nombre)` miden una etapa (cargar_sesion,
+  realizar_login_facebook, parseo, imagen_perfil...). Las etapas pueden
+  anidarse; cada una suma su propio tiempo total.
+- carrera_estrategias registra cada intento de estrategia con su desenlace.
+- red_scraping cuenta peticiones, respuestas servidas desde la caché y
+  bytes recibidos.
+
+El resultado recibe un bloque 'timings' con el resumen. Con el parámetro
+archivoTrazas cada tramo se añade además como una línea JSON a ese
+archivo, para buscar los caminos lentos en toda una ejecución. Al terminar
+cada extracción se liberan sus documentos y respuestas y, con
+informeMemoria, se añade el pico de memoria por etapa en 'memoria' (ver
+presupuesto_memoria.py).
+"""
+import os
+import json
+import time
+import threading
+import contextvars
+from functools import wraps
+from contextlib import contextmanager
+
+import presupuesto_memoria
+
+_medicion_actual = contextvars.ContextVar('medicion_extraccion', default=None)
+_lock_trazas = threading.Lock()
+
+
+class Medicion:
+    """
+    Tramos, intentos de estrategia y contadores de red de una extracción
+    """
+
+    def __init__(self, plataforma, objetivo):
+        self.plataforma = plataforma
+        self.objetivo = objetivo
+        self.inicio = time.time()
+        self.inicio_monotonico = time.monotonic()
+        self.tramos = []
+        self.intentos = []
+        self.peticiones = 0
+        self.desde_cache = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def agregar_tramo(self, nombre, inicio, segundos, **atributos):
+        with self._lock:
+            self.tramos.append({
+                'nombre': nombre,
+                'inicio_ms': round((inicio - self.inicio_monotonico) * 1000, 1),
+                'duracion_ms': round(segundos * 1000, 1),
+                **atributos
+            })
+
+    def resumen(self):
+        with self._lock:
+            etapas = {}
+            for tramo in self.tramos:
+                if tramo['nombre'] != 'estrategia':
+                    etapas[tramo['nombre']] = round(etapas.get(tramo['nombre'], 0) + tramo['duracion_ms'], 1)
+            return {
+                'total_ms': round((time.monotonic() - self.inicio_monotonico) * 1000, 1),
+                'etapas': etapas,
+                'estrategias': list(self.intentos),
+                'peticiones': self.peticiones,
+                'desde_cache': self.desde_cache,
+                'bytes': self.bytes
+            }
+
+
+def actual():
+    return _medicion_actual.get()
+
+
+@contextmanager
+def tramo(nombre, **atributos):
+    """
+    Mide el bloque como etapa `nombre` de la extracción en curso (si la hay)
+    """
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.monotonic()
+    etapa_memoria = presupuesto_memoria.abrir_etapa(nombre)
+    try:
+        yield
+    finally:
+        presupuesto_memoria.cerrar_etapa(etapa_memoria)
+        medicion.agregar_tramo(nombre, inicio, time.monotonic() - inicio, **atributos)
+
+
+def etapa(nombre):
+    """
+    Decorador: mide cada llamada a la función como etapa `nombre`
+    """
+    def decorador(funcion):
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with tramo(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def registrar_intento(grupo, nombre, inicio, desenlace):
+    """
+    Registra un intento de estrategia; `desenlace` es 'exito', 'fallo',
+    'error' o 'cancelada'
+    """
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        return
+    segundos = time.monotonic() - inicio
+    medicion.agregar_tramo('estrategia', inicio, segundos, estrategia=nombre, grupo=grupo, desenlace=desenlace)
+    with medicion._lock:
+        medicion.intentos.append({
+            'nombre': nombre,
+            'grupo': grupo,
+            'duracion_ms': round(segundos * 1000, 1),
+            'desenlace': desenlace
+        })
+
+
+def registrar_peticion(respuesta):
+    """
+    Cuenta una respuesta de red (o de la caché HTTP) y sus bytes si ya se leyeron
+    """
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        return
+    with medicion._lock:
+        if getattr(respuesta, 'desde_cache', False):
+            medicion.desde_cache += 1
+            return
+        medicion.peticiones += 1
+        if respuesta._content_consumed and respuesta._content:
+            medicion.bytes += len(respuesta._content)
+
+
+def sumar_bytes(cantidad):
+    """
+    Bytes leídos en streaming después de registrar la respuesta
+    """
+    medicion = _medicion_actual.get()
+    if medicion is not None:
+        with medicion._lock:
+            medicion.bytes += cantidad
+
+
+def _escribir_trazas(ruta, medicion, exito):
+    base = {'plataforma': medicion.plataforma, 'objetivo': medicion.objetivo, 'inicio_extraccion': medicion.inicio}
+    with medicion._lock:
+        tramos = list(medicion.tramos)
+    lineas = [json.dumps({**base, **tramo}, ensure_ascii=False) for tramo in tramos]
+    lineas.append(json.dumps({
+        **base, 'nombre': 'extraccion', 'inicio_ms': 0.0,
+        'duracion_ms': round((time.monotonic() - medicion.inicio_monotonico) * 1000, 1), 'exito': exito
+    }, ensure_ascii=False))
+    try:
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(directorio, exist_ok=True)
+        with _lock_trazas, open(ruta, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lineas) + '\n')
+    except OSError as e:
+        print(f"⚠️ No se pudieron escribir las trazas en {ruta}: {str(e)}")
+
+
+def con_tiempos(plataforma, campo_objetivo, parametros, extraer):
+    """
+    Envuelve un extractor: mide la extracción y añade 'timings' al resultado
+    (las trazas al archivo de archivoTrazas y 'memoria' con informeMemoria,
+    si se pidieron). Al terminar libera los documentos y respuestas anotados
+    """
+    try:
+        params = json.loads(parametros)
+        objetivo, archivo_trazas = params.get(campo_objetivo, ''), params.get('archivoTrazas')
+    except (TypeError, ValueError, AttributeError):
+        objetivo, archivo_trazas = '', None
+
+    medicion = Medicion(plataforma, objetivo)
+    token = _medicion_actual.set(medicion)
+    memoria = presupuesto_memoria.abrir_extraccion(parametros)
+    try:
+        resultado = extraer(parametros)
+    finally:
+        informe_memoria = presupuesto_memoria.cerrar_extraccion(memoria)
+        _medicion_actual.reset(token)
+    if isinstance(resultado, dict):
+        resultado['timings'] = medicion.resumen()
+        if informe_memoria is not None:
+            resultado['memoria'] = informe_memoria
+    if archivo_trazas:
+        _escribir_trazas(archivo_trazas, medicion, bool(isinstance(resultado, dict) and resultado.get('exito')))
+    return resultado
@@ -731,17 +731,16 @@ export class IntegratedScrapingService {
         cookies: cookiesData // Pasar las cookies al script de Python
       });
       
-      const comando = `${venvPython} "${scriptPath}" '${parametros}'`;
+      // Modo máquina: stdout solo trae el resultado JSON (el progreso se descarta)
+      const comando = `${venvPython} "${scriptPath}" --registro=ninguno '${parametros}'`;
       const resultado = execSync(comando, { 
         encoding: 'utf8',
         maxBuffer: 10 * 1024 * 1024,
         timeout: 30000 // Reducido a 30s para Facebook (optimizado)
       });
       
-      // Extraer solo la última línea JSON
-      const lineas = resultado.trim().split('\n');
-      const ultimaLinea = lineas[lineas.length - 1];
-      const datos = JSON.parse(ultimaLinea);
+      // stdout contiene únicamente el resultado JSON
+      const datos = JSON.parse(resultado);
       
       return datos;
       
@@ -806,17 +805,16 @@ export class IntegratedScrapingService {
         delay: 1 // Reducido a 1s para velocidad (optimizado)
       });
       
-      const comando = `${venvPython} "${scriptPath}" '${parametros}'`;
+      // Modo máquina: stdout solo trae el resultado JSON (el progreso se descarta)
+      const comando = `${venvPython} "${scriptPath}" --registro=ninguno '${parametros}'`;
       const resultado = execSync(comando, { 
         encoding: 'utf8',
         maxBuffer: 10 * 1024 * 1024,
         timeout: 45000 // Reducido a 45s para Instagram (optimizado)
       });
       
-      // Extraer solo la última línea JSON
-      const lineas = resultado.trim().split('\n');
-      const ultimaLinea = lineas[lineas.length - 1];
-      const datos = JSON.parse(ultimaLinea);
+      // stdout contiene únicamente el resultado JSON
+      const datos = JSON.parse(resultado);
       
       return datos;
       